@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Benchmark Flask-Services: Entwicklungsserver vs. gunicorn (serve.py)
+Startet einen Service nacheinander in beiden Modi, misst Anfragen/s und
+Latenzen fuer /health und die Haupt-Endpunkte mit Keep-Alive-Verbindungen.
+
+Nutzung:
+    # beide Modi lokal starten und messen
+    python Test/bench_services.py tire_service --duration 10 --concurrency 32
+
+    # laufende Instanz messen (z.B. im Docker-Netz)
+    python Test/bench_services.py tire_service --url http://localhost:5003
+
+Fuer weather_service/tire_service ohne Internet den Stub nutzen:
+    python Test/owm_stub_server.py
+    OPENWEATHERMAP_API_KEY=stub OPENWEATHERMAP_BASE_URL=http://localhost:8089/data/2.5 \\
+        python Test/bench_services.py weather_service
+"""
+
+import argparse
+import http.client
+import os
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+CONFIG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'config')
+
+# Gemessene Endpunkte pro Service (GET)
+ENDPOINTS = {
+    'calendar_webhook': ['/health'],
+    'weather_service': ['/health', '/weather', '/weather?lat=49.24&lon=6.99'],
+    'trip_processor': ['/health', '/trip/active'],
+    'tire_service': ['/health', '/tires/status', '/tires/check/VW-Passat-B5-001'],
+}
+PORTS = {'calendar_webhook': 5000, 'weather_service': 5001, 'trip_processor': 5002, 'tire_service': 5003}
+
+
+def percentile(values, q):
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def bench_endpoint(base_url, path, duration, concurrency):
+    """Feuert `duration` Sekunden lang Anfragen mit `concurrency` Verbindungen."""
+    parsed = urlparse(base_url)
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def worker():
+        conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=30)
+        local = []
+        while time.perf_counter() < stop_at:
+            started = time.perf_counter()
+            try:
+                conn.request('GET', path, headers={'Connection': 'keep-alive'})
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 400:
+                    with lock:
+                        errors[0] += 1
+            except (OSError, http.client.HTTPException):
+                with lock:
+                    errors[0] += 1
+                conn.close()
+                conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=30)
+            local.append(time.perf_counter() - started)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        'rps': len(latencies) / elapsed if elapsed else 0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'errors': errors[0]
+    }
+
+
+def wait_for_health(base_url, timeout=30):
+    parsed = urlparse(base_url)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=2)
+            conn.request('GET', '/health')
+            if conn.getresponse().status == 200:
+                return True
+        except OSError:
+            pass
+        time.sleep(0.3)
+    return False
+
+
+def start_service(service, mode, port):
+    env = dict(os.environ, PORT=str(port), SERVER_MODE=mode)
+    return subprocess.Popen([sys.executable, os.path.join(CONFIG_DIR, 'serve.py'), service], env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def print_results(label, results):
+    for path, result in results:
+        print(f"{label:<6}{path:<40}{result['rps']:>10.1f}{result['p50_ms']:>10.1f}"
+              f"{result['p99_ms']:>10.1f}{result['errors']:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark dev-Server vs. gunicorn')
+    parser.add_argument('service', choices=sorted(ENDPOINTS))
+    parser.add_argument('--url', help='Laufende Instanz messen statt selbst zu starten')
+    parser.add_argument('--modes', default='dev,prod', help='Kommagetrennt: dev, prod')
+    parser.add_argument('--port', type=int, help='Port fuer selbst gestartete Instanzen')
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--path', action='append', help='Eigene Endpunkte (mehrfach moeglich)')
+    args = parser.parse_args()
+
+    paths = args.path or ENDPOINTS[args.service]
+    print(f"{args.service}: {args.concurrency} Verbindungen, {args.duration:.0f}s pro Endpunkt")
+    print(f"{'Modus':<6}{'Endpunkt':<40}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'Fehler':>8}")
+
+    if args.url:
+        results = [(path, bench_endpoint(args.url, path, args.duration, args.concurrency)) for path in paths]
+        print_results('url', results)
+        return
+
+    port = args.port or PORTS[args.service] + 100
+    base_url = f"http://127.0.0.1:{port}"
+    for mode in [m.strip() for m in args.modes.split(',') if m.strip()]:
+        process = start_service(args.service, mode, port)
+        try:
+            if not wait_for_health(base_url):
+                print(f"{mode}: Service nicht gestartet (Abhaengigkeiten installiert?)")
+                continue
+            results = [(path, bench_endpoint(base_url, path, args.duration, args.concurrency)) for path in paths]
+            print_results(mode, results)
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=35)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Google Calendar Stub-Server
+Nimmt events.insert einzeln und als Batch (multipart/mixed) an, damit die
+Kalender-Integration ohne Google-Konto und Internet getestet werden kann.
+
+Nutzung:
+    python Test/calendar_stub_server.py --port 8090
+    GOOGLE_CALENDAR_ROOT_URL=http://localhost:8090/ python config/tire_service.py
+
+    # Jeder 3. Insert mit 503 (Retry/Backoff der Outbox testen)
+    python Test/calendar_stub_server.py --fail-rate 0.33
+
+    # Erstellte Events ansehen
+    curl http://localhost:8090/stub/events
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+INSERT_PATH = re.compile(r'^/calendar/v3/calendars/([^/]+)/events')
+
+events = []
+events_lock = threading.Lock()
+stats = {'insert_calls': 0, 'batch_calls': 0, 'failed_calls': 0}
+
+
+def store_event(calendar_id, body):
+    """Legt ein Event an und gibt (HTTP-Status, API-Antwort) zurueck."""
+    event = dict(body)
+    event.setdefault('id', uuid.uuid4().hex)
+    event['status'] = 'confirmed'
+    event['htmlLink'] = f"http://localhost/stub/calendar/{calendar_id}/event/{event['id']}"
+    with events_lock:
+        # Vom Client vergebene ID existiert schon -> 409 wie bei Google
+        if 'id' in body and any(existing['id'] == body['id'] for existing in events):
+            return 409, {'error': {'code': 409, 'message': 'The requested identifier already exists.'}}
+        events.append(event)
+    return 200, event
+
+
+def parse_batch(content_type, body):
+    """Zerlegt einen Batch-Request in (Content-ID, Methode, Pfad, JSON-Body)."""
+    message = BytesParser(policy=HTTP).parsebytes(
+        f'Content-Type: {content_type}\r\n\r\n'.encode() + body
+    )
+    parts = []
+    for part in message.iter_parts():
+        payload = part.get_payload(decode=True) or b''
+        head, _, inner_body = payload.partition(b'\r\n\r\n')
+        if not _:
+            head, _, inner_body = payload.partition(b'\n\n')
+        request_line = head.split(b'\n', 1)[0].decode().strip()
+        method, path = request_line.split(' ')[:2]
+        parts.append((part.get('Content-ID', ''), method, path, json.loads(inner_body or b'{}')))
+    return parts
+
+
+def make_handler(args):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, body, content_type='application/json'):
+            data = body if isinstance(body, bytes) else json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path.startswith('/stub/events'):
+                with events_lock:
+                    self._send(200, {'count': len(events), 'stats': stats, 'events': events[-50:]})
+            else:
+                self._send(404, {'error': 'not found'})
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            if args.delay:
+                time.sleep(args.delay)
+
+            match = INSERT_PATH.match(self.path)
+            if match:
+                stats['insert_calls'] += 1
+                if args.fail_rate and random.random() < args.fail_rate:
+                    stats['failed_calls'] += 1
+                    self._send(503, {'error': {'code': 503, 'message': 'Backend Error'}})
+                    return
+                self._send(*store_event(match.group(1), json.loads(body or b'{}')))
+                return
+
+            if self.path.startswith('/batch/calendar/v3'):
+                stats['batch_calls'] += 1
+                boundary = 'batch_' + uuid.uuid4().hex
+                chunks = []
+                for content_id, method, path, payload in parse_batch(self.headers['Content-Type'], body):
+                    inner = INSERT_PATH.match(urlparse(path).path)
+                    if method == 'POST' and inner:
+                        code, result = store_event(inner.group(1), payload)
+                        status = '200 OK' if code == 200 else '409 Conflict'
+                    else:
+                        status, result = '404 Not Found', {'error': {'code': 404, 'message': 'not found'}}
+                    response_id = content_id.strip('<>')
+                    chunks.append(
+                        f'--{boundary}\r\n'
+                        f'Content-Type: application/http\r\n'
+                        f'Content-ID: <response-{response_id}>\r\n\r\n'
+                        f'HTTP/1.1 {status}\r\n'
+                        f'Content-Type: application/json; charset=UTF-8\r\n\r\n'
+                        f'{json.dumps(result)}\r\n'
+                    )
+                chunks.append(f'--{boundary}--\r\n')
+                self._send(200, ''.join(chunks).encode(), f'multipart/mixed; boundary={boundary}')
+                return
+
+            self._send(404, {'error': 'not found'})
+
+        def log_message(self, format, *log_args):
+            if args.verbose:
+                super().log_message(format, *log_args)
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Google Calendar Stub-Server')
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--delay', type=float, default=0.0, help='Antwortzeit pro HTTP-Aufruf in Sekunden')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='Anteil einzelner Inserts mit 503')
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('0.0.0.0', args.port), make_handler(args))
+    print(f"Calendar-Stub laeuft auf http://localhost:{args.port}/")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Import-Zeit der Smart-Car Services (python -X importtime)
+Importiert jeden Service in einem frischen Interpreter, wertet die
+importtime-Ausgabe aus und zeigt Gesamtzeit sowie die teuersten direkten
+Abhaengigkeiten. Mit --baseline wird derselbe Lauf gegen einen aelteren
+Git-Stand von config/ wiederholt, um Verbesserungen sichtbar zu machen.
+
+Nutzung:
+    python Test/import_time.py
+    python Test/import_time.py tire_service calendar_webhook --runs 5 --top 8
+    python Test/import_time.py --baseline HEAD~1
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+CONFIG_DIR = os.path.join(ROOT_DIR, 'config')
+
+SERVICES = ['calendar_webhook', 'weather_service', 'trip_processor', 'tire_service',
+            'weather_collector', 'auto_sync']
+
+# "import time:       self [us] |  cumulative | imported package"
+LINE = re.compile(r'^import time:\s+(\d+)\s*\|\s*(\d+)\s*\|( *)(\S+)')
+
+
+def parse_importtime(stderr):
+    """Liefert [(Tiefe, Modul, kumulativ_us)] in der Reihenfolge der Ausgabe."""
+    entries = []
+    for line in stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            depth = (len(match.group(3)) - 1) // 2
+            entries.append((depth, match.group(4), int(match.group(2))))
+    return entries
+
+
+def measure(service, config_dir, env):
+    """Ein Lauf: (Gesamtzeit_us, {direkte Abhaengigkeit: us}) oder Fehlertext."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {service}'],
+                            cwd=config_dir, env=env, capture_output=True, text=True, timeout=120)
+    entries = parse_importtime(result.stderr)
+    if result.returncode != 0:
+        errors = [line for line in result.stderr.splitlines() if not line.startswith('import time:')]
+        return None, (errors[-1] if errors else f'Exit-Code {result.returncode}')
+
+    total = next((us for depth, name, us in entries if depth == 0 and name == service), None)
+    if total is None:
+        return None, 'Modul nicht in der importtime-Ausgabe'
+    # Direkte Importe des Service stehen eine Ebene tiefer vor dessen Zeile
+    deps = {}
+    for depth, name, us in entries:
+        if depth == 0:
+            if name == service:
+                break
+            deps = {}  # gehoerte zu einem anderen Modul der obersten Ebene
+        elif depth == 1:
+            deps[name] = deps.get(name, 0) + us
+    return total, deps
+
+
+def bench(services, config_dir, runs, env):
+    """{service: (Median_us, {Abhaengigkeit: Median_us}) oder (None, Fehler)}"""
+    results = {}
+    for service in services:
+        totals, samples = [], {}
+        error = None
+        for _ in range(runs):
+            total, deps = measure(service, config_dir, env)
+            if total is None:
+                error = deps
+                break
+            totals.append(total)
+            for name, us in deps.items():
+                samples.setdefault(name, []).append(us)
+        if error:
+            results[service] = (None, error)
+        else:
+            results[service] = (statistics.median(totals),
+                                {name: statistics.median(values) for name, values in samples.items()})
+    return results
+
+
+def export_config(ref, target):
+    """Entpackt config/ eines Git-Stands nach target, gibt den Pfad zurueck."""
+    archive = os.path.join(target, 'config.tar')
+    subprocess.run(['git', 'archive', '--format=tar', '-o', archive, ref, 'config'],
+                   cwd=ROOT_DIR, check=True)
+    with tarfile.open(archive) as tar:
+        tar.extractall(target)
+    return os.path.join(target, 'config')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-Zeit der Services messen (python -X importtime)")
+    parser.add_argument('services', nargs='*', default=SERVICES, help="Standard: alle Services")
+    parser.add_argument('--runs', type=int, default=3, help="Laeufe pro Service (Median)")
+    parser.add_argument('--top', type=int, default=5, help="Anzahl teuerster Importe pro Service")
+    parser.add_argument('--baseline', help="Git-Stand zum Vergleich, z.B. HEAD~1")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Services legen beim Import Dateien an (Cooldown-DB, Outbox, Spool) - nicht im Repo
+        env = dict(os.environ, COOLDOWN_DB=os.path.join(tmp, 'cooldowns.db'),
+                   OUTBOX_DB=os.path.join(tmp, 'calendar_outbox.db'),
+                   SPOOL_DIR=os.path.join(tmp, 'spool'), PYTHONDONTWRITEBYTECODE='1')
+
+        baseline = {}
+        if args.baseline:
+            baseline_dir = export_config(args.baseline, tmp)
+            baseline = bench(args.services, baseline_dir, args.runs, env)
+        current = bench(args.services, CONFIG_DIR, args.runs, env)
+
+    print(f"Import-Zeit (Median aus {args.runs} Laeufen, Python {sys.version.split()[0]})")
+    print("=" * 72)
+    for service in args.services:
+        total, deps = current[service]
+        if total is None:
+            print(f"{service:20s} nicht importierbar: {deps}")
+            continue
+        line = f"{service:20s} {total / 1000:8.1f} ms"
+        if service in baseline and baseline[service][0] is not None:
+            before = baseline[service][0]
+            line += f"   {args.baseline}: {before / 1000:8.1f} ms   ({(total - before) / 1000:+.1f} ms)"
+        print(line)
+        for name, us in sorted(deps.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"    {name:30s} {us / 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
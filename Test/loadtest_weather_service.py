@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Lasttest Weather Service: Flask (sync) vs. Quart (async)
+Schickt viele gleichzeitige /weather/context Anfragen (wie Node-RED bei
+vielen Fahrzeugen) und vergleicht Durchsatz und Latenzen.
+
+Nutzung:
+    # Stub statt echter API (Antwortzeit 300 ms)
+    python Test/owm_stub_server.py --delay 0.3
+    OPENWEATHERMAP_API_KEY=stub OPENWEATHERMAP_BASE_URL=http://localhost:8089/data/2.5 PORT=5001 python config/weather_service.py
+    OPENWEATHERMAP_API_KEY=stub OPENWEATHERMAP_BASE_URL=http://localhost:8089/data/2.5 PORT=5011 python config/weather_service_async.py
+
+    python Test/loadtest_weather_service.py --requests 5000 --concurrency 500 --cells 200
+"""
+
+import argparse
+import asyncio
+import time
+
+try:
+    import httpx
+except ImportError:
+    print("FEHLER: httpx nicht installiert!")
+    print("Installiere mit: pip install httpx")
+    exit(1)
+
+
+def percentile(values, q):
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def build_body(i, cells):
+    """Fahrzeug i an einer von `cells` Positionen rund um Saarbruecken."""
+    cell = i % cells
+    return {
+        'vehicle_id': f'LOAD{i % 10000:05d}',
+        'lat': round(49.0 + (cell // 20) * 0.05, 4),
+        'lon': round(6.8 + (cell % 20) * 0.05, 4),
+        'event_type': 'trip_start'
+    }
+
+
+async def run(base_url, endpoint, total, concurrency, cells):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    latencies = []
+    errors = 0
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        async def worker():
+            nonlocal errors
+            while True:
+                try:
+                    i = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                started = time.perf_counter()
+                try:
+                    if endpoint == 'context':
+                        response = await client.post('/weather/context', json=build_body(i, cells))
+                    else:
+                        body = build_body(i, cells)
+                        response = await client.get('/weather', params={'lat': body['lat'], 'lon': body['lon']})
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        duration = time.perf_counter() - started
+
+    return {
+        'requests': total,
+        'errors': errors,
+        'duration_s': duration,
+        'rps': total / duration if duration else 0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Lasttest sync vs. async Weather Service')
+    parser.add_argument('--sync-url', default='http://localhost:5001', help='Flask-Variante (leer = ueberspringen)')
+    parser.add_argument('--async-url', default='http://localhost:5011', help='ASGI-Variante (leer = ueberspringen)')
+    parser.add_argument('--endpoint', choices=['context', 'weather'], default='context')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--cells', type=int, default=100, help='Anzahl verschiedener Rasterzellen')
+    args = parser.parse_args()
+
+    targets = [(name, url) for name, url in (('sync', args.sync_url), ('async', args.async_url)) if url]
+
+    path = '/weather/context' if args.endpoint == 'context' else '/weather'
+    print(f"{args.requests} Anfragen, {args.concurrency} parallel, {args.cells} Rasterzellen, {path}")
+    print(f"{'Modus':<8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'Fehler':>8}")
+    for name, url in targets:
+        result = asyncio.run(run(url, args.endpoint, args.requests, args.concurrency, args.cells))
+        print(f"{name:<8}{result['rps']:>10.1f}{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}"
+              f"{result['p99_ms']:>10.1f}{result['errors']:>8}")
+
+
+if __name__ == '__main__':
+    main()
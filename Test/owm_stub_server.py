@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+OpenWeatherMap Stub-Server
+Liefert synthetische Antworten fuer /weather und /forecast, damit der
+Weather-Service ohne API-Key und Internet getestet werden kann.
+
+Nutzung:
+    python Test/owm_stub_server.py --port 8089 --temp 2 --main Snow
+    OPENWEATHERMAP_API_KEY=stub OPENWEATHERMAP_BASE_URL=http://localhost:8089/data/2.5 \\
+        python config/weather_service.py
+"""
+
+import argparse
+import json
+import math
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+def build_current(args, lat, lon):
+    """Antwort im Format von /data/2.5/weather."""
+    now = int(time.time())
+    return {
+        'coord': {'lat': lat, 'lon': lon},
+        'weather': [{'main': args.main, 'description': f'{args.main} (Stub)', 'icon': '13d'}],
+        'main': {'temp': args.temp, 'feels_like': args.temp - 2, 'humidity': 80, 'pressure': 1012},
+        'visibility': 8000,
+        'wind': {'speed': 4, 'deg': 250},
+        'clouds': {'all': 75},
+        'sys': {'sunrise': now - 6 * 3600, 'sunset': now + 4 * 3600},
+        'name': 'Stubhausen'
+    }
+
+
+def build_forecast(args, lat, lon):
+    """Antwort im Format von /data/2.5/forecast (40 Punkte, 3h-Schritte)."""
+    start = int(time.time()) // 10800 * 10800 + 10800
+    entries = []
+    for i in range(40):
+        # Tagesgang +-4°C um die Basistemperatur, leichter Abwaertstrend
+        temp = args.temp + 4 * math.sin(i * math.pi / 4) - i * args.trend
+        main = args.main if i % 8 < 4 else 'Clouds'
+        entries.append({
+            'dt': start + i * 10800,
+            'main': {'temp': round(temp, 1), 'feels_like': round(temp - 2, 1), 'temp_min': round(temp - 1, 1),
+                     'humidity': 80, 'pressure': 1012},
+            'weather': [{'main': main, 'description': f'{main} (Stub)', 'icon': '04d'}],
+            'clouds': {'all': 75},
+            'wind': {'speed': 4},
+            'visibility': 10000,
+            'pop': 0.4
+        })
+    return {'cnt': len(entries), 'list': entries, 'city': {'name': 'Stubhausen', 'coord': {'lat': lat, 'lon': lon}}}
+
+
+def make_handler(args):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            query = parse_qs(parsed.query)
+            lat = float(query.get('lat', ['49.2354'])[0])
+            lon = float(query.get('lon', ['6.9958'])[0])
+
+            if args.delay:
+                time.sleep(args.delay)
+
+            if args.fail:
+                self.send_response(503)
+                self.end_headers()
+                return
+
+            if parsed.path.endswith('/weather'):
+                body = build_current(args, lat, lon)
+            elif parsed.path.endswith('/forecast'):
+                body = build_forecast(args, lat, lon)
+            else:
+                self.send_response(404)
+                self.end_headers()
+                return
+
+            payload = json.dumps(body).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, fmt, *log_args):
+            print(f"[STUB] {self.address_string()} {fmt % log_args}")
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='OpenWeatherMap Stub-Server')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--temp', type=float, default=3.0, help='Basistemperatur in °C')
+    parser.add_argument('--trend', type=float, default=0.1, help='Abkuehlung pro 3h-Schritt')
+    parser.add_argument('--main', default='Clouds', help='Wetterlage (Clear, Rain, Snow, ...)')
+    parser.add_argument('--delay', type=float, default=0, help='Kuenstliche Antwortzeit in Sekunden')
+    parser.add_argument('--fail', action='store_true', help='Immer HTTP 503 liefern (Circuit Breaker testen)')
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('0.0.0.0', args.port), make_handler(args))
+    print(f"OWM-Stub laeuft auf http://localhost:{args.port}/data/2.5")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nBeendet.")
+
+
+if __name__ == '__main__':
+    main()
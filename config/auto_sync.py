@@ -4,45 +4,41 @@ Auto-Sync für Fahrzeug-Stammdaten.
 Wird beim Docker-Start automatisch ausgeführt.
 """
 
-import json
 import os
 import sys
 import time
 
-try:
-    from influxdb_client import InfluxDBClient, Point
-    from influxdb_client.client.write_api import SYNCHRONOUS
-except ImportError:
-    print("influxdb-client wird installiert...")
-    import subprocess
-    subprocess.check_call([sys.executable, "-m", "pip", "install", "influxdb-client", "-q"])
-    from influxdb_client import InfluxDBClient, Point
-    from influxdb_client.client.write_api import SYNCHRONOUS
+from smartcar import influx, settings
+from smartcar.vehicles import default_path, load_vehicles as registry_vehicles
 
+if not influx.available():
+    print("FEHLER: influxdb-client nicht installiert (pip install influxdb-client)")
+    sys.exit(1)
 
-# InfluxDB Konfiguration aus Umgebungsvariablen
-INFLUX_URL = os.getenv("INFLUX_URL", "http://influxdb:8086")
-INFLUX_TOKEN = os.getenv("INFLUX_TOKEN", "vehicle-admin-token")
-INFLUX_ORG = os.getenv("INFLUX_ORG", "vehicle_org")
-INFLUX_BUCKET = os.getenv("INFLUX_BUCKET", "vehicle_data")
+from vehicle_sync import diff_sync
+
+
+# InfluxDB Konfiguration aus Umgebungsvariablen (siehe smartcar.settings)
+INFLUX = settings.influx()
 
 # Pfad zur vehicles.json (im Container gemountet)
-VEHICLES_JSON = os.getenv("VEHICLES_JSON", "/config/vehicles.json")
+VEHICLES_JSON = default_path()
+
+# Differenz-Sync: Vergleich gegen Zustandsdatei (leer = last()-Abfrage in InfluxDB)
+VEHICLE_SYNC_STATE = os.getenv("VEHICLE_SYNC_STATE", "")
+VEHICLE_SYNC_FULL = settings.env_bool("VEHICLE_SYNC_FULL")
 
 
 def wait_for_influxdb(max_retries=30, delay=2):
     """Wartet bis InfluxDB bereit ist."""
-    print(f"Warte auf InfluxDB ({INFLUX_URL})...")
+    print(f"Warte auf InfluxDB ({INFLUX.url})...")
     
     for i in range(max_retries):
         try:
-            client = InfluxDBClient(url=INFLUX_URL, token=INFLUX_TOKEN, org=INFLUX_ORG)
-            health = client.health()
+            health = influx.get_client().health()
             if health.status == "pass":
                 print(f"InfluxDB bereit (Version: {health.version})")
-                client.close()
                 return True
-            client.close()
         except Exception as e:
             pass
         
@@ -59,43 +55,22 @@ def load_vehicles():
         print(f"WARNUNG: {VEHICLES_JSON} nicht gefunden - überspringe Sync")
         return []
     
-    with open(VEHICLES_JSON, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    return data.get("vehicles", [])
+    return registry_vehicles(VEHICLES_JSON)
 
 
 def sync_vehicles(vehicles):
-    """Schreibt Fahrzeugdaten in InfluxDB."""
+    """Schreibt neue oder geänderte Fahrzeugdaten in InfluxDB (eine Anfrage)."""
     if not vehicles:
         return True
     
     try:
-        client = InfluxDBClient(url=INFLUX_URL, token=INFLUX_TOKEN, org=INFLUX_ORG)
-        write_api = client.write_api(write_options=SYNCHRONOUS)
-        
-        for vehicle in vehicles:
-            vid = vehicle.get("vehicle_id")
-            if not vid:
-                continue
-            
-            point = Point("vehicle_info") \
-                .tag("vehicle_id", vid) \
-                .field("display_name", vehicle.get("display_name", vid)) \
-                .field("manufacturer", vehicle.get("manufacturer", "Unbekannt")) \
-                .field("model", vehicle.get("model", "Unbekannt")) \
-                .field("year", vehicle.get("year", 0)) \
-                .field("license_plate", vehicle.get("license_plate", "")) \
-                .field("vin", vehicle.get("vin", "")) \
-                .field("fuel_capacity_l", vehicle.get("fuel_capacity_l", 50)) \
-                .field("fuel_type", vehicle.get("fuel_type", "Benzin")) \
-                .field("color", vehicle.get("color", "")) \
-                .field("notes", vehicle.get("notes", ""))
-            
-            write_api.write(bucket=INFLUX_BUCKET, record=point)
-            print(f"  ✓ {vid}: {vehicle.get('display_name', vid)}")
-        
-        client.close()
+        result = diff_sync(vehicles, INFLUX.url, INFLUX.token, INFLUX.org, INFLUX.bucket,
+                           state_path=VEHICLE_SYNC_STATE or None, full=VEHICLE_SYNC_FULL,
+                           client_factory=influx.get_client)
+        if result is None:
+            return False
+        written, unchanged = result
+        print(f"  {written} geschrieben, {unchanged} unverändert")
         return True
         
     except Exception as e:
@@ -118,7 +93,7 @@ def main():
     
     if vehicles:
         if sync_vehicles(vehicles):
-            print(f"\n✓ {len(vehicles)} Fahrzeuge synchronisiert!")
+            print(f"\n✓ {len(vehicles)} Fahrzeuge abgeglichen!")
         else:
             sys.exit(1)
     else:
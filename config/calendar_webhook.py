@@ -2,32 +2,75 @@
 """
 Webhook Server fuer Google Calendar Integration.
 Empfaengt Alert-Events von Node-RED und erstellt Google Calendar Termine.
+
+POST /event legt das Event in einer persistenten Outbox ab und antwortet
+sofort mit 202; ein Worker-Pool erstellt die Termine im Hintergrund
+(siehe event_outbox.py). GET /event/<id> zeigt den Zustellstatus.
+
+Exakt gleiche Events werden per Inhalts-Hash verworfen; Alerts gleichen
+Typs im selben Zeitslot (bzw. desselben Fahrzeugs) werden innerhalb eines
+Fensters zu einem Sammeltermin zusammengefasst.
 """
 
 from flask import Flask, request, jsonify
+import hashlib
 import json
 import os
 import sys
+import threading
+import uuid
 from datetime import datetime, timedelta
 
+from cooldown_store import CooldownStore
+from event_outbox import EventOutbox, OutboxDispatcher
+from smartcar import google_api, settings
+
 app = Flask(__name__)
 
-# Google API importieren
-try:
-    from google.oauth2 import service_account
-    from googleapiclient.discovery import build
-    GOOGLE_API_AVAILABLE = True
-except ImportError:
-    GOOGLE_API_AVAILABLE = False
+# Google API (Import erst beim ersten Kalenderzugriff, siehe smartcar.google_api)
+GOOGLE_API_AVAILABLE = google_api.available()
+if not GOOGLE_API_AVAILABLE:
     print("Google API nicht verfuegbar - Events werden nur geloggt")
 
 # Konfiguration
-KEY_FILE = os.environ.get('GOOGLE_KEY_FILE', '/config/google-calendar-key.json')
-ALERTS_FILE = os.environ.get('ALERTS_FILE', '/config/alerts.json')
+KEY_FILE = os.environ.get('GOOGLE_KEY_FILE', settings.config_path('google-calendar-key.json'))
+ALERTS_FILE = os.environ.get('ALERTS_FILE', settings.config_path('alerts.json'))
 SCOPES = ['https://www.googleapis.com/auth/calendar.events']
+# Anderer Endpunkt (z.B. Test/calendar_stub_server.py) -> ohne Key-Datei nutzbar
+GOOGLE_CALENDAR_ROOT_URL = os.environ.get('GOOGLE_CALENDAR_ROOT_URL', 'https://www.googleapis.com/')
+COOLDOWN_DB = os.environ.get('COOLDOWN_DB', settings.config_path('cooldowns.db'))
+DEFAULT_COOLDOWN_HOURS = settings.env_float('DEFAULT_COOLDOWN_HOURS', 24)
+
+# Outbox: Termine werden asynchron erstellt
+OUTBOX_DB = os.environ.get('OUTBOX_DB', settings.config_path('calendar_outbox.db'))
+OUTBOX_WORKERS = settings.env_int('OUTBOX_WORKERS', 2)
+OUTBOX_RATE = settings.env_float('OUTBOX_RATE', 5)  # Google-Anfragen pro Sekunde
+OUTBOX_MAX_ATTEMPTS = settings.env_int('OUTBOX_MAX_ATTEMPTS', 8)
+OUTBOX_MAX_DELAY = settings.env_float('OUTBOX_MAX_DELAY', 600)  # Sekunden
+OUTBOX_RETENTION_HOURS = settings.env_float('OUTBOX_RETENTION_HOURS', 24)
+
+# Zusammenfassen: Fenster ab dem ersten Event einer Gruppe (0 = aus)
+COALESCE_WINDOW_S = settings.env_float('COALESCE_WINDOW_S', 60)
+COALESCE_GROUP_BY = settings.env_str('COALESCE_GROUP_BY', 'alert')  # alert | vehicle
+COALESCE_SLOT_MINUTES = settings.env_int('COALESCE_SLOT_MINUTES', 60)
+COALESCE_MAX_EVENTS = settings.env_int('COALESCE_MAX_EVENTS', 50)
+# Exakt gleiche Events in diesem Zeitraum verwerfen (0 = aus, max. OUTBOX_RETENTION_HOURS)
+DEDUP_WINDOW_S = settings.env_float('DEDUP_WINDOW_S', 3600)
 
-# Cache
-_service = None
+# Farbe mit der hoechsten Prioritaet gewinnt im Sammeltermin (11 = Rot ... 9 = Blau)
+COLOR_PRIORITY = ['11', '6', '5', '9']
+
+# Wiederholbare Google-Fehler (Rate-Limit, Serverfehler)
+RETRY_STATUS = {408, 429, 500, 502, 503, 504}
+
+# Geteilt mit tire_service, ueberlebt Neustarts
+cooldowns = CooldownStore(COOLDOWN_DB, default_ttl=DEFAULT_COOLDOWN_HOURS * 3600)
+outbox = EventOutbox(OUTBOX_DB, retention_seconds=OUTBOX_RETENTION_HOURS * 3600)
+
+# Cache (httplib2 ist nicht threadsicher -> ein Service-Objekt pro Thread)
+_credentials = None
+_service_local = threading.local()
+_service_checked = False
 _config = None
 
 
@@ -44,33 +87,46 @@ def load_config():
 
 
 def get_calendar_service():
-    """Erstellt einen authentifizierten Google Calendar Service."""
-    global _service
+    """Erstellt einen authentifizierten Google Calendar Service (pro Thread gecacht)."""
+    global _credentials, _service_checked
     
-    if _service is not None:
-        return _service
+    service = getattr(_service_local, 'service', None)
+    if service is not None:
+        return service
     
     if not GOOGLE_API_AVAILABLE:
         return None
     
-    if not os.path.exists(KEY_FILE):
+    stub = not GOOGLE_CALENDAR_ROOT_URL.startswith('https://www.googleapis.com')
+    if not stub and not os.path.exists(KEY_FILE):
         print("Key-Datei nicht gefunden: " + KEY_FILE)
         return None
     
     try:
-        credentials = service_account.Credentials.from_service_account_file(
-            KEY_FILE, scopes=SCOPES
+        google = google_api.load()
+        if _credentials is None:
+            if os.path.exists(KEY_FILE):
+                _credentials = google.service_account.Credentials.from_service_account_file(
+                    KEY_FILE, scopes=SCOPES
+                )
+            else:
+                _credentials = google.AnonymousCredentials()
+        service = google.build(
+            'calendar', 'v3', credentials=_credentials, cache_discovery=False,
+            client_options={'api_endpoint': GOOGLE_CALENDAR_ROOT_URL + 'calendar/v3/'}
         )
-        _service = build('calendar', 'v3', credentials=credentials)
+        _service_local.service = service
         
-        # Test: Versuche die Kalender-Liste abzurufen
-        try:
-            calendars = _service.calendarList().list().execute()
-            print(f"Google Calendar Service verbunden - {len(calendars.get('items', []))} Kalender gefunden")
-        except Exception as e:
-            print(f"Kalender-List Fehler (aber Service ist verbunden): {str(e)}")
+        # Test beim ersten Service: Versuche die Kalender-Liste abzurufen
+        if not _service_checked:
+            _service_checked = True
+            try:
+                calendars = service.calendarList().list().execute()
+                print(f"Google Calendar Service verbunden - {len(calendars.get('items', []))} Kalender gefunden")
+            except Exception as e:
+                print(f"Kalender-List Fehler (aber Service ist verbunden): {str(e)}")
         
-        return _service
+        return service
     except Exception as e:
         print("Service-Fehler beim Erstellen: " + str(e))
         import traceback
@@ -78,24 +134,124 @@ def get_calendar_service():
         return None
 
 
-def create_event(event_data):
-    """Erstellt einen Kalender-Termin."""
-    config = load_config()
-    google_config = config.get('google_calendar', {})
+def get_cooldown(event_data):
+    """
+    Cooldown-Schluessel und -Dauer fuer ein Event.
+    Node-RED schickt vehicle_id und alert_type mit, die Dauer kommt aus
+    dem Payload (cooldown_hours) oder aus alerts.json. Ohne beide Felder
+    (z.B. /test) gibt es keinen Cooldown.
+    """
+    vehicle_id = event_data.get('vehicle_id')
+    alert_type = event_data.get('alert_type')
+    if not vehicle_id or not alert_type:
+        return None, None
+    
+    hours = event_data.get('cooldown_hours')
+    if hours is None:
+        alert_config = load_config().get('alerts', {}).get(alert_type, {})
+        hours = alert_config.get('cooldown_hours', DEFAULT_COOLDOWN_HOURS)
+    return f"{vehicle_id}_{alert_type}", float(hours) * 3600
+
+
+def calendar_target():
+    """Kalender-ID aus alerts.json, (calendar_id, Fehler)."""
+    google_config = load_config().get('google_calendar', {})
     
     if not google_config.get('enabled', False):
-        return {'success': False, 'error': 'Google Calendar deaktiviert'}
+        return None, 'Google Calendar deaktiviert'
     
     calendar_id = google_config.get('calendar_id', '')
     if not calendar_id or calendar_id == 'DEINE_KALENDER_ID_HIER':
-        return {'success': False, 'error': 'Keine Kalender-ID konfiguriert'}
+        return None, 'Keine Kalender-ID konfiguriert'
+    return calendar_id, None
+
+
+def acquire_cooldown(event_data):
+    """Startet den Cooldown; gibt (Schluessel, Ergebnis bei aktivem Cooldown) zurueck."""
+    cooldown_key, cooldown_seconds = get_cooldown(event_data)
+    if cooldown_key and not cooldowns.acquire(cooldown_key, cooldown_seconds):
+        remaining = cooldowns.remaining(cooldown_key)
+        print(f"Cooldown aktiv fuer {cooldown_key} (noch {remaining / 3600:.1f} h)")
+        return cooldown_key, {'success': True, 'skipped': True, 'reason': 'cooldown',
+                              'cooldown_remaining_s': int(remaining)}
+    return cooldown_key, None
+
+
+def release_cooldown(event_data, result=None):
+    """Gibt den Cooldown eines Events frei (Senden endgueltig gescheitert)."""
+    cooldown_key, _ = get_cooldown(event_data)
+    if cooldown_key:
+        cooldowns.release(cooldown_key)
+
+
+def calendar_event_id(idempotency_key):
+    """
+    Feste Google-Event-ID pro Idempotenz-Schluessel (Zeichen 0-9a-f sind
+    gueltiges base32hex). Ein wiederholtes Insert nach verlorener Antwort
+    endet mit 409 statt mit einem doppelten Termin.
+    """
+    return hashlib.sha1(idempotency_key.encode('utf-8')).hexdigest()
+
+
+def content_hash(event_data):
+    """Hash ueber den Inhalt (ohne Idempotenz-Schluessel), Feldreihenfolge egal."""
+    content = {key: value for key, value in event_data.items() if key != 'idempotency_key'}
+    encoded = json.dumps(content, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+
+
+def time_slot(event_data):
+    """Zeitslot des Termins (Beginn abgerundet auf COALESCE_SLOT_MINUTES)."""
+    try:
+        start = datetime.fromisoformat(event_data['start']['dateTime'].replace('Z', '+00:00'))
+    except (KeyError, TypeError, ValueError):
+        start = datetime.now()
+    return int(start.timestamp() // (COALESCE_SLOT_MINUTES * 60))
+
+
+def coalesce_key(event_data):
+    """
+    Gruppe fuer Sammeltermine: (Alert-Typ, Zeitslot) oder (Fahrzeug, Zeitslot).
+    None = wird einzeln zugestellt (Fenster aus oder Feld fehlt).
+    """
+    if COALESCE_WINDOW_S <= 0:
+        return None
+    if COALESCE_GROUP_BY == 'vehicle':
+        vehicle_id = event_data.get('vehicle_id')
+        return f"vehicle:{vehicle_id}:{time_slot(event_data)}" if vehicle_id else None
+    alert_type = event_data.get('alert_type')
+    return f"alert:{alert_type}:{time_slot(event_data)}" if alert_type else None
+
+
+def build_digest(events):
+    """Fasst die Events einer Gruppe zu einem Sammeltermin zusammen (merge der Outbox)."""
+    first = events[0]
+    by_vehicle = {}
+    for event in events:
+        title = event.get('summary', event.get('title', 'Smart-Car Alert'))
+        titles = by_vehicle.setdefault(event.get('vehicle_id') or 'ohne Fahrzeug', [])
+        if title not in titles:
+            titles.append(title)
     
-    service = get_calendar_service()
-    if not service:
-        print("Event (nicht gesendet): " + event_data.get('summary', event_data.get('title', 'Unknown')))
-        return {'success': False, 'error': 'Google Calendar Service nicht verfuegbar'}
+    if COALESCE_GROUP_BY == 'vehicle':
+        summary = f"{first.get('vehicle_id')}: {len(events)} Meldungen"
+    else:
+        summary = f"{first.get('summary', first.get('title', 'Smart-Car Alert'))} ({len(by_vehicle)} Fahrzeuge)"
+    lines = [f"- {vehicle}: {', '.join(titles)}" for vehicle, titles in sorted(by_vehicle.items())]
+    colors = [event.get('colorId') or '9' for event in events]
     
-    # Event aufbereiten
+    digest = dict(first)
+    digest.update({
+        'summary': summary,
+        'description': f"Sammeltermin fuer {len(events)} Meldungen:\n" + '\n'.join(lines)
+                       + "\n\nAutomatisch zusammengefasst",
+        'colorId': min(colors, key=lambda c: COLOR_PRIORITY.index(c) if c in COLOR_PRIORITY else len(COLOR_PRIORITY)),
+    })
+    return digest
+
+
+def build_event(event_data, event_id=None):
+    """Google-Calendar-Event aus dem Payload."""
     if 'start' in event_data and 'dateTime' in event_data['start']:
         start = datetime.fromisoformat(event_data['start']['dateTime'].replace('Z', '+00:00'))
         end = datetime.fromisoformat(event_data['end']['dateTime'].replace('Z', '+00:00'))
@@ -138,10 +294,16 @@ def create_event(event_data):
         },
         'colorId': color_id,
     }
-    
+    if event_id:
+        event['id'] = event_id
+    return event
+
+
+def insert_event(service, calendar_id, event):
+    """Fuehrt das Insert aus; Fehler werden als wiederholbar/endgueltig eingestuft."""
     try:
         created = service.events().insert(calendarId=calendar_id, body=event).execute()
-        print("Termin erstellt: " + title)
+        print("Termin erstellt: " + event['summary'])
         return {
             'success': True,
             'event_id': created['id'],
@@ -149,6 +311,13 @@ def create_event(event_data):
         }
     except Exception as e:
         error_str = str(e)
+        status = getattr(getattr(e, 'resp', None), 'status', None)
+        
+        if status == 409 and event.get('id'):
+            # Termin mit dieser ID existiert schon (frueherer Versuch war erfolgreich)
+            print("Termin bereits vorhanden: " + event['summary'])
+            return {'success': True, 'event_id': event['id'], 'duplicate': True}
+        
         print(f"Fehler beim Erstellen des Events: {error_str}")
         
         # Detaillierte Fehlermeldung für JWT-Probleme
@@ -160,36 +329,156 @@ def create_event(event_data):
             print(f"   Service Account: {service._credentials.service_account_email if hasattr(service, '_credentials') else 'unbekannt'}")
             print(f"   Kalender ID: {calendar_id}")
         
-        import traceback
-        traceback.print_exc()
+        # Ohne HTTP-Status (Netzwerk, Timeout) oder Rate-Limit/Serverfehler: spaeter erneut
+        rate_limited = status == 403 and 'ratelimitexceeded' in error_str.lower()
+        retryable = status is None or status in RETRY_STATUS or rate_limited
+        if not retryable:
+            import traceback
+            traceback.print_exc()
         
-        return {'success': False, 'error': error_str}
+        return {'success': False, 'error': error_str, 'retryable': retryable}
+
+
+def create_event(event_data):
+    """Erstellt einen Kalender-Termin sofort (synchron, z.B. fuer /test)."""
+    calendar_id, error = calendar_target()
+    if error:
+        return {'success': False, 'error': error}
+    
+    service = get_calendar_service()
+    if not service:
+        print("Event (nicht gesendet): " + event_data.get('summary', event_data.get('title', 'Unknown')))
+        return {'success': False, 'error': 'Google Calendar Service nicht verfuegbar'}
+    
+    cooldown_key, skipped = acquire_cooldown(event_data)
+    if skipped:
+        return skipped
+    
+    result = insert_event(service, calendar_id, build_event(event_data))
+    if not result['success'] and cooldown_key:
+        cooldowns.release(cooldown_key)
+    result.pop('retryable', None)
+    return result
+
+
+def deliver_event(event_data, idempotency_key):
+    """Handler der Outbox-Worker: erstellt den Termin zu einem abgelegten Event."""
+    calendar_id, error = calendar_target()
+    if error:
+        return {'success': False, 'error': error}
+    
+    service = get_calendar_service()
+    if not service:
+        # Key-Datei fehlt evtl. nur voruebergehend (Mount, Deployment)
+        return {'success': False, 'error': 'Google Calendar Service nicht verfuegbar',
+                'retryable': GOOGLE_API_AVAILABLE}
+    
+    return insert_event(service, calendar_id, build_event(event_data, calendar_event_id(idempotency_key)))
+
+
+# Endgueltig gescheiterte Events geben ihren Cooldown wieder frei
+dispatcher = OutboxDispatcher(outbox, deliver_event, workers=OUTBOX_WORKERS, rate_per_second=OUTBOX_RATE,
+                              max_attempts=OUTBOX_MAX_ATTEMPTS, max_delay=OUTBOX_MAX_DELAY,
+                              on_give_up=release_cooldown, merge=build_digest, max_group=COALESCE_MAX_EVENTS)
+
+# Annahme-Zaehler dieses Prozesses
+ingest_stats = {'queued': 0, 'duplicate': 0, 'cooldown': 0}
+
+
+def start_background_jobs():
+    """
+    Startet den Outbox-Worker-Pool.
+    Unter gunicorn (serve.py) laeuft er nur in einem Worker, damit die
+    Ratenbegrenzung fuer den ganzen Service gilt.
+    """
+    dispatcher.start()
 
 
 @app.route('/health', methods=['GET'])
 def health():
     """Health Check Endpoint."""
-    return jsonify({'status': 'ok', 'google_api': GOOGLE_API_AVAILABLE})
+    return jsonify({
+        'status': 'ok',
+        'google_api': GOOGLE_API_AVAILABLE,
+        'active_cooldowns': cooldowns.active_count(),
+        'outbox': outbox.counts(),
+        'outbox_oldest_pending_s': round(outbox.oldest_pending_age(), 1),
+        'dispatcher': dict(dispatcher.stats),
+        'ingest': dict(ingest_stats)
+    })
+
+
+def outbox_status(entry):
+    return {
+        'outbox_id': entry['id'],
+        'idempotency_key': entry['idempotency_key'],
+        'status': entry['status'],
+        'attempts': entry['attempts'],
+        'group': entry['group_key'],
+        'result': entry['result'],
+        'last_error': entry['last_error']
+    }
 
 
 @app.route('/event', methods=['POST'])
 def create_calendar_event():
-    """Erstellt einen Kalender-Termin aus dem Request."""
+    """
+    Nimmt ein Event an und legt es in der Outbox ab (202).
+    Idempotenz-Schluessel aus Header Idempotency-Key oder Feld
+    idempotency_key; ein bekannter Schluessel wird nicht erneut eingestellt.
+    Exakte Duplikate (Inhalts-Hash, DEDUP_WINDOW_S) werden verworfen,
+    gruppierbare Events warten COALESCE_WINDOW_S auf weitere ihrer Gruppe.
+    """
     try:
         event_data = request.get_json()
         if not event_data:
             return jsonify({'success': False, 'error': 'Keine Daten empfangen'}), 400
         
         print("Event empfangen: " + event_data.get('summary', event_data.get('title', '?')))
-        result = create_event(event_data)
         
-        status_code = 200 if result.get('success') else 500
-        return jsonify(result), status_code
+        _, error = calendar_target()
+        if error:
+            return jsonify({'success': False, 'error': error}), 500
+        
+        key = request.headers.get('Idempotency-Key') or event_data.get('idempotency_key') or uuid.uuid4().hex
+        entry = outbox.get_by_key(key)
+        if entry is None:
+            digest = content_hash(event_data)
+            duplicate = outbox.find_duplicate(digest, DEDUP_WINDOW_S) if DEDUP_WINDOW_S > 0 else None
+            if duplicate:
+                ingest_stats['duplicate'] += 1
+                return jsonify({'success': True, 'skipped': True, 'reason': 'duplicate',
+                                'duplicate_of': duplicate['id']}), 200
+            
+            _, skipped = acquire_cooldown(event_data)
+            if skipped:
+                ingest_stats['cooldown'] += 1
+                return jsonify(skipped), 200
+            
+            group_key = coalesce_key(event_data)
+            entry, created = outbox.enqueue(event_data, key, group_key=group_key,
+                                            delay=COALESCE_WINDOW_S if group_key else 0, content_hash=digest)
+            ingest_stats['queued'] += 1
+            if not group_key:
+                dispatcher.notify()
+        else:
+            created = False
+        
+        return jsonify({'success': True, 'queued': True, 'duplicate': not created, **outbox_status(entry)}), 202
     
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@app.route('/event/<int:outbox_id>', methods=['GET'])
+def get_calendar_event(outbox_id):
+    """Zustellstatus eines Events aus der Outbox."""
+    entry = outbox.get(outbox_id)
+    if entry is None:
+        return jsonify({'error': 'Event nicht gefunden'}), 404
+    return jsonify(outbox_status(entry))
+
+
 @app.route('/test', methods=['GET'])
 def test_event():
     """Erstellt einen Test-Termin."""
@@ -224,4 +513,5 @@ if __name__ == '__main__':
         print("✗ Google Calendar Service FEHLER!")
     
     print("=" * 50)
+    start_background_jobs()
     app.run(host='0.0.0.0', port=5000, debug=False)
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Persistenter Cooldown-Speicher fuer Smart-Car Benachrichtigungen
+SQLite-Datei mit Ablaufzeit pro Schluessel. Mehrere Threads, Worker und
+Services (tire_service, calendar_webhook) koennen dieselbe Datei nutzen,
+Cooldowns ueberleben Neustarts.
+
+Beispiel:
+    store = CooldownStore('/config/cooldowns.db')
+    if store.acquire('VW-Passat-B5-001_tire_change', ttl_seconds=24 * 3600):
+        ...  # Benachrichtigung senden, bei Fehler store.release(key)
+"""
+
+import os
+import time
+import sqlite3
+import threading
+
+DEFAULT_DB = os.environ.get('COOLDOWN_DB', '/config/cooldowns.db')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cooldowns (
+    key        TEXT PRIMARY KEY,
+    set_at     REAL NOT NULL,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID
+"""
+
+# Setzt den Cooldown nur, wenn keiner existiert oder der alte abgelaufen ist.
+# Ein einziges Statement -> atomar, auch zwischen Prozessen.
+_ACQUIRE = """
+INSERT INTO cooldowns (key, set_at, expires_at) VALUES (?, ?, ?)
+ON CONFLICT(key) DO UPDATE SET set_at = excluded.set_at, expires_at = excluded.expires_at
+WHERE cooldowns.expires_at <= excluded.set_at
+"""
+
+
+class CooldownStore:
+    """
+    Cooldowns mit TTL in einer SQLite-Datei (WAL-Modus).
+
+    acquire() ist ein atomares Check-and-Set ueber den Primaerschluessel,
+    d.h. O(1) und korrekt auch bei mehreren Workern: von gleichzeitigen
+    Aufrufen fuer denselben Schluessel gewinnt genau einer.
+    """
+
+    # Abgelaufene Eintraege werden hoechstens so oft aufgeraeumt
+    PURGE_INTERVAL = 3600
+
+    def __init__(self, path=DEFAULT_DB, default_ttl=24 * 3600):
+        self.path = path
+        self.default_ttl = default_ttl
+        self._local = threading.local()
+        self._next_purge = 0.0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(_SCHEMA)
+        # Nicht offen lassen: der Import laeuft unter gunicorn (preload) im
+        # Master, und SQLite-Verbindungen duerfen fork() nicht ueberleben
+        self.close()
+
+    def _connect(self):
+        """
+        Eine Verbindung pro Thread (sqlite3-Verbindungen sind nicht teilbar)
+        und pro Prozess: nach fork() wird nie die geerbte Verbindung benutzt.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def close(self):
+        """Schliesst die Verbindung des aktuellen Threads (naechster Zugriff oeffnet neu)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+        self._local.conn = None
+
+    def acquire(self, key, ttl_seconds=None):
+        """
+        Startet einen Cooldown fuer `key`, falls keiner aktiv ist.
+        True = Benachrichtigung darf raus, False = Cooldown laeuft noch.
+        """
+        now = time.time()
+        ttl = self.default_ttl if ttl_seconds is None else ttl_seconds
+        conn = self._connect()
+        cursor = conn.execute(_ACQUIRE, (key, now, now + ttl))
+        acquired = cursor.rowcount == 1
+        if now >= self._next_purge:
+            self._next_purge = now + self.PURGE_INTERVAL
+            self.purge_expired()
+        return acquired
+
+    def release(self, key):
+        """Gibt einen Cooldown wieder frei (z.B. wenn das Senden fehlschlug)."""
+        self._connect().execute('DELETE FROM cooldowns WHERE key = ?', (key,))
+
+    def set(self, key, ttl_seconds=None):
+        """Setzt den Cooldown unbedingt (ueberschreibt einen laufenden)."""
+        now = time.time()
+        ttl = self.default_ttl if ttl_seconds is None else ttl_seconds
+        self._connect().execute(
+            'INSERT OR REPLACE INTO cooldowns (key, set_at, expires_at) VALUES (?, ?, ?)',
+            (key, now, now + ttl)
+        )
+
+    def remaining(self, key):
+        """Restlaufzeit in Sekunden (0 = kein aktiver Cooldown)."""
+        row = self._connect().execute('SELECT expires_at FROM cooldowns WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return 0.0
+        return max(0.0, row[0] - time.time())
+
+    def is_active(self, key):
+        return self.remaining(key) > 0
+
+    def purge_expired(self):
+        """Loescht abgelaufene Eintraege, gibt die Anzahl zurueck."""
+        cursor = self._connect().execute('DELETE FROM cooldowns WHERE expires_at <= ?', (time.time(),))
+        return cursor.rowcount
+
+    def clear(self):
+        """Loescht alle Cooldowns."""
+        self._connect().execute('DELETE FROM cooldowns')
+
+    def active_count(self):
+        row = self._connect().execute('SELECT COUNT(*) FROM cooldowns WHERE expires_at > ?', (time.time(),)).fetchone()
+        return row[0]
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+Persistente Outbox fuer Kalender-Events von Smart-Car
+Der Webhook legt eingehende Events nur in einer SQLite-Datei ab und
+antwortet sofort; ein Worker-Pool arbeitet die Outbox im Hintergrund ab
+(Ratenbegrenzung, exponentieller Backoff, Idempotenz-Schluessel pro Event).
+Eintraege ueberleben Neustarts, haengengebliebene Zustellungen werden nach
+Ablauf ihres Leases erneut vergeben.
+
+Zusammenfassen: Eintraege mit gleichem group_key werden verzoegert
+eingestellt (delay = Fenster); wird der erste faellig, holt claim() alle
+offenen Eintraege der Gruppe mit, und der Dispatcher stellt sie ueber
+merge() als ein einziges Event zu. Die Mitglieder werden beim ersten
+Versuch fest an den fuehrenden Eintrag gebunden (leader_id), damit jeder
+Wiederholungsversuch exakt denselben Sammeltermin sendet. content_hash erlaubt das Erkennen
+exakt gleicher Events (find_duplicate).
+
+Beispiel:
+    outbox = EventOutbox('/config/calendar_outbox.db')
+    entry, created = outbox.enqueue({'summary': '...'}, key='alert-4711')
+
+    dispatcher = OutboxDispatcher(outbox, deliver, workers=2, rate_per_second=5, merge=build_digest)
+    dispatcher.start()
+    dispatcher.notify()   # nach enqueue, damit ein Worker sofort aufwacht
+"""
+
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id              INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    payload         TEXT NOT NULL,
+    status          TEXT NOT NULL DEFAULT 'pending',
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    locked_until    REAL NOT NULL DEFAULT 0,
+    created_at      REAL NOT NULL,
+    updated_at      REAL NOT NULL,
+    result          TEXT,
+    last_error      TEXT,
+    group_key       TEXT,
+    content_hash    TEXT,
+    leader_id       INTEGER
+);
+"""
+
+# Nach _SCHEMA und der Migration aelterer Dateien anlegen
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS outbox_group ON outbox (group_key, status);
+CREATE INDEX IF NOT EXISTS outbox_hash ON outbox (content_hash, created_at);
+CREATE INDEX IF NOT EXISTS outbox_leader ON outbox (leader_id);
+"""
+
+_COLUMNS = ('id', 'idempotency_key', 'payload', 'status', 'attempts', 'next_attempt_at',
+            'created_at', 'updated_at', 'result', 'last_error', 'group_key', 'content_hash', 'leader_id')
+
+# Faellige Eintraege und solche, deren Lease abgelaufen ist (Worker abgestuerzt)
+_DUE = """
+SELECT id, group_key FROM outbox
+WHERE (status = 'pending' AND next_attempt_at <= ?) OR (status = 'processing' AND locked_until <= ?)
+ORDER BY next_attempt_at, id LIMIT 1
+"""
+
+
+class EventOutbox:
+    """
+    Warteschlange in einer SQLite-Datei (WAL-Modus), wie CooldownStore.
+
+    Status: pending -> processing -> done | failed (bzw. zurueck auf pending
+    mit spaeterem next_attempt_at). Mitglieder eines Sammeltermins stehen
+    auf grouped, bis ihr fuehrender Eintrag done (-> merged) oder failed ist. claim() vergibt jeden Eintrag atomar an
+    genau einen Worker, auch ueber Prozessgrenzen.
+    """
+
+    # Erledigte Eintraege werden hoechstens so oft aufgeraeumt
+    PURGE_INTERVAL = 3600
+
+    def __init__(self, path, retention_seconds=24 * 3600):
+        self.path = path
+        self.retention_seconds = retention_seconds
+        self._local = threading.local()
+        self._next_purge = 0.0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.executescript(_SCHEMA)
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(outbox)')}
+        for column, sql_type in (('group_key', 'TEXT'), ('content_hash', 'TEXT'), ('leader_id', 'INTEGER')):
+            if column not in columns:
+                conn.execute(f'ALTER TABLE outbox ADD COLUMN {column} {sql_type}')
+        conn.executescript(_INDEXES)
+        # Wie CooldownStore: keine offene Verbindung ueber fork() (gunicorn preload)
+        self.close()
+
+    def _connect(self):
+        """
+        Eine Verbindung pro Thread (sqlite3-Verbindungen sind nicht teilbar)
+        und pro Prozess: nach fork() wird nie die geerbte Verbindung benutzt.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def close(self):
+        """Schliesst die Verbindung des aktuellen Threads (naechster Zugriff oeffnet neu)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+        self._local.conn = None
+
+    @staticmethod
+    def _entry(row):
+        if row is None:
+            return None
+        entry = dict(zip(_COLUMNS, row))
+        entry['payload'] = json.loads(entry['payload'])
+        if entry['result'] is not None:
+            entry['result'] = json.loads(entry['result'])
+        return entry
+
+    def _select(self, where, args):
+        row = self._connect().execute(
+            f"SELECT {', '.join(_COLUMNS)} FROM outbox WHERE {where}", args).fetchone()
+        return self._entry(row)
+
+    def _update(self, assignments, args, ids):
+        placeholders = ', '.join('?' * len(ids))
+        self._connect().execute(f"UPDATE outbox SET {assignments} WHERE id IN ({placeholders})", (*args, *ids))
+
+    # -- Einstellen ------------------------------------------------------
+
+    def enqueue(self, payload, key, group_key=None, delay=0.0, content_hash=None):
+        """
+        Legt ein Event ab, faellig nach delay Sekunden. Ein bereits bekannter
+        Schluessel legt nichts neu an. Gibt (Eintrag, neu_angelegt) zurueck.
+        """
+        now = time.time()
+        cursor = self._connect().execute(
+            'INSERT OR IGNORE INTO outbox (idempotency_key, payload, next_attempt_at, created_at, updated_at, '
+            'group_key, content_hash) VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (key, json.dumps(payload, ensure_ascii=False), now + delay, now, now, group_key, content_hash)
+        )
+        if now >= self._next_purge:
+            self._next_purge = now + self.PURGE_INTERVAL
+            self.purge()
+        return self.get_by_key(key), cursor.rowcount == 1
+
+    def get(self, entry_id):
+        return self._select('id = ?', (entry_id,))
+
+    def get_by_key(self, key):
+        return self._select('idempotency_key = ?', (key,))
+
+    def find_duplicate(self, content_hash, window_seconds):
+        """Juengster nicht gescheiterter Eintrag mit gleichem Inhalt im Zeitfenster."""
+        return self._select(
+            "content_hash = ? AND created_at >= ? AND status != 'failed' ORDER BY id DESC LIMIT 1",
+            (content_hash, time.time() - window_seconds)
+        )
+
+    # -- Abarbeiten ------------------------------------------------------
+
+    def claim(self, lease_seconds=120, max_group=1):
+        """
+        Naechsten faelligen Eintrag fuer lease_seconds reservieren (None = nichts faellig).
+        Hat er einen group_key, werden beim ersten Versuch bis zu max_group - 1
+        offene Eintraege derselben Gruppe (auch noch nicht faellige) an ihn
+        gebunden; spaetere Versuche liefern genau diese Mitglieder wieder,
+        spaeter eingetroffene Events bilden eine eigene Gruppe. Die Mitglieder
+        stehen unter 'members'.
+        """
+        now = time.time()
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(_DUE, (now, now)).fetchone()
+            if row is None:
+                conn.execute('COMMIT')
+                return None
+            ids = [row[0]]
+            member_ids = [member[0] for member in conn.execute(
+                "SELECT id FROM outbox WHERE leader_id = ? AND status = 'grouped' ORDER BY id", (row[0],))]
+            if not member_ids and row[1] is not None and max_group > 1:
+                member_ids = [member[0] for member in conn.execute(
+                    "SELECT id FROM outbox WHERE group_key = ? AND status = 'pending' AND id != ? "
+                    "ORDER BY id LIMIT ?", (row[1], row[0], max_group - 1))]
+                if member_ids:
+                    self._update("status = 'grouped', leader_id = ?, updated_at = ?", (row[0], now), member_ids)
+            ids += member_ids
+            self._update("status = 'processing', attempts = attempts + 1, locked_until = ?, updated_at = ?",
+                         (now + lease_seconds, now), ids[:1])
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        entry = self.get(ids[0])
+        entry['members'] = [self.get(member_id) for member_id in ids[1:]]
+        return entry
+
+    def complete(self, entry_id, result, member_ids=()):
+        now = time.time()
+        self._update("status = 'done', result = ?, last_error = NULL, locked_until = 0, updated_at = ?",
+                     (json.dumps(result, ensure_ascii=False), now), [entry_id])
+        if member_ids:
+            merged = {'success': True, 'merged_into': entry_id, 'event_id': result.get('event_id')}
+            self._update("status = 'merged', result = ?, last_error = NULL, locked_until = 0, updated_at = ?",
+                         (json.dumps(merged), now), list(member_ids))
+
+    def retry(self, entry_id, error, delay, member_ids=()):
+        """Nur der fuehrende Eintrag wartet erneut, Mitglieder bleiben an ihn gebunden."""
+        now = time.time()
+        self._update("status = 'pending', last_error = ?, next_attempt_at = ?, locked_until = 0, updated_at = ?",
+                     (error, now + delay, now), [entry_id])
+
+    def fail(self, entry_id, error, result=None, member_ids=()):
+        self._update("status = 'failed', last_error = ?, result = ?, locked_until = 0, updated_at = ?",
+                     (error, json.dumps(result, ensure_ascii=False) if result is not None else None, time.time()),
+                     [entry_id, *member_ids])
+
+    # -- Status ----------------------------------------------------------
+
+    def counts(self):
+        """{status: Anzahl}"""
+        rows = self._connect().execute('SELECT status, COUNT(*) FROM outbox GROUP BY status').fetchall()
+        return dict(rows)
+
+    def oldest_pending_age(self):
+        """Alter des aeltesten offenen Eintrags in Sekunden (0 = keiner)."""
+        row = self._connect().execute(
+            "SELECT MIN(created_at) FROM outbox WHERE status IN ('pending', 'processing', 'grouped')").fetchone()
+        return max(0.0, time.time() - row[0]) if row[0] else 0.0
+
+    def purge(self):
+        """Loescht erledigte und endgueltig fehlgeschlagene Eintraege nach der Aufbewahrungszeit."""
+        cursor = self._connect().execute(
+            "DELETE FROM outbox WHERE status IN ('done', 'merged', 'failed') AND updated_at <= ?",
+            (time.time() - self.retention_seconds,)
+        )
+        return cursor.rowcount
+
+
+class RateLimiter:
+    """Token-Bucket, threadsicher: hoechstens rate Aufrufe pro Sekunde, Spitzen bis burst."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class OutboxDispatcher:
+    """
+    Worker-Pool, der die Outbox abarbeitet.
+
+    handler(payload, key) gibt ein Ergebnis-Dict zurueck:
+        {'success': True, ...}                      -> done
+        {'success': False, 'retryable': True, ...}  -> spaeter erneut (Backoff)
+        {'success': False, ...}                     -> failed
+    Ausnahmen gelten als wiederholbar. on_give_up(payload, result) wird
+    gerufen, wenn ein Event endgueltig scheitert. merge(payloads) fasst eine
+    Gruppe (gleicher group_key) zu einem Payload zusammen; ohne merge wird
+    nicht gruppiert.
+    """
+
+    def __init__(self, outbox, handler, workers=2, rate_per_second=5.0, max_attempts=8,
+                 base_delay=2.0, max_delay=600.0, lease_seconds=120, poll_interval=0.5, on_give_up=None,
+                 merge=None, max_group=50):
+        self.outbox = outbox
+        self.handler = handler
+        self.workers = workers
+        self.limiter = RateLimiter(rate_per_second)
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.on_give_up = on_give_up
+        self.merge = merge
+        self.max_group = max_group if merge else 1
+        self.stats = {'delivered': 0, 'merged': 0, 'retried': 0, 'failed': 0}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._stats_lock = threading.Lock()
+
+    def start(self):
+        if self._threads:
+            return
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, daemon=True, name=f'outbox-{i}')
+            thread.start()
+            self._threads.append(thread)
+        print(f"Outbox-Dispatcher gestartet ({self.workers} Worker, {self.limiter.rate}/s)")
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def notify(self):
+        """Weckt einen wartenden Worker (neues Event in diesem Prozess)."""
+        self._wake.set()
+
+    def backoff(self, attempts):
+        """Exponentieller Backoff mit vollem Jitter."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempts - 1)))
+
+    def _count(self, name, count=1):
+        with self._stats_lock:
+            self.stats[name] += count
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                entry = self.outbox.claim(self.lease_seconds, self.max_group)
+            except sqlite3.Error as e:
+                print(f"Outbox nicht lesbar: {e}")
+                entry = None
+            if entry is None:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+            self.limiter.acquire()
+            self._process(entry)
+
+    def _process(self, entry):
+        members = entry.get('members') or []
+        member_ids = [member['id'] for member in members]
+        payloads = [entry['payload']] + [member['payload'] for member in members]
+        try:
+            payload = self.merge(payloads) if members else entry['payload']
+            result = self.handler(payload, entry['idempotency_key'])
+        except Exception as e:
+            result = {'success': False, 'error': str(e), 'retryable': True}
+
+        if result.get('success'):
+            if members:
+                result['merged_count'] = len(payloads)
+                print(f"Outbox #{entry['id']}: {len(payloads)} Events als Sammeltermin zugestellt")
+            self.outbox.complete(entry['id'], result, member_ids)
+            self._count('delivered')
+            self._count('merged', len(members))
+            return
+
+        error = result.get('error', 'unbekannter Fehler')
+        if result.get('retryable') and entry['attempts'] < self.max_attempts:
+            delay = max(result.get('retry_after') or 0, self.backoff(entry['attempts']))
+            self.outbox.retry(entry['id'], error, delay, member_ids)
+            self._count('retried')
+            print(f"Outbox #{entry['id']}: Versuch {entry['attempts']} fehlgeschlagen ({error}), "
+                  f"neuer Versuch in {delay:.0f}s")
+            return
+
+        self.outbox.fail(entry['id'], error, result, member_ids)
+        self._count('failed', len(payloads))
+        print(f"Outbox #{entry['id']}: endgueltig fehlgeschlagen nach {entry['attempts']} Versuchen ({error})")
+        if self.on_give_up:
+            for payload in payloads:
+                try:
+                    self.on_give_up(payload, result)
+                except Exception as e:
+                    print(f"Outbox #{entry['id']}: on_give_up Fehler: {e}")
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Flotten-Reifencheck fuer Smart-Car
+Gruppiert Fahrzeuge nach Rasterzelle ihres Standorts, holt das Wetter pro
+Zelle parallel, wertet die Empfehlungen gesammelt aus und gibt
+Kalender-Eintraege an einen begrenzten Worker-Pool ab. Die Dauer eines
+Checks haengt so von der langsamsten Zelle ab, nicht von der Flottengroesse.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+class FleetChecker:
+    """
+    Reifencheck fuer viele Fahrzeuge.
+
+    fetch_weather(lat, lon) -> Wetter-Dict (lat/lon None = Standardort)
+    locate(vehicles)        -> {vehicle_id: (lat, lon)} fuer bekannte Standorte
+    evaluate_many(samples)  -> Empfehlungen fuer [(temp_c, weather_main), ...]
+    check(vehicle, rec)     -> Ergebnis von check_tire_change_needed
+    notify(items)           -> {vehicle_id: event_id} fuer [(vehicle, check, rec), ...]
+    """
+
+    def __init__(self, fetch_weather, locate, evaluate_many, check, notify,
+                 grid_decimals=2, weather_workers=8, notify_workers=2, notify_batch=50):
+        self.fetch_weather = fetch_weather
+        self.locate = locate
+        self.evaluate_many = evaluate_many
+        self.check = check
+        self.notify = notify
+        self.grid_decimals = grid_decimals
+        self.notify_batch = notify_batch
+        self._weather_pool = ThreadPoolExecutor(max_workers=weather_workers, thread_name_prefix='fleet-weather')
+        self._notify_pool = ThreadPoolExecutor(max_workers=notify_workers, thread_name_prefix='fleet-calendar')
+        self.last_duration = None
+
+    def cell_of(self, position):
+        """Rasterzelle einer Position (None = Standardort des Weather-Service)."""
+        if position is None:
+            return None
+        lat, lon = position
+        return (round(float(lat), self.grid_decimals), round(float(lon), self.grid_decimals))
+
+    def group_by_cell(self, vehicles):
+        """{Zelle: [Fahrzeuge]}"""
+        positions = self.locate(vehicles)
+        cells = {}
+        for vehicle in vehicles:
+            cell = self.cell_of(positions.get(vehicle.get('vehicle_id')))
+            cells.setdefault(cell, []).append(vehicle)
+        return cells
+
+    def fetch_cells(self, cells):
+        """Wetter fuer alle Zellen parallel. {Zelle: Wetter-Dict oder None}"""
+        def fetch(cell):
+            try:
+                return self.fetch_weather(*(cell if cell is not None else (None, None)))
+            except Exception as e:
+                print(f"Wetter fuer Zelle {cell} nicht verfuegbar: {e}")
+                return None
+
+        futures = {cell: self._weather_pool.submit(fetch, cell) for cell in cells}
+        return {cell: future.result() for cell, future in futures.items()}
+
+    def weather_for(self, vehicle):
+        """(Zelle, Wetter-Dict oder None) fuer ein einzelnes Fahrzeug, wie im Flotten-Check."""
+        cell = self.cell_of(self.locate([vehicle]).get(vehicle.get('vehicle_id')))
+        return cell, self.fetch_cells([cell])[cell]
+
+    def dispatch_notifications(self, items):
+        """Verteilt Kalender-Eintraege in Batches auf den Worker-Pool."""
+        futures = []
+        for offset in range(0, len(items), self.notify_batch):
+            futures.append(self._notify_pool.submit(self.notify, items[offset:offset + self.notify_batch]))
+        return futures
+
+    def run(self, vehicles, date=None, wait_for_notify=False, notify_timeout=30):
+        """
+        Fuehrt den Check aus.
+        Gibt (Zellen, Ergebnisse) zurueck: Zellen als Liste mit Wetter und
+        Empfehlung, Ergebnisse pro Fahrzeug in Eingabereihenfolge.
+        """
+        started = time.perf_counter()
+        cells = self.group_by_cell(vehicles)
+        weather_by_cell = self.fetch_cells(cells)
+
+        # Nutzbare Zellen gesammelt bewerten (Saison nur einmal bestimmen)
+        usable = [cell for cell, weather in weather_by_cell.items()
+                  if weather and weather.get('temperature_c') is not None]
+        samples = [(weather_by_cell[cell].get('temperature_c', 10), weather_by_cell[cell].get('weather_main', ''))
+                   for cell in usable]
+        recommendations = dict(zip(usable, self.evaluate_many(samples, date)))
+
+        cell_info = []
+        for cell, cell_vehicles in cells.items():
+            weather = weather_by_cell.get(cell)
+            cell_info.append({
+                'cell': list(cell) if cell is not None else None,
+                'vehicles': len(cell_vehicles),
+                'weather': {
+                    'temperature_c': weather.get('temperature_c'),
+                    'condition': weather.get('weather_main', ''),
+                    'location': weather.get('location_name', 'Unbekannt'),
+                    'is_fallback': weather.get('is_fallback', False)
+                } if weather else None,
+                'recommendation': recommendations.get(cell)
+            })
+
+        results = {}
+        to_notify = []
+        for cell, cell_vehicles in cells.items():
+            recommendation = recommendations.get(cell)
+            for vehicle in cell_vehicles:
+                vehicle_id = vehicle.get('vehicle_id')
+                result = {
+                    'vehicle_id': vehicle_id,
+                    'display_name': vehicle.get('display_name'),
+                    'current_tires': vehicle.get('tires', {}).get('current', 'unknown'),
+                    'weather_cell': list(cell) if cell is not None else None,
+                    'recommendation': recommendation,
+                    'calendar_event_created': False
+                }
+                if recommendation is None:
+                    result['check_result'] = {'change_needed': False, 'message': 'Wetterdaten nicht verfügbar',
+                                              'urgency': 'unknown'}
+                else:
+                    check = self.check(vehicle, recommendation)
+                    result['check_result'] = check
+                    # Bei kritischem Wechselbedarf -> Kalender-Eintrag (Worker-Pool)
+                    if check['change_needed'] and check['urgency'] in ['critical', 'high']:
+                        to_notify.append((vehicle, check, recommendation))
+                        result['calendar_event_queued'] = True
+                results[vehicle_id] = result
+
+        futures = self.dispatch_notifications(to_notify) if to_notify else []
+        if wait_for_notify and futures:
+            done, _ = wait(futures, timeout=notify_timeout)
+            for future in done:
+                try:
+                    event_ids = future.result()
+                except Exception as e:
+                    print(f"Kalender-Worker Fehler: {e}")
+                    continue
+                for vehicle_id, event_id in event_ids.items():
+                    if vehicle_id in results:
+                        results[vehicle_id]['calendar_event_created'] = event_id is not None
+
+        self.last_duration = time.perf_counter() - started
+        return cell_info, [results[v.get('vehicle_id')] for v in vehicles]
@@ -14,13 +14,11 @@ import os
 import sys
 from datetime import datetime, timedelta
 
-# Versuche Google API Client zu importieren
-try:
-    from google.oauth2 import service_account
-    from googleapiclient.discovery import build
-    GOOGLE_API_AVAILABLE = True
-except ImportError:
-    GOOGLE_API_AVAILABLE = False
+from smartcar import google_api
+
+# Google API Client wird erst in get_calendar_service() importiert
+GOOGLE_API_AVAILABLE = google_api.available()
+if not GOOGLE_API_AVAILABLE:
     print("⚠️  Google API Client nicht installiert!")
     print("   Installiere mit: pip install google-api-python-client google-auth")
 
@@ -55,10 +53,11 @@ def get_calendar_service():
         return None
     
     try:
-        credentials = service_account.Credentials.from_service_account_file(
+        google = google_api.load()
+        credentials = google.service_account.Credentials.from_service_account_file(
             KEY_FILE, scopes=SCOPES
         )
-        service = build('calendar', 'v3', credentials=credentials)
+        service = google.build('calendar', 'v3', credentials=credentials)
         print("✅ Google Calendar Service verbunden")
         return service
     except Exception as e:
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Lokaler Spool fuer nicht geschriebene InfluxDB-Batches
+Fehlgeschlagene Batches werden als Line Protocol an Segment-Dateien
+angehaengt (append-only, fsync). Ist die Datenbank wieder erreichbar,
+werden die Segmente aeltestes zuerst nachgeliefert: dedupliziert auf
+(Serie, Zeitstempel), nach Zeit sortiert, in Batches und mit begrenzter
+Rate, damit der laufende Betrieb nicht ausgebremst wird.
+
+Die Gesamtgroesse ist begrenzt; bei Ueberlauf werden die aeltesten Segmente
+verworfen. Doppelt gelieferte Punkte sind unkritisch, InfluxDB ueberschreibt
+gleiche Serie + Zeitstempel.
+"""
+
+import os
+import threading
+import time
+
+
+def series_key(line):
+    """Measurement + Tags einer Zeile (bis zum ersten unmaskierten Leerzeichen)."""
+    index = 0
+    while True:
+        index = line.find(' ', index)
+        if index <= 0 or line[index - 1] != '\\':
+            return line if index < 0 else line[:index]
+        index += 1
+
+
+def line_timestamp(line):
+    """Zeitstempel (ns) am Zeilenende, 0 wenn keiner vorhanden."""
+    tail = line.rsplit(' ', 1)[-1]
+    return int(tail) if tail.isdigit() else 0
+
+
+def dedup_sorted(lines):
+    """Entfernt doppelte (Serie, Zeitstempel), die letzte Zeile gewinnt; sortiert nach Zeit."""
+    unique = {}
+    for line in lines:
+        unique[(series_key(line), line_timestamp(line))] = line
+    return [unique[key] for key in sorted(unique, key=lambda key: key[1])]
+
+
+class LineSpool:
+    """
+    Segmentierter Spool in einem Verzeichnis.
+
+        spool.append(lines)        # aus on_failure des Writers
+        spool.replay(send)         # send(lines) -> bool
+    """
+
+    def __init__(self, directory, max_bytes=50 * 1024 * 1024, segment_bytes=1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+        self._lock = threading.Lock()
+        self._current = None      # Pfad des Segments, an das angehaengt wird
+        os.makedirs(directory, exist_ok=True)
+
+    # -- Schreiben -------------------------------------------------------
+
+    def _segments(self):
+        names = sorted(name for name in os.listdir(self.directory) if name.endswith('.lp'))
+        return [os.path.join(self.directory, name) for name in names]
+
+    def _new_segment(self):
+        return os.path.join(self.directory, f"{time.time_ns():020d}.lp")
+
+    def append(self, lines):
+        """Haengt Zeilen dauerhaft an (fsync), rotiert und begrenzt die Groesse."""
+        if not lines:
+            return
+        data = ('\n'.join(lines) + '\n').encode('utf-8')
+        with self._lock:
+            if self._current is None or not os.path.exists(self._current) \
+                    or os.path.getsize(self._current) >= self.segment_bytes:
+                self._current = self._new_segment()
+            with open(self._current, 'ab') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            self._enforce_limit()
+
+    def _enforce_limit(self):
+        segments = self._segments()
+        sizes = {path: os.path.getsize(path) for path in segments}
+        total = sum(sizes.values())
+        for path in segments:
+            if total <= self.max_bytes or path == self._current:
+                break
+            os.remove(path)
+            total -= sizes[path]
+            print(f"Spool voll - aeltestes Segment verworfen: {os.path.basename(path)}")
+
+    # -- Status ----------------------------------------------------------
+
+    def size_bytes(self):
+        with self._lock:
+            return sum(os.path.getsize(path) for path in self._segments())
+
+    def is_empty(self):
+        with self._lock:
+            return not self._segments()
+
+    # -- Nachliefern -----------------------------------------------------
+
+    def replay(self, send, batch_size=5000, max_lines=20000, lines_per_second=2000):
+        """
+        Liefert Segmente aeltestes zuerst nach, bis max_lines erreicht sind.
+        Ein Segment wird erst nach vollstaendigem Erfolg geloescht; beim
+        ersten Fehler wird abgebrochen. Gibt die Anzahl gesendeter Zeilen zurueck.
+        """
+        with self._lock:
+            segments = self._segments()
+            if self._current in segments:
+                # Neue Fehler landen ab jetzt in einem neuen Segment
+                self._current = None
+
+        sent = 0
+        for path in segments:
+            if sent >= max_lines:
+                break
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    lines = dedup_sorted(line.rstrip('\n') for line in f if line.strip())
+            except FileNotFoundError:
+                continue
+            for start in range(0, len(lines), batch_size):
+                batch = lines[start:start + batch_size]
+                started = time.monotonic()
+                if not send(batch):
+                    return sent
+                sent += len(batch)
+                if lines_per_second > 0:
+                    # Rate begrenzen: Batch darf nicht schneller als erlaubt gehen
+                    time.sleep(max(0.0, len(batch) / lines_per_second - (time.monotonic() - started)))
+            with self._lock:
+                if os.path.exists(path):
+                    os.remove(path)
+        return sent
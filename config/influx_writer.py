@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Gebuendelter InfluxDB-Writer fuer Smart-Car
+Ein langlebiger Client fuer den ganzen Prozess. Punkte werden gepuffert und
+als Line Protocol in einer Anfrage pro Batch geschrieben (gzip), entweder
+explizit per flush() oder spaetestens nach flush_interval durch einen
+Hintergrund-Thread. Voruebergehende Fehler (Verbindung, 429, 5xx) werden mit
+exponentiellem Backoff und Jitter wiederholt.
+"""
+
+import atexit
+import random
+import threading
+import time
+
+from influxdb_client import InfluxDBClient, WritePrecision
+from influxdb_client.client.write_api import SYNCHRONOUS
+from influxdb_client.rest import ApiException
+
+# HTTP-Status, bei denen sich ein neuer Versuch lohnt
+RETRY_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+def to_line_protocol(record, now_ns=None):
+    """
+    Point oder Line-Protocol-String -> eine Zeile.
+    Punkte ohne Zeitstempel bekommen den Zeitpunkt der Uebergabe, damit
+    das Puffern die Messzeit nicht verschiebt.
+    """
+    if isinstance(record, bytes):
+        return record.decode('utf-8')
+    if isinstance(record, str):
+        return record
+    if getattr(record, '_time', None) is None:
+        record.time(now_ns or time.time_ns(), WritePrecision.NS)
+    return record.to_line_protocol()
+
+
+def describe_error(error):
+    """Kurzform fuer Logs (ApiException enthaelt sonst alle Header)."""
+    if isinstance(error, ApiException):
+        return f"HTTP {error.status} {error.reason}"
+    return str(error)
+
+
+def is_retryable(error):
+    """Verbindungsfehler und voruebergehende HTTP-Status (nicht z.B. 400 bei kaputten Daten)."""
+    if isinstance(error, ApiException):
+        return error.status in RETRY_STATUS
+    return True
+
+
+class InfluxBatchWriter:
+    """
+    Thread-sicherer, gebuendelter Writer.
+
+        writer = InfluxBatchWriter(url, token, org, bucket)
+        writer.write(points)   # puffert nur
+        writer.flush()         # eine Anfrage (bis batch_size Zeilen)
+
+    on_failure(lines, error) wird fuer Batches aufgerufen, die endgueltig
+    nicht geschrieben werden konnten (z.B. um sie zu spoolen).
+
+    Mit client_factory nutzt der Writer einen fremden Client (z.B.
+    smartcar.influx.get_client) und schliesst ihn nicht selbst.
+    """
+
+    def __init__(self, url, token, org, bucket, batch_size=5000, flush_interval=10.0,
+                 max_retries=5, retry_interval=1.0, max_retry_delay=30.0,
+                 gzip=True, timeout_ms=10000, on_failure=None, client_factory=None):
+        self.url = url
+        self.token = token
+        self.org = org
+        self.bucket = bucket
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_interval = retry_interval
+        self.max_retry_delay = max_retry_delay
+        self.gzip = gzip
+        self.timeout_ms = timeout_ms
+        self.on_failure = on_failure
+        self._client_factory = client_factory
+
+        self._buffer = []
+        self._buffer_lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._client = None
+        self._write_api = None
+        self._thread = None
+        self.stats = {'points': 0, 'requests': 0, 'retries': 0, 'failed_points': 0}
+
+    # -- Client ----------------------------------------------------------
+
+    def _get_write_api(self):
+        if self._client_factory is not None:
+            client = self._client_factory()
+            if client is not self._client:
+                self._client = client
+                self._write_api = client.write_api(write_options=SYNCHRONOUS)
+            return self._write_api
+        if self._write_api is None:
+            self._client = InfluxDBClient(url=self.url, token=self.token, org=self.org,
+                                          enable_gzip=self.gzip, timeout=self.timeout_ms)
+            self._write_api = self._client.write_api(write_options=SYNCHRONOUS)
+        return self._write_api
+
+    @property
+    def client(self):
+        """Der gemeinsame InfluxDBClient (auch fuer Abfragen)."""
+        self._get_write_api()
+        return self._client
+
+    # -- Puffer ----------------------------------------------------------
+
+    def start(self):
+        """Startet den Hintergrund-Flush (idempotent)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True, name='influx-batch-writer')
+            self._thread.start()
+            atexit.register(self.close)
+        return self
+
+    def write(self, records):
+        """Puffert einen Point, einen String oder eine Liste davon."""
+        if records is None:
+            return 0
+        if not isinstance(records, (list, tuple)):
+            records = [records]
+        now_ns = time.time_ns()
+        lines = [to_line_protocol(record, now_ns) for record in records if record is not None]
+        with self._buffer_lock:
+            self._buffer.extend(lines)
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self._wakeup.set()
+        return len(lines)
+
+    def pending(self):
+        with self._buffer_lock:
+            return len(self._buffer)
+
+    def flush(self):
+        """
+        Schreibt den Puffer sofort, blockierend.
+        Gibt True zurueck, wenn alle Batches geschrieben wurden.
+        """
+        with self._send_lock:
+            with self._buffer_lock:
+                lines, self._buffer = self._buffer, []
+            ok = True
+            for start in range(0, len(lines), self.batch_size):
+                ok = self._send(lines[start:start + self.batch_size]) and ok
+            return ok
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if self.pending():
+                self.flush()
+
+    def close(self):
+        """Schreibt den Rest und schliesst den Client."""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+        if self._client is not None and self._client_factory is None:
+            self._client.close()
+            self._client = None
+            self._write_api = None
+
+    def ping(self):
+        """True, wenn InfluxDB erreichbar ist."""
+        try:
+            return self.client.ping()
+        except Exception:
+            return False
+
+    def send(self, lines, max_retries=0):
+        """
+        Schreibt Zeilen sofort, am Puffer vorbei und ohne on_failure
+        (z.B. zum Nachliefern aus dem Spool).
+        """
+        return self._send(lines, max_retries=max_retries, report=False)
+
+    # -- Senden ----------------------------------------------------------
+
+    def _retry_delay(self, attempt, error):
+        """Exponentieller Backoff mit vollem Jitter, Retry-After hat Vorrang."""
+        retry_after = None
+        headers = getattr(error, 'headers', None)
+        if headers:
+            try:
+                retry_after = float(headers.get('Retry-After'))
+            except (TypeError, ValueError):
+                pass
+        if retry_after is not None:
+            return min(retry_after, self.max_retry_delay)
+        ceiling = min(self.max_retry_delay, self.retry_interval * (2 ** attempt))
+        return random.uniform(self.retry_interval / 2, ceiling)
+
+    def _send(self, lines, max_retries=None, report=True):
+        if not lines:
+            return True
+        max_retries = self.max_retries if max_retries is None else max_retries
+        body = '\n'.join(lines)
+        attempt = 0
+        while True:
+            try:
+                self._get_write_api().write(bucket=self.bucket, org=self.org, record=body,
+                                            write_precision=WritePrecision.NS)
+                self.stats['requests'] += 1
+                self.stats['points'] += len(lines)
+                return True
+            except Exception as e:
+                if not is_retryable(e) or attempt >= max_retries or self._stopped.is_set():
+                    print(f"InfluxDB Fehler ({len(lines)} Punkte nicht geschrieben): {describe_error(e)}")
+                    if report:
+                        self.stats['failed_points'] += len(lines)
+                        if self.on_failure is not None:
+                            self.on_failure(lines, e)
+                    return False
+                delay = self._retry_delay(attempt, e)
+                attempt += 1
+                self.stats['retries'] += 1
+                print(f"InfluxDB Fehler, Versuch {attempt}/{max_retries} in {delay:.1f}s: {describe_error(e)}")
+                time.sleep(delay)
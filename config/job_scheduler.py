@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Periodischer Job-Scheduler fuer Smart-Car
+Jeder Job laeuft in festem Takt (fixed rate): die Ticks liegen bei
+start + k * interval, die Laufzeit eines Jobs verschiebt den naechsten Tick
+nicht. Pro Tick kommt ein zufaelliger Jitter dazu, damit nicht alle Jobs
+gleichzeitig auf die Backends zugreifen.
+
+Jobs laufen parallel in einem kleinen Thread-Pool. Laeuft ein Job beim
+naechsten Tick noch, wird dieser Tick uebersprungen (keine Ueberlappung).
+Laufzeiten und Ergebnisse landen in service_metrics.Metrics.
+"""
+
+import heapq
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Job:
+    """Ein registrierter Job mit Takt und Zustand."""
+
+    def __init__(self, name, func, interval, jitter=0.0):
+        self.name = name
+        self.func = func
+        self.interval = float(interval)
+        self.jitter = float(jitter)
+        self.base = None          # Tick ohne Jitter
+        self.running = False
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.last_duration = None
+
+    def next_tick(self, base):
+        """Ausfuehrungszeit fuer einen Tick (Jitter nur nach hinten)."""
+        return base + (random.uniform(0, self.jitter) if self.jitter > 0 else 0)
+
+
+class JobScheduler:
+    """
+    scheduler = JobScheduler(max_workers=4, metrics=Metrics('collector'))
+    scheduler.add_job('weather', collect_weather, interval=300, jitter=5)
+    scheduler.run_forever()
+    """
+
+    def __init__(self, max_workers=4, metrics=None):
+        self.metrics = metrics
+        self.jobs = {}
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._queue = []          # (faellig, laufende Nummer, Job)
+        self._counter = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+
+    def add_job(self, name, func, interval, jitter=0.0, initial_delay=0.0):
+        """Registriert einen Job; der erste Tick liegt initial_delay Sekunden in der Zukunft."""
+        if name in self.jobs:
+            raise ValueError(f"Job '{name}' ist bereits registriert")
+        if interval <= 0:
+            raise ValueError(f"Intervall fuer '{name}' muss > 0 sein")
+        job = Job(name, func, interval, jitter)
+        job.base = time.monotonic() + initial_delay
+        with self._lock:
+            self.jobs[name] = job
+            self._push(job.next_tick(job.base), job)
+        self._wakeup.set()
+        return job
+
+    def _push(self, due, job):
+        self._counter += 1
+        heapq.heappush(self._queue, (due, self._counter, job))
+
+    def _advance(self, job, now):
+        """Naechster Tick; verpasste Ticks (z.B. nach Suspend) werden uebersprungen."""
+        job.base += job.interval
+        missed = 0
+        while job.base <= now:
+            job.base += job.interval
+            missed += 1
+        if missed:
+            job.skipped += missed
+            self._inc('job_skipped', job, missed)
+        self._push(job.next_tick(job.base), job)
+
+    def _inc(self, name, job, value=1, **labels):
+        if self.metrics is not None:
+            self.metrics.inc(name, dict(labels, job=job.name), value)
+
+    def _dispatch(self, job):
+        if job.running:
+            job.skipped += 1
+            self._inc('job_skipped', job)
+            print(f"[{job.name}] laeuft noch - Tick uebersprungen")
+            return
+        job.running = True
+        self._pool.submit(self._execute, job)
+
+    def _execute(self, job):
+        started = time.perf_counter()
+        result = 'ok'
+        try:
+            if job.func() is False:
+                result = 'failed'
+        except Exception as e:
+            result = 'error'
+            print(f"[{job.name}] Fehler: {e}")
+        finally:
+            duration = time.perf_counter() - started
+            job.last_duration = duration
+            job.runs += 1
+            if result != 'ok':
+                job.failures += 1
+            if self.metrics is not None:
+                self.metrics.observe('job', duration, {'job': job.name})
+            self._inc('job_runs', job, result=result)
+            job.running = False
+
+    def run_forever(self):
+        """Blockiert bis stop()."""
+        while not self._stopped.is_set():
+            with self._lock:
+                now = time.monotonic()
+                while self._queue and self._queue[0][0] <= now:
+                    _, _, job = heapq.heappop(self._queue)
+                    self._dispatch(job)
+                    self._advance(job, now)
+                timeout = self._queue[0][0] - now if self._queue else None
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
+
+    def start(self):
+        """run_forever() in einem Hintergrund-Thread."""
+        thread = threading.Thread(target=self.run_forever, daemon=True, name='job-scheduler')
+        thread.start()
+        return thread
+
+    def stop(self, wait=True):
+        self._stopped.set()
+        self._wakeup.set()
+        self._pool.shutdown(wait=wait)
+
+    def status(self):
+        """Zustand aller Jobs (z.B. fuer Logs)."""
+        return {
+            name: {
+                'interval_s': job.interval,
+                'running': job.running,
+                'runs': job.runs,
+                'failures': job.failures,
+                'skipped': job.skipped,
+                'last_duration_ms': round(job.last_duration * 1000, 1) if job.last_duration is not None else None
+            }
+            for name, job in self.jobs.items()
+        }
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Produktions-Start fuer die Flask-Services von Smart-Car
+Startet einen Service unter gunicorn (gthread) statt mit dem
+Werkzeug-Entwicklungsserver von app.run().
+
+Nutzung:
+    python /config/serve.py tire_service
+    WEB_WORKERS=4 WEB_THREADS=16 python /config/serve.py weather_service
+
+    # Alter Modus (Entwicklungsserver)
+    SERVER_MODE=dev python /config/serve.py tire_service
+
+Graceful Reload (Worker werden nacheinander ersetzt, laufende Anfragen
+werden fertig bearbeitet):
+    docker kill -s HUP tire-service
+
+Konfiguration (Umgebungsvariablen):
+    WEB_WORKERS           Prozesse (Standard je Service, siehe SERVICES)
+    WEB_THREADS           Threads pro Prozess (8)
+    WEB_KEEPALIVE         Sekunden fuer Keep-Alive-Verbindungen (75, > Proxy-/Client-Timeout)
+    WEB_TIMEOUT           Worker-Timeout in Sekunden (60)
+    WEB_GRACEFUL_TIMEOUT  Wartezeit beim Reload/Stop (30)
+    WEB_MAX_REQUESTS      Worker nach n Anfragen ersetzen (0 = nie)
+    WEB_PRELOAD           App im Master laden (1)
+"""
+
+import os
+import sys
+import fcntl
+import importlib
+import threading
+
+from smartcar import settings
+
+CONFIG_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Port, Standard-Worker und ob Hintergrund-Jobs nur einmal laufen duerfen
+SERVICES = {
+    # Outbox-Worker nur einmal, damit die Ratenbegrenzung fuer Google gilt
+    'calendar_webhook': {'port': 5000, 'workers': 2, 'single_job_runner': True},
+    # Vorhersage-Prefetch pro Worker: jeder haelt seine Vorhersagen im eigenen
+    # Speicher und erneuert nur die Zellen, die er selbst ausgeliefert hat.
+    # Zellen, die beide Worker bedienen, kosten doppelte OWM-Abrufe
+    # (WEB_WORKERS=1 bei knappem API-Kontingent).
+    # /metrics und /debug/cache zeigen ebenfalls nur den antwortenden Worker
+    # (Label worker=<pid>): Prometheus muss jeden Worker einzeln abfragen
+    # oder WEB_WORKERS=1 setzen, sonst springen die Zaehler zwischen Prozessen
+    'weather_service': {'port': 5001, 'workers': 2, 'single_job_runner': False},
+    # active_trips liegt im Prozess-Speicher -> nur ein Prozess
+    'trip_processor': {'port': 5002, 'workers': 1, 'single_job_runner': False},
+    # influx_updater darf nicht in jedem Worker laufen
+    'tire_service': {'port': 5003, 'workers': 2, 'single_job_runner': True},
+}
+
+
+def start_jobs(module, service, single_job_runner):
+    """
+    Startet die Hintergrund-Jobs eines Service im Worker.
+    Bei single_job_runner bekommt nur der Worker mit der Sperre die Jobs;
+    stirbt er, uebernimmt der naechste.
+    """
+    start = getattr(module, 'start_background_jobs', None)
+    if start is None:
+        return
+    if not single_job_runner:
+        start()
+        return
+
+    def wait_for_lock():
+        lock_file = open(f'/tmp/smartcar-{service}.jobs.lock', 'a')
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)  # blockiert bis frei
+        print(f"[{service}] Worker {os.getpid()} uebernimmt die Hintergrund-Jobs")
+        start()
+        # Datei bleibt offen, die Sperre endet mit dem Prozess
+        threading.Event().wait()
+
+    threading.Thread(target=wait_for_lock, daemon=True, name='job-runner-lock').start()
+
+
+def run_dev(module, port):
+    if hasattr(module, 'start_background_jobs'):
+        module.start_background_jobs()
+    module.app.run(host='0.0.0.0', port=port, debug=False, threaded=True)
+
+
+def run_gunicorn(service, service_config, port):
+    from gunicorn.app.base import BaseApplication
+
+    workers = settings.env_int('WEB_WORKERS', service_config['workers'])
+    options = {
+        'bind': f"0.0.0.0:{port}",
+        'worker_class': 'gthread',
+        'workers': workers,
+        'threads': settings.env_int('WEB_THREADS', 8),
+        'keepalive': settings.env_int('WEB_KEEPALIVE', 75),
+        'timeout': settings.env_int('WEB_TIMEOUT', 60),
+        'graceful_timeout': settings.env_int('WEB_GRACEFUL_TIMEOUT', 30),
+        'max_requests': settings.env_int('WEB_MAX_REQUESTS', 0),
+        'max_requests_jitter': settings.env_int('WEB_MAX_REQUESTS', 0) // 10,
+        'preload_app': settings.env_bool('WEB_PRELOAD', True),
+        'accesslog': settings.env_str('WEB_ACCESSLOG') or None,
+        'errorlog': '-',
+        'loglevel': settings.env_str('WEB_LOGLEVEL', 'info'),
+        'proc_name': f'smartcar-{service}',
+    }
+
+    class ServiceApplication(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+            # Jobs erst nach dem Fork starten (Threads ueberleben fork() nicht)
+            self.cfg.set('post_fork', lambda server, worker: start_jobs(
+                importlib.import_module(service), service, service_config['single_job_runner']))
+
+        def load(self):
+            return importlib.import_module(service).app
+
+    print(f"{service}: gunicorn gthread auf Port {port} "
+          f"({options['workers']} Worker x {options['threads']} Threads, keepalive {options['keepalive']}s, "
+          f"preload {options['preload_app']})")
+    ServiceApplication().run()
+
+
+def main():
+    if len(sys.argv) != 2 or sys.argv[1] not in SERVICES:
+        print(f"Nutzung: python serve.py <{'|'.join(SERVICES)}>")
+        sys.exit(1)
+
+    service = sys.argv[1]
+    service_config = SERVICES[service]
+    port = settings.env_int('PORT', service_config['port'])
+    sys.path.insert(0, CONFIG_DIR)
+
+    if settings.env_str('SERVER_MODE', 'prod') == 'dev':
+        print(f"{service}: Entwicklungsserver auf Port {port}")
+        run_dev(importlib.import_module(service), port)
+    else:
+        run_gunicorn(service, service_config, port)
+
+
+if __name__ == '__main__':
+    main()
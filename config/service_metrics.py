@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Einfache Metriken fuer die Smart-Car Services
+Zaehler und Latenz-Histogramme im Speicher, Ausgabe als JSON oder im
+Prometheus-Textformat.
+"""
+
+import os
+import threading
+from bisect import bisect_left
+
+# Latenz-Buckets in Sekunden (1 ms bis 10 s)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items())) if labels else ()
+
+
+def _format_labels(key, extra=None):
+    pairs = list(key) + (list(extra) if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in pairs) + '}'
+
+
+class Metrics:
+    """
+    Thread-sichere Zaehler und Histogramme mit optionalen Labels.
+
+    Die Werte liegen im Speicher des Prozesses. Laeuft ein Service mit
+    mehreren Workern, setzt `per_process` an jede Zeile das Label
+    worker="<pid>": jeder Worker liefert eine eigene, monotone Reihe, die
+    Summe bildet erst Prometheus (sum without(worker)).
+    """
+
+    def __init__(self, prefix, buckets=DEFAULT_BUCKETS, per_process=False):
+        self.prefix = prefix
+        self.per_process = per_process
+        self.buckets = tuple(buckets)
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, labels=None, value=1):
+        """Erhoeht einen Zaehler."""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, labels=None):
+        """Traegt eine Dauer in das Histogramm `name` ein."""
+        key = (name, _label_key(labels))
+        idx = bisect_left(self.buckets, seconds)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+            hist['counts'][idx] += 1
+            hist['sum'] += seconds
+            hist['count'] += 1
+
+    def counter(self, name, labels=None):
+        return self._counters.get((name, _label_key(labels)), 0)
+
+    def counters_by_label(self, name, label):
+        """{Labelwert: Zaehlerstand} fuer alle Zaehler `name`."""
+        result = {}
+        with self._lock:
+            for (counter_name, key), value in self._counters.items():
+                if counter_name == name:
+                    result[dict(key).get(label, '')] = value
+        return result
+
+    def _quantile(self, hist, q):
+        """Schaetzt ein Quantil aus den Bucket-Grenzen (obere Grenze)."""
+        if hist['count'] == 0:
+            return None
+        target = q * hist['count']
+        running = 0
+        for bound, count in zip(self.buckets, hist['counts']):
+            running += count
+            if running >= target:
+                return bound
+        return float('inf')
+
+    def snapshot(self):
+        """Alle Werte als JSON-taugliches Dict."""
+        with self._lock:
+            counters = [
+                {'name': name, 'labels': dict(key), 'value': value}
+                for (name, key), value in sorted(self._counters.items())
+            ]
+            histograms = []
+            for (name, key), hist in sorted(self._histograms.items()):
+                histograms.append({
+                    'name': name,
+                    'labels': dict(key),
+                    'count': hist['count'],
+                    'avg_ms': round(hist['sum'] / hist['count'] * 1000, 3) if hist['count'] else None,
+                    'p50_ms': self._ms(self._quantile(hist, 0.5)),
+                    'p95_ms': self._ms(self._quantile(hist, 0.95)),
+                    'p99_ms': self._ms(self._quantile(hist, 0.99))
+                })
+        snapshot = {'counters': counters, 'histograms': histograms}
+        if self.per_process:
+            snapshot['worker_pid'] = os.getpid()
+        return snapshot
+
+    def worker_labels(self):
+        """Zusaetzliche Labels fuer jede Zeile (pid erst beim Rendern, Worker entstehen per fork)."""
+        return [('worker', os.getpid())] if self.per_process else []
+
+    @staticmethod
+    def _ms(value):
+        if value is None or value == float('inf'):
+            return value if value is None else 'inf'
+        return value * 1000
+
+    def render_prometheus(self):
+        """Ausgabe im Prometheus-Textformat (text/plain; version=0.0.4)."""
+        lines = []
+        worker = self.worker_labels()
+        with self._lock:
+            seen = set()
+            for (name, key), value in sorted(self._counters.items()):
+                full = f'{self.prefix}_{name}_total'
+                if full not in seen:
+                    lines.append(f'# TYPE {full} counter')
+                    seen.add(full)
+                lines.append(f'{full}{_format_labels(key, worker)} {value}')
+
+            for (name, key), hist in sorted(self._histograms.items()):
+                full = f'{self.prefix}_{name}_seconds'
+                if full not in seen:
+                    lines.append(f'# TYPE {full} histogram')
+                    seen.add(full)
+                running = 0
+                for bound, count in zip(self.buckets, hist['counts']):
+                    running += count
+                    lines.append(f'{full}_bucket{_format_labels(key, worker + [("le", bound)])} {running}')
+                lines.append(f'{full}_bucket{_format_labels(key, worker + [("le", "+Inf")])} {hist["count"]}')
+                lines.append(f'{full}_sum{_format_labels(key, worker)} {hist["sum"]:.6f}')
+                lines.append(f'{full}_count{_format_labels(key, worker)} {hist["count"]}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,27 @@
+"""
+Gemeinsame Bausteine der Smart-Car Services
+
+    from smartcar import influx, vehicles, season, settings
+
+    influx.get_client()          # ein gepoolter InfluxDBClient pro Prozess
+    influx.get_writer()          # gebuendelter Writer auf diesem Client
+    vehicles.get_registry()      # gecachte vehicles.json (VehicleRegistry)
+    season.is_winter_season()    # O-bis-O Regel, Ostern pro Jahr gecacht
+    google_api.load()            # Google Calendar API erst bei Bedarf importieren
+    settings.env_int('PORT', 5000)
+
+Die Untermodule werden erst beim ersten Zugriff importiert, influxdb_client
+erst beim ersten Client. Ein Service bezahlt also nur fuer das, was er nutzt.
+"""
+
+import importlib
+
+__all__ = ['settings', 'influx', 'vehicles', 'season', 'google_api']
+
+
+def __getattr__(name):
+    if name in __all__:
+        module = importlib.import_module(f'{__name__}.{name}')
+        globals()[name] = module
+        return module
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,43 @@
+"""
+Lazy-Loader fuer die Google Calendar API
+googleapiclient/google-auth sind schwer (Discovery, httplib2, pyasn1, ...)
+und werden erst beim ersten Kalenderzugriff importiert, nicht beim Start
+des Service. available() prueft nur, ob die Pakete installiert sind.
+"""
+
+import threading
+from importlib.util import find_spec
+from types import SimpleNamespace
+
+_lock = threading.Lock()
+_api = None
+_available = None
+
+
+def available():
+    """True, wenn google-api-python-client und google-auth installiert sind."""
+    global _available
+    if _available is None:
+        try:
+            _available = find_spec('googleapiclient') is not None and find_spec('google.oauth2') is not None
+        except ImportError:  # Paket "google" fehlt ganz
+            _available = False
+    return _available
+
+
+def load():
+    """
+    Importiert die benoetigten Google-Module beim ersten Aufruf.
+    Liefert service_account, AnonymousCredentials, build und BatchHttpRequest.
+    """
+    global _api
+    if _api is None:
+        with _lock:
+            if _api is None:
+                from google.oauth2 import service_account
+                from google.auth.credentials import AnonymousCredentials
+                from googleapiclient.discovery import build
+                from googleapiclient.http import BatchHttpRequest
+                _api = SimpleNamespace(service_account=service_account, AnonymousCredentials=AnonymousCredentials,
+                                       build=build, BatchHttpRequest=BatchHttpRequest)
+    return _api
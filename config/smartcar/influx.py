@@ -0,0 +1,114 @@
+"""
+Prozessweiter InfluxDB-Zugang
+Ein InfluxDBClient pro Prozess (urllib3-Pool, Keep-Alive, gzip), dazu eine
+synchrone Write-API und ein gebuendelter Writer (influx_writer) auf demselben
+Client. Nach fork() (gunicorn-Worker) wird automatisch ein neuer Client
+angelegt, der Pool des Elternprozesses wird nicht weiterverwendet.
+"""
+
+import os
+import threading
+from importlib.util import find_spec
+
+from smartcar import settings
+
+_lock = threading.RLock()
+_pid = None
+_client = None
+_write_api = None
+_writer = None
+_available = None
+
+
+def available():
+    """True, wenn influxdb-client installiert ist (ohne ihn zu importieren)."""
+    global _available
+    if _available is None:
+        _available = find_spec('influxdb_client') is not None
+    return _available
+
+
+def bucket():
+    return settings.influx().bucket
+
+
+def org():
+    return settings.influx().org
+
+
+def _check_fork():
+    global _pid, _client, _write_api, _writer
+    if _pid != os.getpid():
+        # Geerbte Verbindungen gehoeren dem Elternprozess
+        _pid = os.getpid()
+        _client = None
+        _write_api = None
+        _writer = None
+
+
+def get_client():
+    """Der geteilte InfluxDBClient (legt ihn beim ersten Aufruf an)."""
+    global _client
+    with _lock:
+        _check_fork()
+        if _client is None:
+            from influxdb_client import InfluxDBClient
+            conf = settings.influx()
+            _client = InfluxDBClient(url=conf.url, token=conf.token, org=conf.org,
+                                     enable_gzip=conf.gzip, timeout=conf.timeout_ms)
+        return _client
+
+
+def get_write_api():
+    """Synchrone Write-API auf dem geteilten Client."""
+    global _write_api
+    with _lock:
+        client = get_client()
+        if _write_api is None:
+            from influxdb_client.client.write_api import SYNCHRONOUS
+            _write_api = client.write_api(write_options=SYNCHRONOUS)
+        return _write_api
+
+
+def query_api():
+    return get_client().query_api()
+
+
+def reset_client():
+    """Verwirft den Client nach einem Fehler, der naechste Zugriff verbindet neu."""
+    global _client, _write_api
+    with _lock:
+        _check_fork()
+        if _client is not None:
+            try:
+                _client.close()
+            except Exception:
+                pass
+        _client = None
+        _write_api = None
+
+
+def get_writer(**options):
+    """
+    Der gebuendelte Writer des Prozesses (gestartet).
+    options (batch_size, flush_interval, on_failure, ...) gelten beim ersten
+    Aufruf; ohne Angabe kommen sie aus INFLUX_BATCH_SIZE,
+    INFLUX_FLUSH_INTERVAL, INFLUX_MAX_RETRIES und INFLUX_RETRY_INTERVAL.
+    """
+    global _writer
+    with _lock:
+        _check_fork()
+        if _writer is None:
+            from influx_writer import InfluxBatchWriter
+            conf = settings.influx()
+            defaults = {
+                'batch_size': settings.env_int('INFLUX_BATCH_SIZE', 5000),
+                'flush_interval': settings.env_float('INFLUX_FLUSH_INTERVAL', 10),
+                'max_retries': settings.env_int('INFLUX_MAX_RETRIES', 5),
+                'retry_interval': settings.env_float('INFLUX_RETRY_INTERVAL', 1),
+            }
+            defaults.update(options)
+            _writer = InfluxBatchWriter(conf.url, conf.token, conf.org, conf.bucket,
+                                        client_factory=get_client, **defaults)
+            _writer.start()
+        return _writer
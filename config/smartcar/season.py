@@ -0,0 +1,52 @@
+"""
+Saison-Helfer (O-bis-O Regel, Ostern)
+Ostersonntag wird pro Jahr einmal berechnet und gecacht.
+"""
+
+from datetime import datetime
+from functools import lru_cache
+
+
+@lru_cache(maxsize=64)
+def get_easter_date(year):
+    """
+    Berechnet Ostersonntag nach Gauss-Algorithmus (gecacht pro Jahr).
+    """
+    a = year % 19
+    b = year // 100
+    c = year % 100
+    d = b // 4
+    e = b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i = c // 4
+    k = c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month = (h + l - 7 * m + 114) // 31
+    day = ((h + l - 7 * m + 114) % 31) + 1
+    return datetime(year, month, day)
+
+
+@lru_cache(maxsize=64)
+def easter_day(year):
+    return get_easter_date(year).date()
+
+
+def is_winter_season(date=None):
+    """
+    Prüft ob wir in der Winterreifen-Saison sind (O-bis-O Regel).
+    Oktober bis Ostern = Winterreifen empfohlen
+    Ostern bis Oktober = Sommerreifen empfohlen
+    """
+    if date is None:
+        date = datetime.now()
+
+    month = date.month
+    if month >= 10:
+        return True
+    if month <= 4:
+        day = date.date() if isinstance(date, datetime) else date
+        return day < easter_day(date.year)
+    return False
@@ -0,0 +1,59 @@
+"""
+Konfiguration aus Umgebungsvariablen
+Einheitliches Parsen (int/float/bool) und die InfluxDB-Verbindungsdaten,
+die alle Services teilen.
+"""
+
+import os
+from collections import namedtuple
+from functools import lru_cache
+
+# Verzeichnis mit vehicles.json, alerts.json, ... (im Container /config)
+CONFIG_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_TRUE = ('1', 'true', 'yes', 'on')
+
+
+def env_str(name, default=None, *aliases):
+    """Erster gesetzter Wert aus name und aliases, sonst default."""
+    for key in (name,) + aliases:
+        value = os.environ.get(key)
+        if value is not None:
+            return value
+    return default
+
+
+def env_int(name, default, *aliases):
+    return int(env_str(name, default, *aliases))
+
+
+def env_float(name, default, *aliases):
+    return float(env_str(name, default, *aliases))
+
+
+def env_bool(name, default=False, *aliases):
+    value = env_str(name, None, *aliases)
+    if value is None:
+        return default
+    return value.strip().lower() in _TRUE
+
+
+def config_path(name):
+    """Pfad einer Datei im Konfigurationsverzeichnis."""
+    return os.path.join(CONFIG_DIR, name)
+
+
+InfluxSettings = namedtuple('InfluxSettings', ['url', 'token', 'org', 'bucket', 'gzip', 'timeout_ms'])
+
+
+@lru_cache(maxsize=1)
+def influx():
+    """InfluxDB-Verbindung (INFLUX_*, trip_processor nutzt INFLUXDB_*)."""
+    return InfluxSettings(
+        url=env_str('INFLUX_URL', 'http://influxdb:8086', 'INFLUXDB_URL'),
+        token=env_str('INFLUX_TOKEN', 'vehicle-admin-token', 'INFLUXDB_TOKEN'),
+        org=env_str('INFLUX_ORG', 'vehicle_org', 'INFLUXDB_ORG'),
+        bucket=env_str('INFLUX_BUCKET', 'vehicle_data', 'INFLUXDB_BUCKET'),
+        gzip=env_bool('INFLUX_GZIP', True),
+        timeout_ms=env_int('INFLUX_TIMEOUT_MS', 10000)
+    )
@@ -0,0 +1,41 @@
+"""
+Gecachte Fahrzeugliste (vehicles.json)
+Eine VehicleRegistry pro Datei und Prozess: geparst wird nur, wenn sich die
+Datei geaendert hat, Schreibzugriffe laufen atomar (siehe vehicle_registry).
+"""
+
+import os
+import threading
+
+from smartcar import settings
+
+_lock = threading.Lock()
+_registries = {}
+
+
+def default_path():
+    return settings.env_str('VEHICLES_JSON', settings.config_path('vehicles.json'))
+
+
+def get_registry(path=None, check_interval=None):
+    """Die Registry fuer path (Standard: VEHICLES_JSON bzw. config/vehicles.json)."""
+    path = os.path.abspath(path or default_path())
+    with _lock:
+        registry = _registries.get(path)
+        if registry is None:
+            from vehicle_registry import VehicleRegistry
+            if check_interval is None:
+                check_interval = settings.env_float('VEHICLES_CHECK_INTERVAL', 1.0)
+            registry = _registries[path] = VehicleRegistry(path, check_interval=check_interval)
+        return registry
+
+
+def load_vehicles(path=None):
+    """Alle Fahrzeuge (Liste, nicht veraendern)."""
+    return list(get_registry(path).all())
+
+
+def get_vehicle(vehicle_id, path=None):
+    """Fahrzeug per vehicle_id oder Kennzeichen."""
+    registry = get_registry(path)
+    return registry.get(vehicle_id) or registry.by_license_plate(vehicle_id)
@@ -7,21 +7,24 @@ Ausführen bei:
 - Erstinstallation
 - Änderungen an vehicles.json
 - Sync auf neuen PC
+
+Es werden nur neue oder geänderte Fahrzeuge geschrieben (Inhalts-Hash,
+siehe vehicle_sync.py). Alles neu schreiben: python sync_vehicles.py --full
 """
 
 import json
 import os
 import sys
-from datetime import datetime
 
 try:
-    from influxdb_client import InfluxDBClient, Point
-    from influxdb_client.client.write_api import SYNCHRONOUS
+    from influxdb_client import InfluxDBClient
 except ImportError:
     print("FEHLER: influxdb-client nicht installiert!")
     print("Installiere mit: pip install influxdb-client")
     sys.exit(1)
 
+from vehicle_sync import diff_sync
+
 
 # InfluxDB Konfiguration (gleich wie in docker-compose.yml)
 INFLUX_URL = os.getenv("INFLUX_URL", "http://localhost:8086")
@@ -46,45 +49,28 @@ def load_vehicles_config():
     return data.get("vehicles", [])
 
 
-def sync_to_influxdb(vehicles):
-    """Schreibt Fahrzeug-Stammdaten in InfluxDB."""
+def sync_to_influxdb(vehicles, full=False):
+    """Schreibt neue oder geänderte Fahrzeug-Stammdaten in InfluxDB."""
     print(f"Verbinde zu InfluxDB: {INFLUX_URL}")
     
     try:
         client = InfluxDBClient(url=INFLUX_URL, token=INFLUX_TOKEN, org=INFLUX_ORG)
-        write_api = client.write_api(write_options=SYNCHRONOUS)
         
         # Prüfe Verbindung
         health = client.health()
+        client.close()
         if health.status != "pass":
             print(f"FEHLER: InfluxDB nicht gesund: {health.message}")
             sys.exit(1)
         
         print(f"InfluxDB OK - Version: {health.version}")
         
-        # Schreibe jedes Fahrzeug
-        for vehicle in vehicles:
-            vid = vehicle.get("vehicle_id")
-            if not vid:
-                print("WARNUNG: Fahrzeug ohne vehicle_id übersprungen")
-                continue
-            
-            # Erstelle Point mit allen Metadaten
-            point = Point("vehicle_info") \
-                .tag("vehicle_id", vid) \
-                .field("display_name", vehicle.get("display_name", vid)) \
-                .field("manufacturer", vehicle.get("manufacturer", "Unbekannt")) \
-                .field("model", vehicle.get("model", "Unbekannt")) \
-                .field("year", vehicle.get("year", 0)) \
-                .field("license_plate", vehicle.get("license_plate", "")) \
-                .field("fuel_capacity_l", vehicle.get("fuel_capacity_l", 50)) \
-                .field("notes", vehicle.get("notes", ""))
-            
-            write_api.write(bucket=INFLUX_BUCKET, record=point)
-            print(f"  ✓ {vid}: {vehicle.get('display_name', vid)}")
-        
-        client.close()
-        print(f"\n{len(vehicles)} Fahrzeuge synchronisiert!")
+        # Nur geänderte Fahrzeuge, eine gebündelte Anfrage
+        result = diff_sync(vehicles, INFLUX_URL, INFLUX_TOKEN, INFLUX_ORG, INFLUX_BUCKET, full=full)
+        if result is None:
+            return False
+        written, unchanged = result
+        print(f"\n{written} Fahrzeuge synchronisiert, {unchanged} unverändert!")
         return True
         
     except Exception as e:
@@ -104,7 +90,7 @@ def main():
     print()
     
     # Sync zu InfluxDB
-    success = sync_to_influxdb(vehicles)
+    success = sync_to_influxdb(vehicles, full='--full' in sys.argv)
     
     if success:
         print()
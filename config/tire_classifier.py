@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Reifen-Status-Ampel fuer Smart-Car
+Eine gemeinsame Zuordnung (montiert, empfohlen, Dringlichkeit) -> Status,
+genutzt von tire_service (/tires/status, InfluxDB) und weather_collector.
+Alle Kombinationen werden beim Import vorberechnet, pro Fahrzeug bleibt ein
+Dict-Lookup.
+"""
+
+from collections import namedtuple
+
+TireStatus = namedtuple('TireStatus', ['status', 'value', 'text'])
+
+# Numerische Werte fuer Grafana (einheitlich in allen Services)
+STATUS_VALUES = {'unknown': -1, 'ok': 0, 'info': 1, 'warning': 2, 'critical': 3}
+TIRE_TYPE_VALUES = {'unknown': 0, 'summer': 1, 'winter': 2, 'allseason': 3}
+
+TIRE_TYPES = ('summer', 'winter', 'allseason', 'unknown')
+RECOMMENDED_TYPES = ('summer', 'winter', 'unknown')
+URGENCIES = ('critical', 'high', 'medium', 'low', 'ok', 'unknown')
+
+UNKNOWN = TireStatus('unknown', STATUS_VALUES['unknown'], 'Unbekannt')
+
+
+def _status(status, text):
+    return TireStatus(status, STATUS_VALUES[status], text)
+
+
+def _rule(current, recommended, urgency):
+    """Referenz-Regel, wird nur zum Befuellen der Tabelle ausgewertet."""
+    if current == 'unknown':
+        return UNKNOWN
+    if current == 'allseason':
+        return _status('ok', 'Ganzjahresreifen')
+    if recommended == 'unknown':
+        return UNKNOWN
+    if current == recommended:
+        return _status('ok', 'Passend')
+    if recommended == 'winter':
+        # Sommerreifen bei Winterwetter: Dringlichkeit aus der Empfehlung
+        if urgency == 'critical':
+            return _status('critical', 'WECHSEL NÖTIG!')
+        if urgency == 'high':
+            return _status('warning', 'Wechsel empfohlen')
+        return _status('info', 'Wechsel optional')
+    # Winterreifen bei warmem Wetter: nur Verschleiss, kein Sicherheitsrisiko
+    return _status('info', 'Wechsel optional')
+
+
+_TABLE = {
+    (current, recommended, urgency): _rule(current, recommended, urgency)
+    for current in TIRE_TYPES
+    for recommended in RECOMMENDED_TYPES
+    for urgency in URGENCIES
+}
+
+
+def _normalize(value, allowed):
+    return value if value in allowed else 'unknown'
+
+
+def classify(current, recommended, urgency=None):
+    """Status fuer einen montierten Reifentyp und eine Empfehlung."""
+    result = _TABLE.get((current, recommended, urgency))
+    if result is None:
+        result = _TABLE[(_normalize(current, TIRE_TYPES), _normalize(recommended, RECOMMENDED_TYPES),
+                         _normalize(urgency, URGENCIES))]
+    return result
+
+
+def classify_many(currents, recommendation):
+    """Status fuer viele montierte Reifentypen bei derselben Empfehlung."""
+    recommended = _normalize(recommendation.get('recommended'), RECOMMENDED_TYPES)
+    urgency = _normalize(recommendation.get('urgency'), URGENCIES)
+    row = {current: _TABLE[(current, recommended, urgency)] for current in TIRE_TYPES}
+    return [row.get(current) or row['unknown'] for current in currents]
+
+
+def tire_value(tire_type):
+    """Numerischer Reifentyp fuer Grafana (0 = unbekannt)."""
+    return TIRE_TYPE_VALUES.get(tire_type, 0)
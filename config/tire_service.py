@@ -6,172 +6,212 @@ Prüft Wetter, vergleicht mit montierten Reifen und erstellt Kalender-Einträge.
 
 import os
 import sys
+import gzip
 import json
+import hashlib
 import requests
+from requests.adapters import HTTPAdapter
 import threading
 import time
-from datetime import datetime, timedelta
-from flask import Flask, request, jsonify
-
-# InfluxDB Import
-try:
-    from influxdb_client import InfluxDBClient, Point
-    from influxdb_client.client.write_api import SYNCHRONOUS
-    INFLUX_AVAILABLE = True
-except ImportError:
-    INFLUX_AVAILABLE = False
+from datetime import date, datetime, timedelta
+from email.utils import formatdate
+from flask import Flask, request, jsonify, Response
+
+import weather_rules
+import tire_classifier
+from smartcar import google_api, influx, settings
+from smartcar.season import get_easter_date, is_winter_season
+from smartcar.vehicles import get_registry
+from cooldown_store import CooldownStore
+from fleet_check import FleetChecker
+from tire_wear import WearLedger, project_fleet
+
+# InfluxDB (Client wird erst beim ersten Zugriff angelegt, siehe smartcar.influx)
+INFLUX_AVAILABLE = influx.available()
+if not INFLUX_AVAILABLE:
     print("⚠️ InfluxDB Client nicht installiert")
 
-# Google Calendar Import
-try:
-    from google.oauth2 import service_account
-    from googleapiclient.discovery import build
-    GOOGLE_API_AVAILABLE = True
-except ImportError:
-    GOOGLE_API_AVAILABLE = False
+# Google Calendar (Import erst beim ersten Kalenderzugriff, siehe smartcar.google_api)
+GOOGLE_API_AVAILABLE = google_api.available()
+if not GOOGLE_API_AVAILABLE:
     print("⚠️ Google API nicht installiert - Kalender-Integration deaktiviert")
 
 app = Flask(__name__)
 
 # Konfiguration
-CONFIG_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_DIR = settings.CONFIG_DIR
 VEHICLES_JSON = os.path.join(CONFIG_DIR, "vehicles.json")
 ALERTS_JSON = os.path.join(CONFIG_DIR, "alerts.json")
 GOOGLE_KEY_FILE = os.path.join(CONFIG_DIR, "google-calendar-key.json")
 WEATHER_SERVICE_URL = os.environ.get('WEATHER_SERVICE_URL', 'http://weather-service:5001')
 CALENDAR_ID = os.environ.get('GOOGLE_CALENDAR_ID', 'primary')
+# Für Tests gegen einen lokalen Stub, z.B. http://localhost:8090/ (siehe Test/calendar_stub_server.py)
+GOOGLE_CALENDAR_ROOT_URL = os.environ.get('GOOGLE_CALENDAR_ROOT_URL', 'https://www.googleapis.com/')
+CALENDAR_BATCH_SIZE = 50  # Google erlaubt max. 50 Anfragen pro Batch
+
+# Flotten-Check: Wetter pro Rasterzelle (gleiche Auflösung wie weather_service)
+WEATHER_GRID_DECIMALS = settings.env_int('WEATHER_GRID_DECIMALS', 2)
+FLEET_WEATHER_WORKERS = settings.env_int('FLEET_WEATHER_WORKERS', 8)
+FLEET_CALENDAR_WORKERS = settings.env_int('FLEET_CALENDAR_WORKERS', 2)
+# Letzte GPS-Positionen werden so lange aus dem Speicher genutzt
+POSITION_CACHE_SECONDS = settings.env_int('POSITION_CACHE_SECONDS', 300)
+
+# /tires/status: Wetter wird höchstens so oft neu abgefragt
+STATUS_WEATHER_TTL = settings.env_int('STATUS_WEATHER_TTL', 60)
+
+# Verschleiß-Prognose: Kilometerstände pro Reifensatz aus trip_summary
+TIRE_WEAR_STATE = os.environ.get('TIRE_WEAR_STATE', os.path.join(CONFIG_DIR, "tire_wear.json"))
+TIRE_WEAR_INTERVAL = settings.env_int('TIRE_WEAR_INTERVAL', 600)
+TIRE_WEAR_BACKFILL_DAYS = settings.env_int('TIRE_WEAR_BACKFILL_DAYS', 365)
+wear_ledger = WearLedger(TIRE_WEAR_STATE, backfill_days=TIRE_WEAR_BACKFILL_DAYS)
 
-# InfluxDB Config
-INFLUX_URL = os.environ.get('INFLUX_URL', 'http://influxdb:8086')
-INFLUX_TOKEN = os.environ.get('INFLUX_TOKEN', 'vehicle-admin-token')
-INFLUX_ORG = os.environ.get('INFLUX_ORG', 'vehicle_org')
-INFLUX_BUCKET = os.environ.get('INFLUX_BUCKET', 'vehicle_data')
+# InfluxDB Config (INFLUX_URL, INFLUX_TOKEN, ... siehe smartcar.settings)
+INFLUX_BUCKET = influx.bucket()
+INFLUX_UPDATE_INTERVAL = settings.env_int('TIRE_INFLUX_INTERVAL', 60)
+# Unveränderte Fahrzeuge werden nur alle n Sekunden erneut geschrieben
+INFLUX_HEARTBEAT_SECONDS = settings.env_int('TIRE_INFLUX_HEARTBEAT', 900)
 
-# Cooldown für Benachrichtigungen (verhindert Spam)
-notification_cooldown = {}
+# Cooldown für Benachrichtigungen (verhindert Spam) - persistent und von
+# allen Workern/Services geteilt (siehe cooldown_store.py)
 COOLDOWN_HOURS = 24
+COOLDOWN_DB = os.environ.get('COOLDOWN_DB', os.path.join(CONFIG_DIR, "cooldowns.db"))
+notification_cooldown = CooldownStore(COOLDOWN_DB, default_ttl=COOLDOWN_HOURS * 3600)
 
+# Fahrzeuge im Speicher, neu geladen nur bei Dateiänderung
+VEHICLES_CHECK_INTERVAL = settings.env_float('VEHICLES_CHECK_INTERVAL', 1.0)
+vehicle_registry = get_registry(VEHICLES_JSON, check_interval=VEHICLES_CHECK_INTERVAL)
 
-def load_vehicles():
-    """Lädt Fahrzeugkonfiguration."""
-    try:
-        with open(VEHICLES_JSON, 'r', encoding='utf-8') as f:
-            return json.load(f).get('vehicles', [])
-    except Exception as e:
-        print(f"Fehler beim Laden der Fahrzeuge: {e}")
-        return []
 
+VALID_TIRE_TYPES = ['summer', 'winter', 'allseason']
 
-def save_vehicles(vehicles):
-    """Speichert Fahrzeugkonfiguration."""
-    try:
-        with open(VEHICLES_JSON, 'w', encoding='utf-8') as f:
-            json.dump({'vehicles': vehicles}, f, indent=2, ensure_ascii=False)
-        return True
-    except Exception as e:
-        print(f"Fehler beim Speichern: {e}")
-        return False
 
+# Verbindungen zum Weather-Service wiederverwenden (auch parallel)
+weather_session = requests.Session()
+weather_session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=FLEET_WEATHER_WORKERS))
 
-def get_weather():
-    """Holt aktuelle Wetterdaten vom Weather-Service."""
+
+def get_weather(lat=None, lon=None):
+    """Holt aktuelle Wetterdaten vom Weather-Service (ohne Position: Standardort)."""
+    params = {'lat': lat, 'lon': lon} if lat is not None and lon is not None else None
     try:
-        response = requests.get(f"{WEATHER_SERVICE_URL}/weather", timeout=10)
+        response = weather_session.get(f"{WEATHER_SERVICE_URL}/weather", params=params, timeout=10)
         return response.json()
     except Exception as e:
         print(f"Weather-Service nicht erreichbar: {e}")
         return None
 
 
-def get_easter_date(year):
-    """Berechnet Ostersonntag."""
-    a = year % 19
-    b = year // 100
-    c = year % 100
-    d = b // 4
-    e = b % 4
-    f = (b + 8) // 25
-    g = (b - f + 1) // 3
-    h = (19 * a + b - d - g + 15) % 30
-    i = c // 4
-    k = c % 4
-    l = (32 + 2 * e + 2 * i - h - k) % 7
-    m = (a + 11 * h + 22 * l) // 451
-    month = (h + l - 7 * m + 114) // 31
-    day = ((h + l - 7 * m + 114) % 31) + 1
-    return datetime(year, month, day)
-
-
-def is_winter_season(date=None):
-    """Prüft ob Wintersaison (O-bis-O)."""
-    if date is None:
-        date = datetime.now()
-    
-    year = date.year
-    month = date.month
-    
-    if month >= 10:
-        return True
-    
-    if month <= 4:
-        easter = get_easter_date(year)
-        return date.date() < easter.date()
+# Letzte GPS-Positionen: (Zeitpunkt, {vehicle_id: (lat, lon)})
+_positions_cache = (0.0, {})
+
+
+def last_known_positions():
+    """Letzte GPS-Position pro Fahrzeug aus InfluxDB (gecacht)."""
+    global _positions_cache
+    fetched_at, positions = _positions_cache
+    if time.time() - fetched_at < POSITION_CACHE_SECONDS or not INFLUX_AVAILABLE:
+        return positions
     
-    return False
+    query = f'''
+    from(bucket: "{INFLUX_BUCKET}")
+        |> range(start: -30d)
+        |> filter(fn: (r) => r["_measurement"] == "vehicle_gps")
+        |> filter(fn: (r) => r["_field"] == "latitude" or r["_field"] == "longitude")
+        |> last()
+        |> pivot(rowKey: ["vehicle_id"], columnKey: ["_field"], valueColumn: "_value")
+    '''
+    try:
+        positions = {}
+        for table in influx.query_api().query(query):
+            for record in table.records:
+                lat = record.values.get('latitude')
+                lon = record.values.get('longitude')
+                if lat is not None and lon is not None:
+                    positions[record.values.get('vehicle_id')] = (lat, lon)
+    except Exception as e:
+        print(f"GPS-Positionen nicht abrufbar: {e}")
+    _positions_cache = (time.time(), positions)
+    return positions
 
 
-def get_tire_recommendation(temp_c, weather_main):
+def locate_vehicles(vehicles):
+    """
+    Standort pro Fahrzeug: fester Standort aus vehicles.json
+    ("location": {"lat": .., "lon": ..}), sonst letzte GPS-Position.
+    Fahrzeuge ohne Standort nutzen den Standardort des Weather-Service.
+    """
+    positions = {}
+    gps = None
+    for vehicle in vehicles:
+        vehicle_id = vehicle.get('vehicle_id')
+        location = vehicle.get('location')
+        if location and location.get('lat') is not None and location.get('lon') is not None:
+            positions[vehicle_id] = (location['lat'], location['lon'])
+            continue
+        if gps is None:
+            gps = last_known_positions()
+        if vehicle_id in gps:
+            positions[vehicle_id] = gps[vehicle_id]
+    return positions
+
+
+def _decide_tires(temp_c, winter_weather, winter_season):
     """
-    Berechnet Reifenempfehlung.
-    
     Priorität:
     1. Witterung (Schnee/Eis) = Winterreifen PFLICHT
     2. Temperatur ≤7°C = Winterreifen empfohlen
     3. Temperatur >7°C = Sommerreifen (bessere Haftung)
     4. Saison O-bis-O als Orientierung
     """
-    weather_lower = weather_main.lower() if weather_main else ''
-    date = datetime.now()
-    winter_season = is_winter_season(date)
-    
-    # Winterliche Witterung = PFLICHT
-    winter_weather = weather_lower in ['snow', 'sleet', 'freezing rain', 'ice', 'hail']
-    
     if winter_weather or temp_c <= 0:
-        return {
-            'recommended': 'winter',
-            'urgency': 'critical',
-            'label': 'Winterreifen PFLICHT',
-            'reason': 'Schnee, Eis oder Frost',
-            'legal_warning': True
-        }
-    
+        return 'critical'
     if temp_c <= 7:
-        return {
-            'recommended': 'winter',
-            'urgency': 'high',
-            'label': 'Winterreifen empfohlen',
-            'reason': f'Temperatur {temp_c:.1f}°C - Winterreifen haben bessere Haftung',
-            'legal_warning': False
-        }
-    
-    # temp > 7°C
-    if winter_season:
-        return {
-            'recommended': 'winter',
-            'urgency': 'low',
-            'label': 'Winterreifen behalten',
-            'reason': f'Noch Wintersaison (O-bis-O), Wetter kann umschlagen',
-            'legal_warning': False
-        }
-    else:
-        return {
-            'recommended': 'summer',
-            'urgency': 'medium',
-            'label': 'Sommerreifen empfohlen',
-            'reason': f'Temperatur {temp_c:.1f}°C - Sommerreifen haben kürzeren Bremsweg',
-            'legal_warning': False
-        }
+        return 'high'
+    return 'low' if winter_season else 'medium'
+
+
+TIRE_RECOMMENDATIONS = {
+    'critical': {
+        'recommended': 'winter',
+        'urgency': 'critical',
+        'label': 'Winterreifen PFLICHT',
+        'reason': 'Schnee, Eis oder Frost',
+        'legal_warning': True
+    },
+    'high': {
+        'recommended': 'winter',
+        'urgency': 'high',
+        'label': 'Winterreifen empfohlen',
+        'reason': 'Temperatur {temp:.1f}°C - Winterreifen haben bessere Haftung',
+        'legal_warning': False
+    },
+    'low': {
+        'recommended': 'winter',
+        'urgency': 'low',
+        'label': 'Winterreifen behalten',
+        'reason': 'Noch Wintersaison (O-bis-O), Wetter kann umschlagen',
+        'legal_warning': False
+    },
+    'medium': {
+        'recommended': 'summer',
+        'urgency': 'medium',
+        'label': 'Sommerreifen empfohlen',
+        'reason': 'Temperatur {temp:.1f}°C - Sommerreifen haben kürzeren Bremsweg',
+        'legal_warning': False
+    }
+}
+
+tire_table = weather_rules.RecommendationTable(_decide_tires, TIRE_RECOMMENDATIONS)
+
+
+def get_tire_recommendation(temp_c, weather_main):
+    """Berechnet Reifenempfehlung (Nachschlagen in vorberechneter Tabelle)."""
+    return tire_table.evaluate(temp_c, weather_main)
+
+
+def get_tire_recommendations(samples, date=None):
+    """Reifenempfehlungen für viele (temp_c, weather_main)-Paare auf einmal."""
+    return tire_table.evaluate_many(samples, date)
 
 
 def check_tire_change_needed(vehicle, recommendation):
@@ -222,41 +262,80 @@ def check_tire_change_needed(vehicle, recommendation):
     }
 
 
-def create_calendar_event(vehicle, check_result, recommendation):
-    """Erstellt Kalender-Termin für Reifenwechsel."""
+# Calendar-Service einmal pro Prozess (Discovery + Credentials nur beim ersten Mal)
+_calendar_service = None
+_calendar_init_lock = threading.Lock()
+# httplib2 ist nicht thread-sicher: Aufrufe über den geteilten Service serialisieren
+_calendar_lock = threading.Lock()
+
+
+def get_calendar_service():
+    """Liefert den authentifizierten Google Calendar Service (gecacht)."""
+    global _calendar_service
+    
+    if _calendar_service is not None:
+        return _calendar_service
+    
     if not GOOGLE_API_AVAILABLE:
         print("Google API nicht verfügbar")
         return None
     
-    if not os.path.exists(GOOGLE_KEY_FILE):
-        print(f"Google Key nicht gefunden: {GOOGLE_KEY_FILE}")
-        return None
-    
-    # Cooldown prüfen
-    cooldown_key = f"{vehicle['vehicle_id']}_tire_change"
-    if cooldown_key in notification_cooldown:
-        last_notification = notification_cooldown[cooldown_key]
-        if datetime.now() - last_notification < timedelta(hours=COOLDOWN_HOURS):
-            print(f"Cooldown aktiv für {vehicle['vehicle_id']}")
-            return None
-    
-    try:
-        credentials = service_account.Credentials.from_service_account_file(
-            GOOGLE_KEY_FILE,
-            scopes=['https://www.googleapis.com/auth/calendar.events']
-        )
-        service = build('calendar', 'v3', credentials=credentials)
+    with _calendar_init_lock:
+        if _calendar_service is not None:
+            return _calendar_service
         
-        # Termin in 2 Tagen
-        start_time = datetime.now() + timedelta(days=2)
-        start_time = start_time.replace(hour=10, minute=0, second=0, microsecond=0)
-        end_time = start_time + timedelta(hours=1)
-        
-        urgency_prefix = "🔴 DRINGEND: " if check_result['urgency'] == 'critical' else "🔶 "
+        google = google_api.load()
+        stub = not GOOGLE_CALENDAR_ROOT_URL.startswith('https://www.googleapis.com')
+        if os.path.exists(GOOGLE_KEY_FILE):
+            credentials = google.service_account.Credentials.from_service_account_file(
+                GOOGLE_KEY_FILE,
+                scopes=['https://www.googleapis.com/auth/calendar.events']
+            )
+        elif stub:
+            credentials = google.AnonymousCredentials()
+        else:
+            print(f"Google Key nicht gefunden: {GOOGLE_KEY_FILE}")
+            return None
         
-        event = {
-            'summary': f"{urgency_prefix}Reifenwechsel {vehicle['display_name']}",
-            'description': f"""Fahrzeug: {vehicle['display_name']}
+        try:
+            _calendar_service = google.build(
+                'calendar', 'v3', credentials=credentials, cache_discovery=False,
+                client_options={'api_endpoint': GOOGLE_CALENDAR_ROOT_URL + 'calendar/v3/'}
+            )
+        except Exception as e:
+            print(f"Fehler beim Erstellen des Calendar-Service: {e}")
+            return None
+        return _calendar_service
+
+
+def reserve_notification(vehicle):
+    """
+    Belegt den Cooldown für das Fahrzeug (atomar). False, wenn kürzlich schon
+    ein Termin erstellt wurde - auch von einem anderen Worker.
+    """
+    if notification_cooldown.acquire(f"{vehicle['vehicle_id']}_tire_change"):
+        return True
+    print(f"Cooldown aktiv für {vehicle['vehicle_id']}")
+    return False
+
+
+def release_notification(vehicle):
+    """Gibt den Cooldown frei, wenn der Termin nicht erstellt werden konnte."""
+    notification_cooldown.release(f"{vehicle['vehicle_id']}_tire_change")
+
+
+def build_tire_event(vehicle, check_result, recommendation):
+    """Kalender-Event (Body für events.insert) für einen Reifenwechsel."""
+    # Termin in 2 Tagen
+    start_time = datetime.now() + timedelta(days=2)
+    start_time = start_time.replace(hour=10, minute=0, second=0, microsecond=0)
+    end_time = start_time + timedelta(hours=1)
+    
+    urgency_prefix = "🔴 DRINGEND: " if check_result['urgency'] == 'critical' else "🔶 "
+    
+    event = {
+        'summary': f"{urgency_prefix}Reifenwechsel {vehicle['display_name']}",
+        'description': f"""Fahrzeug: {vehicle['display_name']}
 Kennzeichen: {vehicle.get('license_plate', 'N/A')}
 
 Aktuell montiert: {vehicle.get('tires', {}).get('current', 'unbekannt').capitalize()}reifen
@@ -267,86 +346,149 @@ Grund: {recommendation['reason']}
 
 ---
 Automatisch erstellt von Smart-Car""",
-            'start': {
-                'dateTime': start_time.isoformat(),
-                'timeZone': 'Europe/Berlin',
-            },
-            'end': {
-                'dateTime': end_time.isoformat(),
-                'timeZone': 'Europe/Berlin',
-            },
-            'reminders': {
-                'useDefault': False,
-                'overrides': [
-                    {'method': 'popup', 'minutes': 60},
-                    {'method': 'email', 'minutes': 1440},  # 1 Tag vorher
-                ],
-            },
-        }
-        
-        created_event = service.events().insert(calendarId=CALENDAR_ID, body=event).execute()
-        notification_cooldown[cooldown_key] = datetime.now()
+        'start': {
+            'dateTime': start_time.isoformat(),
+            'timeZone': 'Europe/Berlin',
+        },
+        'end': {
+            'dateTime': end_time.isoformat(),
+            'timeZone': 'Europe/Berlin',
+        },
+        'reminders': {
+            'useDefault': False,
+            'overrides': [
+                {'method': 'popup', 'minutes': 60},
+                {'method': 'email', 'minutes': 1440},  # 1 Tag vorher
+            ],
+        },
+    }
+    return event
+
+
+def create_calendar_event(vehicle, check_result, recommendation):
+    """Erstellt Kalender-Termin für Reifenwechsel."""
+    service = get_calendar_service()
+    if service is None:
+        return None
+    
+    if not reserve_notification(vehicle):
+        return None
+    
+    try:
+        event = build_tire_event(vehicle, check_result, recommendation)
+        with _calendar_lock:
+            created_event = service.events().insert(calendarId=CALENDAR_ID, body=event).execute()
         
         print(f"✅ Kalender-Termin erstellt: {created_event.get('htmlLink')}")
         return created_event.get('id')
         
     except Exception as e:
+        release_notification(vehicle)
         print(f"Fehler beim Erstellen des Kalender-Termins: {e}")
         return None
 
 
-def check_all_vehicles():
-    """Prüft alle Fahrzeuge auf Reifenwechsel-Bedarf."""
-    vehicles = load_vehicles()
-    weather = get_weather()
+def create_calendar_events(items):
+    """
+    Erstellt Kalender-Termine für viele Fahrzeuge per Batch-Request
+    (bis zu CALENDAR_BATCH_SIZE Events pro HTTP-Aufruf).
+    items: Liste von (vehicle, check_result, recommendation)
+    Gibt {vehicle_id: event_id oder None} zurück.
+    """
+    results = {vehicle['vehicle_id']: None for vehicle, _, _ in items}
+    
+    service = get_calendar_service()
+    if service is None:
+        return results
+    
+    pending = []
+    for vehicle, check_result, recommendation in items:
+        if reserve_notification(vehicle):
+            pending.append((vehicle, build_tire_event(vehicle, check_result, recommendation)))
+    
+    if not pending:
+        return results
+    
+    batch_uri = GOOGLE_CALENDAR_ROOT_URL + 'batch/calendar/v3'
+    vehicles_by_request = {}
+    
+    def on_response(request_id, response, exception):
+        vehicle = vehicles_by_request[request_id]
+        if exception is not None:
+            release_notification(vehicle)
+            print(f"Fehler beim Erstellen des Kalender-Termins für {vehicle['vehicle_id']}: {exception}")
+            return
+        results[vehicle['vehicle_id']] = response.get('id')
+    
+    for offset in range(0, len(pending), CALENDAR_BATCH_SIZE):
+        chunk = pending[offset:offset + CALENDAR_BATCH_SIZE]
+        batch = google_api.load().BatchHttpRequest(callback=on_response, batch_uri=batch_uri)
+        for i, (vehicle, event) in enumerate(chunk):
+            request_id = str(offset + i)
+            vehicles_by_request[request_id] = vehicle
+            batch.add(service.events().insert(calendarId=CALENDAR_ID, body=event), request_id=request_id)
+        try:
+            with _calendar_lock:
+                batch.execute()
+        except Exception as e:
+            for vehicle, _ in chunk:
+                if results[vehicle['vehicle_id']] is None:
+                    release_notification(vehicle)
+            print(f"Fehler beim Batch-Request ({len(chunk)} Termine): {e}")
+    
+    created = sum(1 for event_id in results.values() if event_id)
+    print(f"✅ {created}/{len(pending)} Kalender-Termine per Batch erstellt")
+    return results
+
+
+fleet_checker = FleetChecker(
+    fetch_weather=get_weather,
+    locate=locate_vehicles,
+    evaluate_many=get_tire_recommendations,
+    check=check_tire_change_needed,
+    notify=create_calendar_events,
+    grid_decimals=WEATHER_GRID_DECIMALS,
+    weather_workers=FLEET_WEATHER_WORKERS,
+    notify_workers=FLEET_CALENDAR_WORKERS,
+    notify_batch=CALENDAR_BATCH_SIZE
+)
+
+
+def check_all_vehicles(wait_for_calendar=False):
+    """
+    Prüft alle Fahrzeuge auf Reifenwechsel-Bedarf - mit dem Wetter am
+    jeweiligen Standort. Kalender-Einträge laufen im Hintergrund, außer
+    wait_for_calendar ist gesetzt.
+    """
+    vehicles = vehicle_registry.all()
+    cells, results = fleet_checker.run(vehicles, wait_for_notify=wait_for_calendar)
     
     # Prüfe ob Wetterdaten nutzbar sind (auch mit Fallback)
-    if not weather or weather.get('temperature_c') is None:
+    usable = [cell for cell in cells if cell['recommendation'] is not None]
+    if not usable:
         return {
             'success': False,
             'error': 'Wetterdaten nicht verfügbar',
-            'weather_error': weather.get('error') if weather else 'Service nicht erreichbar'
+            'weather_error': 'Service nicht erreichbar'
         }
     
-    temp = weather.get('temperature_c', 10)
-    weather_main = weather.get('weather_main', '')
-    
-    recommendation = get_tire_recommendation(temp, weather_main)
-    
-    results = []
-    for vehicle in vehicles:
-        vehicle_id = vehicle.get('vehicle_id')
-        current_tires = vehicle.get('tires', {}).get('current', 'unknown')
-        
-        check = check_tire_change_needed(vehicle, recommendation)
-        
-        result = {
-            'vehicle_id': vehicle_id,
-            'display_name': vehicle.get('display_name'),
-            'current_tires': current_tires,
-            'recommendation': recommendation,
-            'check_result': check,
-            'calendar_event_created': False
-        }
-        
-        # Bei kritischem Wechselbedarf -> Kalender-Eintrag
-        if check['change_needed'] and check['urgency'] in ['critical', 'high']:
-            event_id = create_calendar_event(vehicle, check, recommendation)
-            result['calendar_event_created'] = event_id is not None
-        
-        results.append(result)
+    # Zelle mit den meisten Fahrzeugen als Gesamtübersicht
+    main_cell = max(usable, key=lambda cell: cell['vehicles'])
     
     return {
         'success': True,
         'timestamp': datetime.now().isoformat(),
         'weather': {
-            'temperature_c': temp,
-            'condition': weather_main,
-            'location': weather.get('location_name', 'Unbekannt')
+            'temperature_c': main_cell['weather']['temperature_c'],
+            'condition': main_cell['weather']['condition'],
+            'location': main_cell['weather']['location']
         },
-        'recommendation': recommendation,
+        'recommendation': main_cell['recommendation'],
         'winter_season': is_winter_season(),
         'easter_date': get_easter_date(datetime.now().year).strftime('%Y-%m-%d'),
+        'cells': cells,
+        'calendar_events_queued': sum(1 for r in results if r.get('calendar_event_queued')),
+        'duration_ms': round(fleet_checker.last_duration * 1000, 1),
         'vehicles': results
     }
 
@@ -359,25 +501,26 @@ def check_all_vehicles():
 def check_tires():
     """
     GET /tires/check
+    GET /tires/check?wait=1 (wartet auf die Kalender-Einträge)
     Prüft alle Fahrzeuge auf Reifenwechsel-Bedarf.
     """
-    result = check_all_vehicles()
+    result = check_all_vehicles(wait_for_calendar=request.args.get('wait') in ('1', 'true'))
     return jsonify(result)
 
 
 @app.route('/tires/check/<vehicle_id>', methods=['GET'])
 def check_vehicle_tires(vehicle_id):
     """
-    GET /tires/check/VW-Passat-B5-001
+    GET /tires/check/VW-Passat-B5-001 (oder Kennzeichen, z.B. /tires/check/SB-AB-123)
     Prüft ein spezifisches Fahrzeug.
     """
-    vehicles = load_vehicles()
-    vehicle = next((v for v in vehicles if v.get('vehicle_id') == vehicle_id), None)
+    vehicle = vehicle_registry.get(vehicle_id) or vehicle_registry.by_license_plate(vehicle_id)
     
     if not vehicle:
         return jsonify({'error': f'Fahrzeug {vehicle_id} nicht gefunden'}), 404
     
-    weather = get_weather()
+    # Wetter am Standort des Fahrzeugs (gleiche Rasterzelle wie /tires/check)
+    cell, weather = fleet_checker.weather_for(vehicle)
     if not weather or weather.get('temperature_c') is None:
         return jsonify({'error': 'Wetterdaten nicht verfügbar'}), 503
     
@@ -388,20 +531,47 @@ def check_vehicle_tires(vehicle_id):
     check = check_tire_change_needed(vehicle, recommendation)
     
     return jsonify({
-        'vehicle_id': vehicle_id,
+        'vehicle_id': vehicle.get('vehicle_id'),
         'display_name': vehicle.get('display_name'),
         'current_tires': vehicle.get('tires', {}).get('current', 'unknown'),
         'tire_info': vehicle.get('tires', {}),
         'weather': {
             'temperature_c': temp,
-            'condition': weather_main
+            'condition': weather_main,
+            'location': weather.get('location_name', 'Unbekannt'),
+            'is_fallback': weather.get('is_fallback', False)
         },
+        'weather_cell': list(cell) if cell is not None else None,
         'recommendation': recommendation,
         'check_result': check,
         'winter_season': is_winter_season()
     })
 
 
+def apply_tire_changes(changes):
+    """
+    Setzt montierte Reifen für mehrere Fahrzeuge mit genau einem Schreibvorgang.
+    changes: Liste von (vehicle_id, tire_type), tire_type bereits geprüft.
+    Gibt {vehicle_id: last_change} für gefundene Fahrzeuge zurück.
+    """
+    today = datetime.now().strftime('%Y-%m-%d')
+
+    def mutate(vehicles):
+        by_id = {v.get('vehicle_id'): v for v in vehicles}
+        updated = {}
+        for vehicle_id, tire_type in changes:
+            vehicle = by_id.get(vehicle_id)
+            if vehicle is None:
+                continue
+            tires = vehicle.setdefault('tires', {})
+            tires['current'] = tire_type
+            tires['last_change'] = today
+            updated[vehicle_id] = today
+        return updated
+
+    return vehicle_registry.update(mutate)
+
+
 @app.route('/tires/set/<vehicle_id>', methods=['POST'])
 def set_vehicle_tires(vehicle_id):
     """
@@ -410,45 +580,116 @@ def set_vehicle_tires(vehicle_id):
     
     Aktualisiert die aktuell montierten Reifen.
     """
-    vehicles = load_vehicles()
-    vehicle_idx = next((i for i, v in enumerate(vehicles) if v.get('vehicle_id') == vehicle_id), None)
-    
-    if vehicle_idx is None:
+    if vehicle_registry.get(vehicle_id) is None:
         return jsonify({'error': f'Fahrzeug {vehicle_id} nicht gefunden'}), 404
     
     body = request.get_json() or {}
     new_tire_type = body.get('current', '').lower()
     
-    if new_tire_type not in ['summer', 'winter', 'allseason']:
+    if new_tire_type not in VALID_TIRE_TYPES:
         return jsonify({'error': 'Ungültiger Reifentyp. Erlaubt: summer, winter, allseason'}), 400
     
-    # Update
-    if 'tires' not in vehicles[vehicle_idx]:
-        vehicles[vehicle_idx]['tires'] = {}
+    try:
+        updated = apply_tire_changes([(vehicle_id, new_tire_type)])
+    except Exception as e:
+        print(f"Fehler beim Speichern: {e}")
+        return jsonify({'error': 'Speichern fehlgeschlagen'}), 500
+    
+    if vehicle_id not in updated:
+        return jsonify({'error': f'Fahrzeug {vehicle_id} nicht gefunden'}), 404
     
-    vehicles[vehicle_idx]['tires']['current'] = new_tire_type
-    vehicles[vehicle_idx]['tires']['last_change'] = datetime.now().strftime('%Y-%m-%d')
+    return jsonify({
+        'success': True,
+        'vehicle_id': vehicle_id,
+        'current_tires': new_tire_type,
+        'last_change': updated[vehicle_id]
+    })
+
+
+@app.route('/tires/set', methods=['POST'])
+def set_tires_batch():
+    """
+    POST /tires/set
+    Body: {"vehicles": [{"vehicle_id": "VW-Passat-B5-001", "current": "winter"}, ...]}
     
-    if save_vehicles(vehicles):
-        return jsonify({
-            'success': True,
-            'vehicle_id': vehicle_id,
-            'current_tires': new_tire_type,
-            'last_change': vehicles[vehicle_idx]['tires']['last_change']
-        })
-    else:
+    Aktualisiert viele Fahrzeuge auf einmal (z.B. Reifenwechsel-Tag in der
+    Werkstatt). vehicles.json wird dabei nur einmal geschrieben.
+    """
+    body = request.get_json(silent=True) or {}
+    entries = body.get('vehicles', []) if isinstance(body, dict) else body
+    if not isinstance(entries, list) or not entries:
+        return jsonify({'error': 'Body braucht eine Liste "vehicles"'}), 400
+    
+    changes = []
+    errors = []
+    for entry in entries:
+        vehicle_id = entry.get('vehicle_id') if isinstance(entry, dict) else None
+        tire_type = str(entry.get('current', '')).lower() if isinstance(entry, dict) else ''
+        if not vehicle_id:
+            errors.append({'entry': entry, 'error': 'vehicle_id fehlt'})
+        elif tire_type not in VALID_TIRE_TYPES:
+            errors.append({'vehicle_id': vehicle_id, 'error': 'Ungültiger Reifentyp. Erlaubt: summer, winter, allseason'})
+        else:
+            changes.append((vehicle_id, tire_type))
+    
+    if not changes:
+        return jsonify({'success': False, 'updated': [], 'errors': errors}), 400
+    
+    try:
+        updated = apply_tire_changes(changes)
+    except Exception as e:
+        print(f"Fehler beim Speichern: {e}")
         return jsonify({'error': 'Speichern fehlgeschlagen'}), 500
+    
+    results = []
+    for vehicle_id, tire_type in changes:
+        if vehicle_id in updated:
+            results.append({'vehicle_id': vehicle_id, 'current_tires': tire_type, 'last_change': updated[vehicle_id]})
+        else:
+            errors.append({'vehicle_id': vehicle_id, 'error': f'Fahrzeug {vehicle_id} nicht gefunden'})
+    
+    return jsonify({
+        'success': not errors,
+        'updated': results,
+        'errors': errors
+    })
 
 
-@app.route('/tires/status', methods=['GET'])
-def tire_status():
+# Letzter Wetterstand für /tires/status: (abgerufen, snapshot_id, Wetter)
+_status_weather = (0.0, None, None)
+_status_weather_lock = threading.Lock()
+
+# Berechnete Status-Antworten pro Filter: {Filter: Eintrag}
+_status_cache = {}
+
+
+def status_weather_snapshot():
     """
-    GET /tires/status
-    Gibt Status aller Fahrzeuge für Grafana zurück.
+    Wetter für /tires/status mit Snapshot-ID. Die ID hängt nur von den
+    entscheidungsrelevanten Werten ab - gleiches Wetter ergibt gleiche ID.
     """
-    vehicles = load_vehicles()
-    weather = get_weather()
+    global _status_weather
+    fetched_at, snapshot_id, weather = _status_weather
+    if time.time() - fetched_at < STATUS_WEATHER_TTL:
+        return snapshot_id, weather
     
+    with _status_weather_lock:
+        fetched_at, snapshot_id, weather = _status_weather
+        if time.time() - fetched_at < STATUS_WEATHER_TTL:
+            return snapshot_id, weather
+        weather = get_weather()
+        if weather and weather.get('temperature_c') is not None:
+            relevant = [weather.get('temperature_c'), weather.get('weather_main', ''), bool(weather.get('is_fallback'))]
+        else:
+            weather = None
+            relevant = None
+        snapshot_id = hashlib.sha1(json.dumps(relevant).encode()).hexdigest()[:12]
+        _status_weather = (time.time(), snapshot_id, weather)
+        return snapshot_id, weather
+
+
+def build_tire_status(vehicles, weather):
+    """Status aller Fahrzeuge für Grafana."""
     # Prüfe ob Wetterdaten nutzbar sind (auch mit Fallback)
     if weather and weather.get('temperature_c') is not None:
         temp = weather.get('temperature_c', 10)
@@ -457,46 +698,201 @@ def tire_status():
     else:
         recommendation = {'recommended': 'unknown', 'label': 'Wetter nicht verfügbar'}
     
+    currents = [vehicle.get('tires', {}).get('current', 'unknown') for vehicle in vehicles]
+    # Status-Ampel (siehe tire_classifier)
+    statuses = tire_classifier.classify_many(currents, recommendation)
+    
     status_list = []
-    for vehicle in vehicles:
-        current = vehicle.get('tires', {}).get('current', 'unknown')
+    for vehicle, current, status in zip(vehicles, currents, statuses):
         last_change = vehicle.get('tires', {}).get('last_change', 'unbekannt')
         
-        # Status-Ampel
-        if current == 'allseason':
-            status = 'ok'
-            status_text = 'Ganzjahresreifen'
-        elif current == recommendation.get('recommended'):
-            status = 'ok'
-            status_text = 'Passend'
-        elif recommendation.get('recommended') == 'winter' and current == 'summer':
-            status = 'critical'
-            status_text = 'WECHSEL NÖTIG!'
-        elif recommendation.get('recommended') == 'summer' and current == 'winter':
-            status = 'warning'
-            status_text = 'Wechsel empfohlen'
-        else:
-            status = 'unknown'
-            status_text = 'Unbekannt'
-        
         status_list.append({
             'vehicle_id': vehicle.get('vehicle_id'),
             'display_name': vehicle.get('display_name'),
             'current_tires': current,
             'last_change': last_change,
-            'status': status,
-            'status_text': status_text,
+            'status': status.status,
+            'status_value': status.value,
+            'status_text': status.text,
             'tire_brand': vehicle.get('tires', {}).get(current, {}).get('brand', 'N/A'),
             'tire_size': vehicle.get('tires', {}).get(current, {}).get('size', 'N/A')
         })
     
-    return jsonify({
+    return {
         'timestamp': datetime.now().isoformat(),
         'recommendation': recommendation,
         'vehicles': status_list
+    }
+
+
+def cached_tire_status(tire_filter=None):
+    """
+    Status-Antwort aus dem Cache. Neu berechnet wird nur, wenn sich die
+    vehicles.json (Datei-Signatur), das Wetter (Snapshot-ID) oder das Datum
+    (Saison, Ostern) geändert hat.
+    
+    Das ETag ist ein Hash über den Inhalt ohne Zeitstempel und damit in
+    allen gunicorn-Workern und über Neustarts hinweg gleich für gleiche Daten.
+    """
+    snapshot = vehicle_registry.snapshot()
+    snapshot_id, weather = status_weather_snapshot()
+    key = (snapshot.signature, snapshot_id, date.today())
+    
+    entry = _status_cache.get(tire_filter)
+    if entry is not None and entry['key'] == key:
+        return entry
+    
+    if tire_filter:
+        vehicles = snapshot.by_tire_type.get(tire_filter, [])
+    else:
+        vehicles = snapshot.vehicles
+    status = build_tire_status(vehicles, weather)
+    content = json.dumps({name: value for name, value in status.items() if name != 'timestamp'},
+                         sort_keys=True, ensure_ascii=False)
+    body = json.dumps(status, ensure_ascii=False).encode('utf-8')
+    entry = {
+        'key': key,
+        'etag': '"' + hashlib.sha1(content.encode('utf-8')).hexdigest()[:16] + '"',
+        'last_modified': time.time(),
+        'body': body,
+        'gzip': None
+    }
+    if len(_status_cache) >= 16:
+        _status_cache.clear()
+    _status_cache[tire_filter] = entry
+    return entry
+
+
+def not_modified(entry):
+    """
+    Prüft If-None-Match gegen den Cache-Eintrag. If-Modified-Since wird
+    bewusst ignoriert: Last-Modified hat nur Sekunden-Auflösung und ist
+    pro Worker verschieden, das inhaltsbasierte ETag nicht.
+    """
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        return entry['etag'] in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+    return False
+
+
+@app.route('/tires/status', methods=['GET'])
+def tire_status():
+    """
+    GET /tires/status
+    GET /tires/status?tires=summer (nur Fahrzeuge mit diesem Reifentyp)
+    Gibt Status aller Fahrzeuge für Grafana zurück.
+    
+    Antwortet mit ETag/Last-Modified, 304 bei unverändertem Stand und auf
+    Wunsch gzip-komprimiert (Accept-Encoding: gzip).
+    """
+    entry = cached_tire_status(request.args.get('tires'))
+    headers = {
+        'ETag': entry['etag'],
+        'Last-Modified': formatdate(entry['last_modified'], usegmt=True),
+        'Cache-Control': 'no-cache',
+        'Vary': 'Accept-Encoding'
+    }
+    
+    if not_modified(entry):
+        return Response(status=304, headers=headers)
+    
+    body = entry['body']
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+        if entry['gzip'] is None:
+            entry['gzip'] = gzip.compress(body, compresslevel=6)
+        body = entry['gzip']
+        headers['Content-Encoding'] = 'gzip'
+    
+    return Response(body, mimetype='application/json', headers=headers)
+
+
+def fetch_trip_distances(since):
+    """Neue Fahrten seit `since`: [(zeit, vehicle_id, distance_km)], zeitlich sortiert."""
+    query = f'''
+    from(bucket: "{INFLUX_BUCKET}")
+        |> range(start: {since.strftime('%Y-%m-%dT%H:%M:%S.%fZ')})
+        |> filter(fn: (r) => r["_measurement"] == "trip_summary")
+        |> filter(fn: (r) => r["_field"] == "distance_km")
+        |> keep(columns: ["_time", "_value", "vehicle_id"])
+        |> group()
+        |> sort(columns: ["_time"])
+    '''
+    trips = []
+    for table in influx.query_api().query(query):
+        for record in table.records:
+            trips.append((record.get_time(), record.values.get('vehicle_id'), record.get_value()))
+    return trips
+
+
+def sync_tire_wear():
+    """
+    Verbucht neue Fahrten seit dem Watermark auf die montierten Reifensätze.
+    Läuft unter der Dateisperre des Ledgers mit frisch gelesenem Watermark,
+    damit ein zweiter Worker (POST /tires/wear/sync) nichts doppelt zählt.
+    """
+    vehicles = vehicle_registry.all()
+    mounted = {v.get('vehicle_id'): v.get('tires', {}).get('current') for v in vehicles}
+    with wear_ledger.update():
+        wear_ledger.sync_baselines(vehicles)
+        trips = fetch_trip_distances(wear_ledger.watermark) if INFLUX_AVAILABLE else []
+        count = wear_ledger.ingest(trips, mounted, wear_ledger.tire_changes(vehicles))
+    if count:
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Verschleiß: {count} neue Fahrten verbucht")
+    return count
+
+
+@app.route('/tires/wear', methods=['GET'])
+def tire_wear_fleet():
+    """
+    GET /tires/wear
+    GET /tires/wear?status=soon (nur ok/soon/replace/illegal)
+    Restprofil und Wechseltermine aller Reifensätze der Flotte.
+    """
+    wear_ledger.refresh()
+    projections = project_fleet(vehicle_registry.all(), wear_ledger)
+    status_filter = request.args.get('status')
+    if status_filter:
+        projections = [p for p in projections if p['status'] == status_filter]
+    
+    return jsonify({
+        'timestamp': datetime.now().isoformat(),
+        'watermark': wear_ledger.state.get('watermark'),
+        'tire_sets': projections
     })
 
 
+@app.route('/tires/wear/<vehicle_id>', methods=['GET'])
+def tire_wear_vehicle(vehicle_id):
+    """
+    GET /tires/wear/VW-Passat-B5-001
+    Verschleiß-Prognose für ein Fahrzeug.
+    """
+    vehicle = vehicle_registry.get(vehicle_id) or vehicle_registry.by_license_plate(vehicle_id)
+    if not vehicle:
+        return jsonify({'error': f'Fahrzeug {vehicle_id} nicht gefunden'}), 404
+    
+    wear_ledger.refresh()
+    return jsonify({
+        'vehicle_id': vehicle.get('vehicle_id'),
+        'display_name': vehicle.get('display_name'),
+        'km_total': wear_ledger.state['vehicles'].get(vehicle.get('vehicle_id'), {}).get('km', 0.0),
+        'tire_sets': project_fleet([vehicle], wear_ledger)
+    })
+
+
+@app.route('/tires/wear/sync', methods=['POST'])
+def tire_wear_sync():
+    """
+    POST /tires/wear/sync
+    Liest neue Fahrten sofort ein (sonst alle TIRE_WEAR_INTERVAL Sekunden).
+    """
+    try:
+        count = sync_tire_wear()
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+    return jsonify({'success': True, 'new_trips': count, 'watermark': wear_ledger.state.get('watermark')})
+
+
 @app.route('/health', methods=['GET'])
 def health():
     """Health Check."""
@@ -504,93 +900,134 @@ def health():
         'status': 'healthy',
         'service': 'tire-service',
         'google_api_available': GOOGLE_API_AVAILABLE,
-        'google_key_exists': os.path.exists(GOOGLE_KEY_FILE)
+        'google_key_exists': os.path.exists(GOOGLE_KEY_FILE),
+        'vehicles': len(vehicle_registry),
+        'vehicles_version': vehicle_registry.version
     })
 
 
-def write_tire_data_to_influx():
-    """Schreibt aktuelle Reifendaten nach InfluxDB."""
+# Letzter geschriebener Stand pro Fahrzeug: {vehicle_id: (hash, timestamp)}
+_last_written = {}
+
+# Felder, deren Änderung einen sofortigen Schreibvorgang auslöst
+# (Temperatur wird mitgeschrieben, löst aber allein keinen aus)
+STATUS_HASH_FIELDS = (
+    'display_name', 'current_tires', 'recommended', 'status', 'status_value', 'status_text',
+    'tire_brand', 'tire_size', 'recommendation_label', 'is_winter_season'
+)
+
+
+def build_tire_status_fields(vehicle, recommendation, temp_c):
+    """Feldwerte für den tire_status Point eines Fahrzeugs."""
+    tires = vehicle.get('tires', {})
+    current = tires.get('current', 'unknown')
+    recommended = recommendation.get('recommended', 'unknown')
+    status = tire_classifier.classify(current, recommended, recommendation.get('urgency'))
+    
+    return {
+        'display_name': vehicle.get('display_name', 'Unbekannt'),
+        'current_tires': current,
+        'current_tires_value': tire_classifier.tire_value(current),
+        'recommended': recommended,
+        'recommended_value': tire_classifier.tire_value(recommended),
+        'status': status.status,
+        'status_value': status.value,
+        'status_text': status.text,
+        'tire_brand': tires.get(current, {}).get('brand', 'N/A'),
+        'tire_size': tires.get(current, {}).get('size', 'N/A'),
+        'recommendation_label': recommendation.get('label', 'Unbekannt'),
+        'temperature': float(temp_c),
+        'is_winter_season': 1 if recommendation.get('is_winter_season') else 0
+    }
+
+
+def status_hash(fields):
+    """Hash der statusrelevanten Felder."""
+    return hash(tuple(fields[name] for name in STATUS_HASH_FIELDS))
+
+
+def write_tire_data_to_influx(force=False):
+    """
+    Schreibt Reifendaten nach InfluxDB - nur für Fahrzeuge, deren Status sich
+    seit dem letzten Schreiben geändert hat. Unveränderte Fahrzeuge werden
+    alle INFLUX_HEARTBEAT_SECONDS als Heartbeat erneut geschrieben.
+    """
     if not INFLUX_AVAILABLE:
         return False
+    from influxdb_client import Point
     
     try:
-        client = InfluxDBClient(url=INFLUX_URL, token=INFLUX_TOKEN, org=INFLUX_ORG)
-        write_api = client.write_api(write_options=SYNCHRONOUS)
-        
-        vehicles = load_vehicles()
-        weather = get_weather()
-        
-        # Wetterdaten extrahieren - Fallback-Daten sind OK, solange temperature_c vorhanden ist
-        if weather and weather.get('temperature_c') is not None:
-            temp_c = weather.get('temperature_c', 3)
-            weather_main = weather.get('weather_main', 'Clear')
-            print(f"[{datetime.now().strftime('%H:%M:%S')}] Wetter: {temp_c}°C, {weather_main} (Fallback: {weather.get('is_fallback', False)})")
-        else:
-            temp_c = 3  # Standard-Fallback für Saarbrücken Februar
-            weather_main = 'Clear'
-            print(f"[{datetime.now().strftime('%H:%M:%S')}] Kein Wetter verfügbar, nutze Default: {temp_c}°C")
+        vehicles = vehicle_registry.all()
         
-        recommendation = get_tire_recommendation(temp_c, weather_main)
-        recommendation['temperature'] = temp_c
-        recommendation['is_winter_season'] = is_winter_season()
+        # Wetter pro Rasterzelle wie bei /tires/check, damit Influx und Check übereinstimmen
+        cells = fleet_checker.group_by_cell(vehicles)
+        weather_by_cell = fleet_checker.fetch_cells(cells)
+        winter_season = is_winter_season()
+        by_vehicle = {}
+        for cell, cell_vehicles in cells.items():
+            weather = weather_by_cell.get(cell)
+            # Wetterdaten extrahieren - Fallback-Daten sind OK, solange temperature_c vorhanden ist
+            if weather and weather.get('temperature_c') is not None:
+                temp_c = weather.get('temperature_c', 3)
+                weather_main = weather.get('weather_main', 'Clear')
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] Wetter {cell or 'Standardort'}: {temp_c}°C, "
+                      f"{weather_main} (Fallback: {weather.get('is_fallback', False)})")
+            else:
+                temp_c = 3  # Standard-Fallback für Saarbrücken Februar
+                weather_main = 'Clear'
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] Kein Wetter für {cell or 'Standardort'}, "
+                      f"nutze Default: {temp_c}°C")
+            
+            recommendation = get_tire_recommendation(temp_c, weather_main)
+            recommendation['temperature'] = temp_c
+            recommendation['is_winter_season'] = winter_season
+            for vehicle in cell_vehicles:
+                by_vehicle[vehicle.get('vehicle_id', 'unknown')] = (recommendation, temp_c)
         
+        now = time.time()
         points = []
+        pending = {}
+        changed = 0
+        heartbeats = 0
         for vehicle in vehicles:
-            tires = vehicle.get('tires', {})
-            current = tires.get('current', 'unknown')
-            recommended = recommendation.get('recommended', 'unknown')
+            vehicle_id = vehicle.get('vehicle_id', 'unknown')
+            recommendation, temp_c = by_vehicle[vehicle_id]
+            fields = build_tire_status_fields(vehicle, recommendation, temp_c)
+            digest = status_hash(fields)
             
-            # Status berechnen - auch aktuelle Reifen-Typen berücksichtigen
-            if current == 'allseason':
-                status_value = 1
-                status_text = "Ganzjahresreifen"
-                status = "ok"
-            elif current == recommended:
-                status_value = 0
-                status_text = "Passend"
-                status = "ok"
-            elif current == 'unknown':
-                status_value = -1
-                status_text = "Unbekannt"
-                status = "unknown"
-            elif recommendation.get('urgency') == 'critical':
-                status_value = 3
-                status_text = "WECHSEL NÖTIG!"
-                status = "critical"
-            elif recommendation.get('urgency') == 'high':
-                status_value = 2
-                status_text = "Wechsel empfohlen"
-                status = "warning"
+            last = _last_written.get(vehicle_id)
+            if not force and last is not None and last[0] == digest:
+                if now - last[1] < INFLUX_HEARTBEAT_SECONDS:
+                    continue
+                heartbeats += 1
             else:
-                status_value = 1
-                status_text = "Wechsel optional"
-                status = "info"
-            
-            # Numerischen Wert für Grafana: 2=winter, 1=summer, 0=allseason
-            current_tires_value = 2 if current == 'winter' else (1 if current == 'summer' else 0)
-            recommended_value = 2 if recommended == 'winter' else (1 if recommended == 'summer' else 0)
+                changed += 1
             
             point = Point("tire_status") \
-                .tag("vehicle_id", vehicle.get('vehicle_id', 'unknown')) \
-                .tag("display_name", vehicle.get('display_name', 'Unbekannt')) \
-                .field("current_tires", current) \
-                .field("current_tires_value", current_tires_value) \
-                .field("recommended", recommended) \
-                .field("recommended_value", recommended_value) \
-                .field("status", status) \
-                .field("status_value", status_value) \
-                .field("status_text", status_text) \
-                .field("tire_brand", tires.get(current, {}).get('brand', 'N/A')) \
-                .field("tire_size", tires.get(current, {}).get('size', 'N/A')) \
-                .field("recommendation_label", recommendation.get('label', 'Unbekannt')) \
-                .field("temperature", float(temp_c)) \
-                .field("is_winter_season", 1 if recommendation.get('is_winter_season') else 0)
-            
+                .tag("vehicle_id", vehicle_id) \
+                .tag("display_name", fields['display_name'])
+            for name, value in fields.items():
+                if name != 'display_name':
+                    point = point.field(name, value)
             points.append(point)
+            pending[vehicle_id] = (digest, now)
+        
+        if points:
+            try:
+                influx.get_write_api().write(bucket=INFLUX_BUCKET, record=points)
+            except Exception:
+                influx.reset_client()
+                raise
+            _last_written.update(pending)
+        
+        # Gelöschte Fahrzeuge vergessen
+        if len(_last_written) > len(vehicles):
+            known = {v.get('vehicle_id', 'unknown') for v in vehicles}
+            for vehicle_id in [v for v in _last_written if v not in known]:
+                del _last_written[vehicle_id]
         
-        write_api.write(bucket=INFLUX_BUCKET, record=points)
-        client.close()
-        print(f"[{datetime.now().strftime('%H:%M:%S')}] InfluxDB: {len(points)} Fahrzeuge geschrieben ✓")
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] InfluxDB: {changed} geändert, {heartbeats} Heartbeat, "
+              f"{len(vehicles) - len(points)} unverändert ✓")
         return True
         
     except Exception as e:
@@ -598,35 +1035,50 @@ def write_tire_data_to_influx():
         return False
 
 
+def influx_updater():
+    """Schreibt periodisch Reifendaten nach InfluxDB."""
+    print("DEBUG: influx_updater gestartet - warte 10 Sekunden...")
+    time.sleep(10)  # Warte bis Services bereit
+    counter = 0
+    next_wear_sync = 0
+    while True:
+        counter += 1
+        print(f"DEBUG: InfluxDB Update #{counter} (alle {INFLUX_UPDATE_INTERVAL}s)")
+        try:
+            result = write_tire_data_to_influx()
+            if not result:
+                print("WARNING: write_tire_data_to_influx returned False")
+        except Exception as e:
+            print(f"InfluxDB Update Fehler: {e}")
+            import traceback
+            traceback.print_exc()
+        if time.time() >= next_wear_sync:
+            next_wear_sync = time.time() + TIRE_WEAR_INTERVAL
+            try:
+                sync_tire_wear()
+            except Exception as e:
+                print(f"Verschleiß-Sync Fehler: {e}")
+        time.sleep(INFLUX_UPDATE_INTERVAL)
+
+
+def start_background_jobs():
+    """
+    Startet den Hintergrund-Thread für InfluxDB-Updates.
+    Unter gunicorn (serve.py) läuft er nur in einem Worker.
+    """
+    if INFLUX_AVAILABLE:
+        updater_thread = threading.Thread(target=influx_updater, daemon=True)
+        updater_thread.start()
+        print(f"InfluxDB Updater gestartet (alle {INFLUX_UPDATE_INTERVAL}s, Heartbeat {INFLUX_HEARTBEAT_SECONDS}s)")
+
+
 if __name__ == '__main__':
-    port = int(os.environ.get('PORT', 5003))
+    port = settings.env_int('PORT', 5003)
     print(f"Tire-Service startet auf Port {port}")
     print(f"Wintersaison: {is_winter_season()}")
     print(f"Ostern {datetime.now().year}: {get_easter_date(datetime.now().year).strftime('%d.%m.%Y')}")
     print(f"InfluxDB verfügbar: {INFLUX_AVAILABLE}")
     
-    # Starte Hintergrund-Thread für InfluxDB-Updates
-    def influx_updater():
-        """Schreibt periodisch Reifendaten nach InfluxDB."""
-        print("DEBUG: influx_updater gestartet - warte 10 Sekunden...")
-        time.sleep(10)  # Warte bis Services bereit
-        counter = 0
-        while True:
-            counter += 1
-            print(f"DEBUG: InfluxDB Update #{counter} (alle 60s)")
-            try:
-                result = write_tire_data_to_influx()
-                if not result:
-                    print("WARNING: write_tire_data_to_influx returned False")
-            except Exception as e:
-                print(f"InfluxDB Update Fehler: {e}")
-                import traceback
-                traceback.print_exc()
-            time.sleep(60)  # Alle 60 Sekunden
-    
-    if INFLUX_AVAILABLE:
-        updater_thread = threading.Thread(target=influx_updater, daemon=True)
-        updater_thread.start()
-        print("InfluxDB Updater gestartet (alle 60s)")
+    start_background_jobs()
     
     app.run(host='0.0.0.0', port=port, debug=False)
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Reifenverschleiss-Prognose fuer Smart-Car
+Summiert die gefahrenen Kilometer (trip_summary.distance_km) pro montiertem
+Reifensatz und schaetzt daraus Restprofil und Wechseltermin. Zusaetzlich
+wird das Reifenalter aus der DOT-Nummer bewertet.
+
+Die Kilometer werden inkrementell ueber ein Watermark eingelesen: jede Fahrt
+wird genau einmal gezaehlt, die Historie nie erneut abgefragt. Mehrere
+Worker-Prozesse teilen sich die Zustandsdatei: Schreiben nur ueber update()
+(unter file_lock, mit frisch gelesenem Stand), Lesen ueber refresh().
+"""
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, date, timedelta, timezone
+
+from vehicle_registry import atomic_write_json, file_lock
+
+# Profilabrieb in mm pro 1000 km (Erfahrungswerte, je nach Fahrweise)
+WEAR_MM_PER_1000KM = {'summer': 0.15, 'winter': 0.20, 'allseason': 0.17}
+
+# Empfohlene Mindestprofiltiefe (ADAC) und gesetzliches Minimum
+MIN_TREAD_MM = {'summer': 3.0, 'winter': 4.0, 'allseason': 4.0}
+LEGAL_MIN_TREAD_MM = 1.6
+
+# Reifenalter: Austausch empfohlen / spaetestens
+AGE_REPLACE_YEARS = 6
+AGE_MAX_YEARS = 10
+
+# Ohne Fahrthistorie angenommene Laufleistung pro Tag
+DEFAULT_KM_PER_DAY = 40.0
+
+TIRE_SETS = ('summer', 'winter', 'allseason')
+
+# Vor dem letzten Wechsel war der jeweils andere Satz montiert
+PREVIOUS_SET = {'summer': 'winter', 'winter': 'summer'}
+
+
+def parse_dot(dot):
+    """
+    Herstellungsdatum aus der DOT-Angabe.
+    "2319" = KW 23/2019, "2023" = Jahr 2023 (nur Jahr bekannt -> 1. Juli).
+    """
+    digits = ''.join(ch for ch in str(dot or '') if ch.isdigit())
+    if len(digits) != 4:
+        return None
+    number = int(digits)
+    if 1990 <= number <= 2100:
+        return date(number, 7, 1)
+    week, year = int(digits[:2]), 2000 + int(digits[2:])
+    if not 1 <= week <= 53:
+        return None
+    return date.fromisocalendar(year, min(week, 52), 1)
+
+
+def _add_years(day, years):
+    try:
+        return day.replace(year=day.year + years)
+    except ValueError:  # 29. Februar
+        return day.replace(year=day.year + years, day=28)
+
+
+def _iso(ts):
+    return ts.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+def _parse_iso(value):
+    return datetime.strptime(value, '%Y-%m-%dT%H:%M:%S.%fZ').replace(tzinfo=timezone.utc)
+
+
+class WearLedger:
+    """
+    Persistente Kilometerstaende pro Reifensatz.
+
+    Zustand (JSON):
+        watermark: Zeitpunkt der letzten eingelesenen Fahrt
+        sets:      {"<vehicle_id>:<satz>": {"km", "baseline_tread_mm"}}
+        vehicles:  {"<vehicle_id>": {"km", "first_trip", "last_trip"}}
+
+    km eines Satzes zaehlen ab der letzten Profilmessung: aendert sich
+    tread_depth_mm in vehicles.json, beginnt die Zaehlung neu.
+    """
+
+    def __init__(self, path, backfill_days=365):
+        self.path = path
+        self.backfill_days = backfill_days
+        self._lock = threading.Lock()
+        self._signature = None
+        self.state = {'watermark': None, 'sets': {}, 'vehicles': {}}
+        self.refresh()
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_ino, stat.st_size)
+
+    def refresh(self):
+        """Liest die Datei neu, wenn ein anderer Prozess sie geaendert hat."""
+        signature = self._file_signature()
+        if signature is None or signature == self._signature:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                loaded = json.load(f)
+        except Exception as e:
+            print(f"Verschleiss-Daten nicht lesbar, behalte Stand: {e}")
+            return
+        with self._lock:
+            self.state = {'watermark': None, 'sets': {}, 'vehicles': {}}
+            self.state.update(loaded)
+            self._signature = signature
+
+    def _write(self):
+        with self._lock:
+            data = json.loads(json.dumps(self.state))
+        atomic_write_json(self.path, data)
+        self._signature = self._file_signature()
+
+    @contextmanager
+    def update(self):
+        """
+        Read-modify-write unter file_lock: zuerst den aktuellen Stand der
+        Datei laden (ggf. von einem anderen Worker), am Ende speichern.
+        """
+        with file_lock(self.path):
+            self.refresh()
+            yield self
+            self._write()
+
+    @property
+    def watermark(self):
+        """Startzeit fuer die naechste Abfrage."""
+        if self.state['watermark']:
+            return _parse_iso(self.state['watermark'])
+        return datetime.now(timezone.utc) - timedelta(days=self.backfill_days)
+
+    @staticmethod
+    def tire_changes(vehicles):
+        """{vehicle_id: (letzter Wechsel, vorheriger Satz)} aus vehicles.json."""
+        changes = {}
+        for vehicle in vehicles:
+            tires = vehicle.get('tires', {})
+            previous = PREVIOUS_SET.get(tires.get('current'))
+            try:
+                changed_on = date.fromisoformat(str(tires.get('last_change')))
+            except ValueError:
+                continue
+            changes[vehicle.get('vehicle_id')] = (changed_on, previous if isinstance(tires.get(previous), dict) else None)
+        return changes
+
+    def sync_baselines(self, vehicles):
+        """Setzt die km eines Satzes zurueck, wenn neu gemessen wurde."""
+        with self._lock:
+            for vehicle in vehicles:
+                vehicle_id = vehicle.get('vehicle_id')
+                tires = vehicle.get('tires', {})
+                for set_name in TIRE_SETS:
+                    info = tires.get(set_name)
+                    tread = info.get('tread_depth_mm') if isinstance(info, dict) else None
+                    if tread is None:
+                        continue
+                    entry = self.state['sets'].setdefault(f"{vehicle_id}:{set_name}",
+                                                          {'km': 0.0, 'baseline_tread_mm': tread})
+                    if entry.get('baseline_tread_mm') != tread:
+                        entry['km'] = 0.0
+                        entry['baseline_tread_mm'] = tread
+
+    def ingest(self, trips, mounted, changes=None):
+        """
+        Verbucht neue Fahrten.
+        trips:   [(zeit, vehicle_id, distance_km)], zeitlich sortiert
+        mounted: {vehicle_id: aktuell montierter Satz}
+        changes: {vehicle_id: (Datum des letzten Wechsels, vorher montierter Satz)};
+                 Fahrten vor dem Wechsel zaehlen fuer den vorherigen Satz
+                 (wichtig beim ersten Lauf mit Backfill ueber die Saison hinweg)
+        Gibt die Anzahl neu verbuchter Fahrten zurueck.
+        """
+        changes = changes or {}
+        count = 0
+        with self._lock:
+            watermark = _parse_iso(self.state['watermark']) if self.state['watermark'] else None
+            for ts, vehicle_id, distance_km in trips:
+                if watermark is not None and ts <= watermark:
+                    continue
+                if distance_km is None or distance_km <= 0:
+                    watermark = ts
+                    continue
+                set_name = mounted.get(vehicle_id)
+                changed_on, previous = changes.get(vehicle_id, (None, None))
+                if changed_on is not None and ts.date() < changed_on:
+                    set_name = previous
+                if set_name:
+                    entry = self.state['sets'].setdefault(f"{vehicle_id}:{set_name}",
+                                                          {'km': 0.0, 'baseline_tread_mm': None})
+                    entry['km'] = round(entry['km'] + float(distance_km), 3)
+                totals = self.state['vehicles'].setdefault(vehicle_id, {'km': 0.0, 'first_trip': _iso(ts)})
+                totals['km'] = round(totals['km'] + float(distance_km), 3)
+                totals['last_trip'] = _iso(ts)
+                watermark = ts
+                count += 1
+            if watermark is not None:
+                self.state['watermark'] = _iso(watermark)
+        return count
+
+    def save(self):
+        with file_lock(self.path):
+            self._write()
+
+    def km_per_day(self, vehicle_id, today):
+        """Durchschnittliche Tageslaufleistung seit der ersten erfassten Fahrt."""
+        totals = self.state['vehicles'].get(vehicle_id)
+        if not totals or not totals.get('first_trip'):
+            return DEFAULT_KM_PER_DAY
+        days = (today - _parse_iso(totals['first_trip']).date()).days
+        if days < 7:  # zu wenig Historie
+            return DEFAULT_KM_PER_DAY
+        return totals['km'] / days
+
+    def set_km(self, vehicle_id, set_name):
+        return self.state['sets'].get(f"{vehicle_id}:{set_name}", {}).get('km', 0.0)
+
+
+def project_fleet(vehicles, ledger, today=None):
+    """
+    Prognose fuer alle Reifensaetze der Flotte in einem Durchlauf.
+    Die Eingaben werden zuerst spaltenweise gesammelt und dann gemeinsam
+    berechnet (keine Einzelabfragen pro Fahrzeug).
+    """
+    today = today or date.today()
+
+    rows = []
+    for vehicle in vehicles:
+        vehicle_id = vehicle.get('vehicle_id')
+        tires = vehicle.get('tires', {})
+        daily = ledger.km_per_day(vehicle_id, today)
+        for set_name in TIRE_SETS:
+            info = tires.get(set_name)
+            if not isinstance(info, dict):
+                continue
+            rows.append((vehicle, set_name, info, daily))
+
+    # Spalten
+    treads = [info.get('tread_depth_mm') for _, _, info, _ in rows]
+    kms = [ledger.set_km(v.get('vehicle_id'), s) for v, s, _, _ in rows]
+    rates = [WEAR_MM_PER_1000KM.get(s, 0.2) / 1000.0 for _, s, _, _ in rows]
+    limits = [MIN_TREAD_MM.get(s, 3.0) for _, s, _, _ in rows]
+    dailies = [daily for _, _, _, daily in rows]
+    produced = [parse_dot(info.get('dot')) for _, _, info, _ in rows]
+
+    remaining = [None if t is None else max(0.0, t - km * rate) for t, km, rate in zip(treads, kms, rates)]
+    km_left = [None if r is None else max(0.0, (r - limit) / rate) for r, limit, rate in zip(remaining, limits, rates)]
+    wear_dates = [None if k is None else today + timedelta(days=int(k / d)) if d > 0 else None
+                  for k, d in zip(km_left, dailies)]
+
+    results = []
+    for (vehicle, set_name, info, daily), tread, km, rest, left, wear_date, made in zip(
+            rows, treads, kms, remaining, km_left, wear_dates, produced):
+        age_date = _add_years(made, AGE_REPLACE_YEARS) if made else None
+        max_age_date = _add_years(made, AGE_MAX_YEARS) if made else None
+        candidates = [d for d in (wear_date, age_date) if d is not None]
+        replace_by = min(candidates) if candidates else None
+
+        if rest is not None and rest < LEGAL_MIN_TREAD_MM:
+            status = 'illegal'
+        elif (rest is not None and left == 0) or (max_age_date and max_age_date <= today):
+            status = 'replace'
+        elif replace_by and replace_by <= today + timedelta(days=90):
+            status = 'soon'
+        else:
+            status = 'ok'
+
+        results.append({
+            'vehicle_id': vehicle.get('vehicle_id'),
+            'display_name': vehicle.get('display_name'),
+            'tire_set': set_name,
+            'mounted': vehicle.get('tires', {}).get('current') == set_name,
+            'brand': info.get('brand', 'N/A'),
+            'model': info.get('model', 'N/A'),
+            'measured_tread_mm': tread,
+            'km_since_measurement': round(km, 1),
+            'estimated_tread_mm': round(rest, 2) if rest is not None else None,
+            'min_tread_mm': MIN_TREAD_MM.get(set_name, 3.0),
+            'km_until_min_tread': int(left) if left is not None else None,
+            'km_per_day': round(daily, 1),
+            'replacement_by_wear': wear_date.isoformat() if wear_date else None,
+            'production_date': made.isoformat() if made else None,
+            'age_years': round((today - made).days / 365.25, 1) if made else None,
+            'replacement_by_age': age_date.isoformat() if age_date else None,
+            'replace_by': replace_by.isoformat() if replace_by else None,
+            'status': status
+        })
+    return results
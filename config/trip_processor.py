@@ -4,39 +4,25 @@ Trip Processor Service fuer Smart-Car
 Verarbeitet Fahrtdaten und erstellt Trip-Zusammenfassungen.
 """
 
-import os
 import json
 from datetime import datetime, timedelta
 from flask import Flask, request, jsonify
-from influxdb_client import InfluxDBClient
-from influxdb_client.client.write_api import SYNCHRONOUS
+
+from smartcar import influx, settings
 
 app = Flask(__name__)
 
-# InfluxDB Konfiguration
-INFLUXDB_URL = os.environ.get('INFLUXDB_URL', 'http://influxdb:8086')
-INFLUXDB_TOKEN = os.environ.get('INFLUXDB_TOKEN', 'vehicle-admin-token')
-INFLUXDB_ORG = os.environ.get('INFLUXDB_ORG', 'vehicle_org')
-INFLUXDB_BUCKET = os.environ.get('INFLUXDB_BUCKET', 'vehicle_data')
+# InfluxDB Konfiguration (INFLUXDB_* bzw. INFLUX_*, siehe smartcar.settings)
+INFLUXDB_BUCKET = influx.bucket()
 
 # Aktive Fahrten im Speicher
 active_trips = {}
 
-def get_influx_client():
-    """Erstellt InfluxDB Client."""
-    return InfluxDBClient(
-        url=INFLUXDB_URL,
-        token=INFLUXDB_TOKEN,
-        org=INFLUXDB_ORG
-    )
-
-
 def query_trip_data(vehicle_id, start_time, end_time):
     """
     Holt alle GPS-Daten einer Fahrt aus InfluxDB.
     """
-    client = get_influx_client()
-    query_api = client.query_api()
+    query_api = influx.query_api()
     
     query = f'''
     from(bucket: "{INFLUXDB_BUCKET}")
@@ -62,8 +48,6 @@ def query_trip_data(vehicle_id, start_time, end_time):
     except Exception as e:
         print(f"Query-Fehler: {e}")
         return []
-    finally:
-        client.close()
 
 
 def calculate_trip_summary(vehicle_id, trip_id, gps_data):
@@ -160,8 +144,7 @@ def save_trip_summary(summary):
     """
     Speichert Trip-Zusammenfassung in InfluxDB.
     """
-    client = get_influx_client()
-    write_api = client.write_api(write_options=SYNCHRONOUS)
+    write_api = influx.get_write_api()
     
     try:
         line = (
@@ -183,8 +166,6 @@ def save_trip_summary(summary):
     except Exception as e:
         print(f"Fehler beim Speichern: {e}")
         return False
-    finally:
-        client.close()
 
 
 @app.route('/trip/start', methods=['POST'])
@@ -289,8 +270,7 @@ def get_trip_history(vehicle_id):
     """
     days = int(request.args.get('days', 7))
     
-    client = get_influx_client()
-    query_api = client.query_api()
+    query_api = influx.query_api()
     
     query = f'''
     from(bucket: "{INFLUXDB_BUCKET}")
@@ -323,8 +303,6 @@ def get_trip_history(vehicle_id):
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        client.close()
 
 
 @app.route('/health', methods=['GET'])
@@ -338,6 +316,6 @@ def health():
 
 
 if __name__ == '__main__':
-    port = int(os.environ.get('PORT', 5002))
+    port = settings.env_int('PORT', 5002)
     print(f"Trip Processor startet auf Port {port}")
     app.run(host='0.0.0.0', port=port, debug=False)
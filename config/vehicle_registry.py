@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Fahrzeug-Registry fuer Smart-Car
+Haelt vehicles.json geparst im Speicher (Index nach vehicle_id, Reifentyp und
+Kennzeichen) und laedt nur neu, wenn sich die Datei geaendert hat.
+Schreibzugriffe laufen serialisiert und atomar (Temp-Datei + fsync + rename),
+andere Services sehen nie eine halb geschriebene Datei.
+"""
+
+import os
+import copy
+import json
+import time
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: nur Sperre innerhalb des Prozesses
+    fcntl = None
+
+# Eine Sperre pro Datei (innerhalb des Prozesses)
+_file_locks = {}
+_file_locks_guard = threading.Lock()
+
+
+@contextmanager
+def file_lock(path):
+    """
+    Exklusive Sperre fuer `path`: Thread-Lock im Prozess plus flock auf
+    `<path>.lock`, damit auch mehrere Worker-Prozesse nacheinander schreiben.
+    """
+    path = os.path.abspath(path)
+    with _file_locks_guard:
+        lock = _file_locks.setdefault(path, threading.Lock())
+    with lock:
+        if fcntl is None:
+            yield
+            return
+        with open(path + '.lock', 'a') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def atomic_write_json(path, data):
+    """
+    Schreibt `data` als JSON nach `path`, ohne dass Leser jemals eine halbe
+    Datei sehen: Temp-Datei im selben Verzeichnis, fsync, dann os.replace.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        # Rechte der bestehenden Datei uebernehmen (mkstemp legt 0600 an)
+        try:
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o777)
+        except OSError:
+            pass
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    # Verzeichniseintrag ebenfalls sichern (rename ueberlebt Stromausfall)
+    if hasattr(os, 'O_DIRECTORY'):
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def normalize_plate(plate):
+    """Kennzeichen ohne Leerzeichen/Bindestriche in Grossbuchstaben."""
+    return ''.join(ch for ch in (plate or '').upper() if ch.isalnum())
+
+
+class VehicleSnapshot:
+    """
+    Unveraenderlicher Stand von vehicles.json mit Indizes.
+    Wird nie veraendert, sondern bei Aenderungen komplett ersetzt - Leser
+    brauchen daher keine Sperre.
+    """
+
+    __slots__ = ('vehicles', 'by_id', 'by_tire_type', 'by_plate', 'version', 'signature', 'loaded_at')
+
+    def __init__(self, vehicles, version=0, signature=None):
+        self.vehicles = tuple(vehicles)
+        self.by_id = {}
+        self.by_tire_type = {}
+        self.by_plate = {}
+        for vehicle in self.vehicles:
+            vehicle_id = vehicle.get('vehicle_id')
+            if vehicle_id:
+                self.by_id[vehicle_id] = vehicle
+            current = vehicle.get('tires', {}).get('current', 'unknown')
+            self.by_tire_type.setdefault(current, []).append(vehicle)
+            plate = normalize_plate(vehicle.get('license_plate'))
+            if plate:
+                self.by_plate[plate] = vehicle
+        self.version = version
+        self.signature = signature
+        self.loaded_at = time.time()
+
+
+class VehicleRegistry:
+    """
+    Geteilte Fahrzeugliste mit Reload bei Dateiaenderung.
+
+    Die Datei wird hoechstens alle `check_interval` Sekunden per os.stat()
+    geprueft. Nur wenn sich mtime, Inode oder Groesse geaendert haben, wird
+    neu geparst. Schlaegt das Parsen fehl (z.B. halb geschriebene Datei),
+    bleibt der letzte gueltige Stand aktiv.
+    """
+
+    def __init__(self, path, check_interval=1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._snapshot = VehicleSnapshot([])
+        self._next_check = 0.0
+        self._failed_signature = None
+        self._reload_lock = threading.Lock()
+
+    @staticmethod
+    def _signature(stat):
+        return (stat.st_mtime_ns, stat.st_ino, stat.st_size)
+
+    def snapshot(self):
+        """Aktueller Stand (prueft bei Bedarf auf Aenderungen)."""
+        if self._snapshot.signature is None or time.monotonic() >= self._next_check:
+            self._maybe_reload()
+        return self._snapshot
+
+    def _maybe_reload(self, force=False):
+        # Nur ein Thread laedt neu, alle anderen lesen den bisherigen Stand.
+        # Gibt es noch keinen Stand (erster Zugriff), warten sie auf das Laden,
+        # statt die leere Liste zu sehen.
+        cold = self._snapshot.signature is None
+        if not self._reload_lock.acquire(blocking=force or cold):
+            return
+        try:
+            self._next_check = time.monotonic() + self.check_interval
+            try:
+                signature = self._signature(os.stat(self.path))
+            except OSError as e:
+                print(f"Fahrzeugdatei nicht lesbar: {e}")
+                return
+            if not force and signature in (self._snapshot.signature, self._failed_signature):
+                return
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    vehicles = json.load(f).get('vehicles', [])
+            except Exception as e:
+                print(f"Fehler beim Laden der Fahrzeuge: {e}")
+                self._failed_signature = signature
+                return
+            self._failed_signature = None
+            self._snapshot = VehicleSnapshot(vehicles, self._snapshot.version + 1, signature)
+        finally:
+            self._reload_lock.release()
+
+    def reload(self):
+        """Erzwingt ein Neuladen (z.B. nach eigenem Schreibzugriff)."""
+        self._maybe_reload(force=True)
+        return self._snapshot
+
+    @property
+    def version(self):
+        return self.snapshot().version
+
+    def all(self):
+        return self.snapshot().vehicles
+
+    def get(self, vehicle_id):
+        return self.snapshot().by_id.get(vehicle_id)
+
+    def by_license_plate(self, plate):
+        return self.snapshot().by_plate.get(normalize_plate(plate))
+
+    def with_tires(self, tire_type):
+        return list(self.snapshot().by_tire_type.get(tire_type, []))
+
+    def update(self, mutate):
+        """
+        Read-modify-write unter Dateisperre.
+
+        `mutate(vehicles)` bekommt eine frische, veraenderbare Kopie der
+        Fahrzeugliste von der Platte und aendert sie an Ort und Stelle. Gibt
+        sie einen Wert zurueck, wird dieser durchgereicht. Liefert sie
+        `None` und aendert nichts, wird auch nichts geschrieben.
+        Die Datei wird genau einmal atomar ersetzt, egal wie viele
+        Fahrzeuge geaendert wurden.
+        """
+        with file_lock(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            before = copy.deepcopy(data.get('vehicles', []))
+            vehicles = data.setdefault('vehicles', [])
+            result = mutate(vehicles)
+            if vehicles != before:
+                atomic_write_json(self.path, data)
+                self.reload()
+        return result
+
+    def __len__(self):
+        return len(self.snapshot().vehicles)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Differenz-Sync der Fahrzeug-Stammdaten (vehicle_info) fuer Smart-Car
+Gemeinsam genutzt von auto_sync.py (Docker-Start) und sync_vehicles.py.
+
+Pro Fahrzeug wird ein Inhalts-Hash ueber die vehicle_info-Felder gebildet
+und als Feld content_hash mitgeschrieben. Beim naechsten Sync werden die
+zuletzt geschriebenen Hashes mit einer last()-Abfrage (oder aus einer lokalen
+Zustandsdatei) geholt; geschrieben werden nur geaenderte Fahrzeuge, alle in
+einer gebuendelten Anfrage.
+"""
+
+import hashlib
+import json
+
+from influxdb_client import Point
+
+from influx_writer import InfluxBatchWriter
+from vehicle_registry import atomic_write_json, file_lock
+
+
+def vehicle_info_fields(vehicle):
+    """Felder des vehicle_info Points (ohne content_hash)."""
+    vid = vehicle.get("vehicle_id")
+    return {
+        "display_name": vehicle.get("display_name", vid),
+        "manufacturer": vehicle.get("manufacturer", "Unbekannt"),
+        "model": vehicle.get("model", "Unbekannt"),
+        "year": vehicle.get("year", 0),
+        "license_plate": vehicle.get("license_plate", ""),
+        "vin": vehicle.get("vin", ""),
+        "fuel_capacity_l": vehicle.get("fuel_capacity_l", 50),
+        "fuel_type": vehicle.get("fuel_type", "Benzin"),
+        "color": vehicle.get("color", ""),
+        "notes": vehicle.get("notes", "")
+    }
+
+
+def content_hash(fields):
+    """Stabiler Hash ueber die Felder (Reihenfolge egal)."""
+    encoded = json.dumps(fields, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+
+
+def vehicle_info_point(vehicle_id, fields, digest):
+    point = Point("vehicle_info").tag("vehicle_id", vehicle_id)
+    for name, value in fields.items():
+        point.field(name, value)
+    return point.field("content_hash", digest)
+
+
+def load_state(path):
+    """{vehicle_id: hash} aus der Zustandsdatei, None wenn nicht vorhanden."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get("hashes", {})
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"WARNUNG: Sync-Zustand nicht lesbar ({e}) - frage InfluxDB")
+        return None
+
+
+def save_state(path, hashes):
+    with file_lock(path):
+        atomic_write_json(path, {"hashes": hashes})
+
+
+def query_synced_hashes(client, bucket, org):
+    """Zuletzt geschriebener content_hash pro Fahrzeug, eine Abfrage fuer alle."""
+    query = f'''
+    from(bucket: "{bucket}")
+        |> range(start: 0)
+        |> filter(fn: (r) => r["_measurement"] == "vehicle_info" and r["_field"] == "content_hash")
+        |> last()
+        |> keep(columns: ["vehicle_id", "_value"])
+    '''
+    hashes = {}
+    for table in client.query_api().query(query, org=org):
+        for record in table.records:
+            hashes[record.values.get("vehicle_id")] = record.get_value()
+    return hashes
+
+
+def diff_sync(vehicles, url, token, org, bucket, state_path=None, full=False, batch_size=10000,
+              client_factory=None):
+    """
+    Schreibt nur neue oder geaenderte Fahrzeuge.
+    Vergleichsbasis: Zustandsdatei (falls angegeben und vorhanden), sonst
+    last()-Abfrage in InfluxDB; full=True schreibt alles.
+    client_factory: geteilten Client nutzen (z.B. smartcar.influx.get_client).
+    Gibt (geschrieben, unveraendert) zurueck, None bei Schreibfehler.
+    """
+    writer = InfluxBatchWriter(url, token, org, bucket, batch_size=batch_size, client_factory=client_factory)
+    try:
+        current = {}
+        for vehicle in vehicles:
+            vid = vehicle.get("vehicle_id")
+            if not vid:
+                print("WARNUNG: Fahrzeug ohne vehicle_id übersprungen")
+                continue
+            fields = vehicle_info_fields(vehicle)
+            current[vid] = (fields, content_hash(fields))
+
+        previous = {}
+        if not full:
+            previous = load_state(state_path) if state_path else None
+            if previous is None:
+                try:
+                    previous = query_synced_hashes(writer.client, bucket, org)
+                except Exception as e:
+                    print(f"WARNUNG: Letzter Sync-Stand nicht abfragbar ({e}) - schreibe alle")
+                    previous = {}
+
+        changed = [vid for vid, (_, digest) in current.items() if previous.get(vid) != digest]
+        for vid in changed:
+            fields, digest = current[vid]
+            writer.write(vehicle_info_point(vid, fields, digest))
+            print(f"  ✓ {vid}: {fields['display_name']}")
+
+        if changed and not writer.flush():
+            return None
+
+        if state_path:
+            save_state(state_path, {vid: digest for vid, (_, digest) in current.items()})
+        return len(changed), len(current) - len(changed)
+    finally:
+        writer.close()
@@ -8,26 +8,68 @@ import os
 import sys
 import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from requests.adapters import HTTPAdapter
+
+import tire_classifier
 
 try:
-    from influxdb_client import InfluxDBClient, Point
-    from influxdb_client.client.write_api import SYNCHRONOUS
+    from influxdb_client import Point
 except ImportError:
-    print("influxdb-client wird installiert...")
-    import subprocess
-    subprocess.check_call([sys.executable, "-m", "pip", "install", "influxdb-client", "-q"])
-    from influxdb_client import InfluxDBClient, Point
-    from influxdb_client.client.write_api import SYNCHRONOUS
+    print("FEHLER: influxdb-client nicht installiert (pip install influxdb-client)")
+    sys.exit(1)
+
+from influx_spool import LineSpool
+from influx_writer import is_retryable
+from smartcar import influx, settings
+from job_scheduler import JobScheduler
+from service_metrics import Metrics
 
 # Konfiguration
 WEATHER_SERVICE_URL = os.environ.get('WEATHER_SERVICE_URL', 'http://weather-service:5001')
 TIRE_SERVICE_URL = os.environ.get('TIRE_SERVICE_URL', 'http://tire-service:5003')
-INFLUX_URL = os.environ.get('INFLUX_URL', 'http://influxdb:8086')
-INFLUX_TOKEN = os.environ.get('INFLUX_TOKEN', 'vehicle-admin-token')
-INFLUX_ORG = os.environ.get('INFLUX_ORG', 'vehicle_org')
-INFLUX_BUCKET = os.environ.get('INFLUX_BUCKET', 'vehicle_data')
-COLLECT_INTERVAL = int(os.environ.get('COLLECT_INTERVAL', 300))  # 5 Minuten
+INFLUX_ORG = influx.org()
+INFLUX_BUCKET = influx.bucket()
+COLLECT_INTERVAL = settings.env_int('COLLECT_INTERVAL', 300)  # 5 Minuten
+WEATHER_INTERVAL = settings.env_int('WEATHER_INTERVAL', COLLECT_INTERVAL)
+TIRE_INTERVAL = settings.env_int('TIRE_INTERVAL', COLLECT_INTERVAL)
+COLLECT_JITTER = settings.env_float('COLLECT_JITTER', 5)  # Sekunden, pro Tick zufaellig
+COLLECT_WORKERS = settings.env_int('COLLECT_WORKERS', 4)
+# Wetter: "default" = Standardort, "fleet" = Rasterzellen der Fahrzeuge, "both"
+WEATHER_MODE = os.environ.get('WEATHER_MODE', 'default')
+WEATHER_GRID_DECIMALS = settings.env_int('WEATHER_GRID_DECIMALS', 2)  # 2 = ca. 1 km
+FLEET_WEATHER_WORKERS = settings.env_int('FLEET_WEATHER_WORKERS', 8)
+FLEET_GPS_MAX_AGE_HOURS = settings.env_int('FLEET_GPS_MAX_AGE_HOURS', 24)
+STATS_INTERVAL = settings.env_int('COLLECT_STATS_INTERVAL', 3600)  # Laufzeit-Statistik im Log
+
+# Spool fuer Batches, die trotz Retries nicht geschrieben werden konnten
+SPOOL_DIR = os.environ.get('SPOOL_DIR', settings.config_path('spool'))
+SPOOL_MAX_MB = settings.env_float('SPOOL_MAX_MB', 50)
+SPOOL_REPLAY_INTERVAL = settings.env_int('SPOOL_REPLAY_INTERVAL', 30)
+SPOOL_REPLAY_MAX_LINES = settings.env_int('SPOOL_REPLAY_MAX_LINES', 20000)  # pro Lauf
+SPOOL_REPLAY_RATE = settings.env_int('SPOOL_REPLAY_RATE', 2000)  # Zeilen pro Sekunde
+
+spool = LineSpool(SPOOL_DIR, max_bytes=int(SPOOL_MAX_MB * 1024 * 1024))
+
+
+def spool_failed_batch(lines, error):
+    """on_failure des Writers: voruebergehende Fehler spoolen, kaputte Daten nicht."""
+    if is_retryable(error):
+        spool.append(lines)
+        print(f"{len(lines)} Punkte gespoolt ({spool.size_bytes() // 1024} KB im Spool)")
+
+
+# Gebuendeltes Schreiben auf dem geteilten Client: eine Anfrage pro Flush
+# (INFLUX_BATCH_SIZE, INFLUX_FLUSH_INTERVAL, ... siehe smartcar.influx)
+influx_writer = influx.get_writer(on_failure=spool_failed_batch)
+
+collector_metrics = Metrics('weather_collector')
+
+# Parallele Wetterabrufe fuer die Flotte (Keep-Alive zum Weather-Service)
+fleet_pool = ThreadPoolExecutor(max_workers=FLEET_WEATHER_WORKERS, thread_name_prefix='fleet-weather')
+fleet_session = requests.Session()
+fleet_session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=FLEET_WEATHER_WORKERS))
 
 
 def wait_for_services(max_retries=30, delay=5):
@@ -52,81 +94,173 @@ def wait_for_services(max_retries=30, delay=5):
             print(f"  ⚠ {name} nicht erreichbar - fahre trotzdem fort")
 
 
+def fetch_weather(lat=None, lon=None, session=requests):
+    """Aktuelles Wetter vom Weather-Service (ohne Koordinaten: Standardort)."""
+    params = {'lat': lat, 'lon': lon} if lat is not None and lon is not None else None
+    response = session.get(f"{WEATHER_SERVICE_URL}/weather", params=params, timeout=10)
+    if response.status_code != 200:
+        print(f"Weather-API Fehler: {response.status_code}")
+        return None
+    
+    data = response.json()
+    
+    if 'error' in data:
+        print(f"Weather-API Error: {data['error']}")
+        return None
+    if data.get('is_stale'):
+        # Letzter Messwert aus dem Cache - nicht erneut als aktuellen Punkt schreiben
+        print(f"Weather-API liefert veraltete Daten ({data.get('stale_age_s', '?')}s) - uebersprungen")
+        return None
+    return data
+
+
+def weather_point(data, measurement="weather"):
+    """InfluxDB Point aus einer Weather-Service-Antwort."""
+    point = Point(measurement) \
+        .tag("location", data.get('location_name', 'Unknown')) \
+        .field("temperature_c", float(data.get('temperature_c', 0))) \
+        .field("feels_like_c", float(data.get('feels_like_c', 0))) \
+        .field("humidity_percent", float(data.get('humidity_percent', 0))) \
+        .field("pressure_hpa", float(data.get('pressure_hpa', 0))) \
+        .field("wind_speed_ms", float(data.get('wind_speed_ms', 0))) \
+        .field("wind_direction_deg", float(data.get('wind_direction_deg', 0))) \
+        .field("clouds_percent", float(data.get('clouds_percent', 0))) \
+        .field("visibility_m", float(data.get('visibility_m', 10000))) \
+        .field("weather_main", data.get('weather_main', 'Unknown')) \
+        .field("weather_description", data.get('weather_description', ''))
+    
+    # Fahrbedingungen
+    driving_conditions = data.get('driving_conditions', 3)
+    point.field("driving_conditions", int(driving_conditions))
+    point.field("driving_conditions_text", data.get('driving_conditions_text', 'Unbekannt'))
+    return point
+
+
 def collect_weather_data():
-    """Holt Wetterdaten und schreibt sie in InfluxDB."""
+    """Holt Wetterdaten für den Standardort als InfluxDB Point."""
     try:
-        response = requests.get(f"{WEATHER_SERVICE_URL}/weather", timeout=10)
-        if response.status_code != 200:
-            print(f"Weather-API Fehler: {response.status_code}")
-            return None
-        
-        data = response.json()
-        
-        if 'error' in data:
-            print(f"Weather-API Error: {data['error']}")
-            return None
-        
-        # InfluxDB Point erstellen
-        point = Point("weather") \
-            .tag("location", data.get('location_name', 'Unknown')) \
-            .field("temperature_c", float(data.get('temperature_c', 0))) \
-            .field("feels_like_c", float(data.get('feels_like_c', 0))) \
-            .field("humidity_percent", float(data.get('humidity_percent', 0))) \
-            .field("pressure_hpa", float(data.get('pressure_hpa', 0))) \
-            .field("wind_speed_ms", float(data.get('wind_speed_ms', 0))) \
-            .field("wind_direction_deg", float(data.get('wind_direction_deg', 0))) \
-            .field("clouds_percent", float(data.get('clouds_percent', 0))) \
-            .field("visibility_m", float(data.get('visibility_m', 10000))) \
-            .field("weather_main", data.get('weather_main', 'Unknown')) \
-            .field("weather_description", data.get('weather_description', ''))
-        
-        # Fahrbedingungen
-        driving_conditions = data.get('driving_conditions', 3)
-        point.field("driving_conditions", int(driving_conditions))
-        point.field("driving_conditions_text", data.get('driving_conditions_text', 'Unbekannt'))
-        
-        return point
-        
+        data = fetch_weather()
+        return weather_point(data) if data else None
     except Exception as e:
         print(f"Fehler beim Sammeln der Wetterdaten: {e}")
         return None
 
 
+def last_gps_positions():
+    """Letzte GPS-Position pro Fahrzeug (nur Positionen juenger als FLEET_GPS_MAX_AGE_HOURS)."""
+    query = f'''
+    from(bucket: "{INFLUX_BUCKET}")
+        |> range(start: -{FLEET_GPS_MAX_AGE_HOURS}h)
+        |> filter(fn: (r) => r["_measurement"] == "vehicle_gps")
+        |> filter(fn: (r) => r["_field"] == "latitude" or r["_field"] == "longitude")
+        |> last()
+        |> pivot(rowKey: ["vehicle_id"], columnKey: ["_field"], valueColumn: "_value")
+    '''
+    positions = {}
+    for table in influx.query_api().query(query, org=INFLUX_ORG):
+        for record in table.records:
+            lat = record.values.get('latitude')
+            lon = record.values.get('longitude')
+            if lat is not None and lon is not None:
+                positions[record.values.get('vehicle_id')] = (lat, lon)
+    return positions
+
+
+def grid_cell(lat, lon):
+    """Rasterzelle (gerundete Koordinaten), wie tire_service WEATHER_GRID_DECIMALS."""
+    return (round(float(lat), WEATHER_GRID_DECIMALS), round(float(lon), WEATHER_GRID_DECIMALS))
+
+
+def collect_fleet_weather():
+    """
+    Wetter fuer jede von der Flotte belegte Rasterzelle.
+    Pro Zelle genau ein Abruf (parallel); Ergebnis: ein "weather" Point pro
+    Zelle (Tags location, cell; Feld vehicle_ids) und ein "vehicle_weather"
+    Point pro Fahrzeug (Tags vehicle_id, cell) fuer die Zuordnung zu Fahrten.
+    """
+    try:
+        positions = last_gps_positions()
+    except Exception as e:
+        print(f"GPS-Positionen nicht abrufbar: {e}")
+        return []
+    
+    cells = {}
+    for vehicle_id, (lat, lon) in positions.items():
+        cells.setdefault(grid_cell(lat, lon), []).append(vehicle_id)
+    if not cells:
+        return []
+    
+    def fetch(cell):
+        try:
+            return fetch_weather(cell[0], cell[1], session=fleet_session)
+        except Exception as e:
+            print(f"Wetter fuer Zelle {cell} nicht verfuegbar: {e}")
+            return None
+    
+    results = dict(zip(cells, fleet_pool.map(fetch, cells)))
+    
+    points = []
+    for cell, vehicle_ids in sorted(cells.items()):
+        data = results.get(cell)
+        if not data:
+            continue
+        cell_tag = f"{cell[0]},{cell[1]}"
+        vehicle_ids = sorted(vehicle_ids)
+        points.append(weather_point(data)
+                      .tag("cell", cell_tag)
+                      .field("vehicle_ids", ",".join(vehicle_ids))
+                      .field("vehicle_count", len(vehicle_ids)))
+        for vehicle_id in vehicle_ids:
+            points.append(weather_point(data, "vehicle_weather")
+                          .tag("vehicle_id", vehicle_id)
+                          .tag("cell", cell_tag))
+    return points
+
+
+# Letzte /tires/status Antwort für bedingte Abfragen (ETag)
+_tire_status_cache = {'etag': None, 'data': None}
+
+
 def collect_tire_data():
     """Holt Reifenstatus und schreibt ihn in InfluxDB."""
     try:
-        response = requests.get(f"{TIRE_SERVICE_URL}/tires/status", timeout=10)
-        if response.status_code != 200:
+        headers = {}
+        if _tire_status_cache['etag'] and _tire_status_cache['data'] is not None:
+            headers['If-None-Match'] = _tire_status_cache['etag']
+        response = requests.get(f"{TIRE_SERVICE_URL}/tires/status", headers=headers, timeout=10)
+        if response.status_code == 304:
+            data = _tire_status_cache['data']
+        elif response.status_code != 200:
             print(f"Tire-API Fehler: {response.status_code}")
             return []
+        else:
+            data = response.json()
+            _tire_status_cache['etag'] = response.headers.get('ETag')
+            _tire_status_cache['data'] = data
         
-        data = response.json()
         points = []
         
         recommendation = data.get('recommendation', {})
+        vehicles = data.get('vehicles', [])
         
-        for vehicle in data.get('vehicles', []):
+        # Status und numerische Werte einheitlich mit tire_service (tire_classifier)
+        currents = [vehicle.get('current_tires', 'unknown') for vehicle in vehicles]
+        statuses = tire_classifier.classify_many(currents, recommendation)
+        recommended_value = tire_classifier.tire_value(recommendation.get('recommended', 'unknown'))
+        
+        for vehicle, current, status in zip(vehicles, currents, statuses):
             vehicle_id = vehicle.get('vehicle_id', 'unknown')
             
-            # Status zu numerischem Wert
-            status_map = {'ok': 0, 'warning': 1, 'critical': 2, 'unknown': -1}
-            status_value = status_map.get(vehicle.get('status', 'unknown'), -1)
-            
-            # Reifentyp zu numerischem Wert (für Grafana Farben)
-            tire_map = {'summer': 1, 'winter': 2, 'allseason': 3, 'unknown': 0}
-            current_tires_value = tire_map.get(vehicle.get('current_tires', 'unknown'), 0)
-            recommended_value = tire_map.get(recommendation.get('recommended', 'unknown'), 0)
-            
             point = Point("tire_status") \
                 .tag("vehicle_id", vehicle_id) \
                 .tag("display_name", vehicle.get('display_name', vehicle_id)) \
-                .field("current_tires", vehicle.get('current_tires', 'unknown')) \
-                .field("current_tires_value", current_tires_value) \
+                .field("current_tires", current) \
+                .field("current_tires_value", tire_classifier.tire_value(current)) \
                 .field("tire_brand", vehicle.get('tire_brand', 'N/A')) \
                 .field("tire_size", vehicle.get('tire_size', 'N/A')) \
-                .field("status", vehicle.get('status', 'unknown')) \
-                .field("status_value", status_value) \
-                .field("status_text", vehicle.get('status_text', '')) \
+                .field("status", status.status) \
+                .field("status_value", status.value) \
+                .field("status_text", status.text) \
                 .field("recommended", recommendation.get('recommended', 'unknown')) \
                 .field("recommended_value", recommended_value) \
                 .field("recommendation_label", recommendation.get('label', ''))
@@ -141,67 +275,107 @@ def collect_tire_data():
 
 
 def write_to_influx(points):
-    """Schreibt Punkte in InfluxDB."""
+    """Puffert Punkte fuer den naechsten Flush (kein eigener Request)."""
     if not points:
         return False
-    
-    try:
-        client = InfluxDBClient(url=INFLUX_URL, token=INFLUX_TOKEN, org=INFLUX_ORG)
-        write_api = client.write_api(write_options=SYNCHRONOUS)
-        
-        if isinstance(points, list):
-            for point in points:
-                write_api.write(bucket=INFLUX_BUCKET, record=point)
-        else:
-            write_api.write(bucket=INFLUX_BUCKET, record=points)
-        
-        client.close()
+    influx_writer.write(points)
+    return True
+
+
+def now_str():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def weather_job():
+    """Sammel-Job: aktuelles Wetter."""
+    weather_point = collect_weather_data()
+    if not weather_point:
+        print(f"[{now_str()}] Wetter: Keine Daten ✗")
+        return False
+    write_to_influx(weather_point)
+    temp = weather_point._fields.get('temperature_c', 'N/A')
+    print(f"[{now_str()}] Wetter: {temp}°C ✓")
+    return True
+
+
+def fleet_weather_job():
+    """Sammel-Job: Wetter an den Fahrzeugstandorten (ein Schreibvorgang)."""
+    points = collect_fleet_weather()
+    if not points:
+        print(f"[{now_str()}] Flotten-Wetter: Keine Daten ✗")
+        return False
+    write_to_influx(points)
+    cells = sum(1 for point in points if point._name == "weather")
+    print(f"[{now_str()}] Flotten-Wetter: {cells} Zellen, {len(points) - cells} Fahrzeuge ✓")
+    return True
+
+
+def tire_job():
+    """Sammel-Job: Reifenstatus aller Fahrzeuge."""
+    tire_points = collect_tire_data()
+    if not tire_points:
+        print(f"[{now_str()}] Reifen: Keine Daten ✗")
+        return False
+    write_to_influx(tire_points)
+    print(f"[{now_str()}] Reifen: {len(tire_points)} Fahrzeuge ✓")
+    return True
+
+
+def spool_replay_job():
+    """Liefert gespoolte Punkte nach, sobald InfluxDB wieder erreichbar ist."""
+    if spool.is_empty():
         return True
-        
-    except Exception as e:
-        print(f"InfluxDB Fehler: {e}")
+    if not influx_writer.ping():
+        print(f"[{now_str()}] Spool: InfluxDB nicht erreichbar, {spool.size_bytes() // 1024} KB warten")
         return False
+    sent = spool.replay(influx_writer.send, batch_size=influx_writer.batch_size,
+                        max_lines=SPOOL_REPLAY_MAX_LINES, lines_per_second=SPOOL_REPLAY_RATE)
+    print(f"[{now_str()}] Spool: {sent} Punkte nachgeliefert, {spool.size_bytes() // 1024} KB verbleibend")
+    return sent > 0 or spool.is_empty()
+
+
+# Sammel-Jobs: (Name, Funktion, Intervall in s). Neue Collector hier eintragen;
+# die Funktion puffert ihre Punkte ueber write_to_influx, False = fehlgeschlagen.
+COLLECT_JOBS = [
+    ('tires', tire_job, TIRE_INTERVAL),
+]
+if WEATHER_MODE in ('default', 'both'):
+    COLLECT_JOBS.append(('weather', weather_job, WEATHER_INTERVAL))
+if WEATHER_MODE in ('fleet', 'both'):
+    COLLECT_JOBS.append(('fleet_weather', fleet_weather_job, WEATHER_INTERVAL))
+
+
+def log_stats(scheduler):
+    """Laufzeiten der Jobs und Schreibstatistik ins Log."""
+    histograms = {h['labels'].get('job'): h for h in collector_metrics.snapshot()['histograms']}
+    for name, info in scheduler.status().items():
+        hist = histograms.get(name, {})
+        print(f"[{now_str()}] Job {name}: {info['runs']} Laeufe, {info['failures']} Fehler, "
+              f"{info['skipped']} uebersprungen, avg {hist.get('avg_ms')} ms, p95 {hist.get('p95_ms')} ms")
+    print(f"[{now_str()}] InfluxDB: {influx_writer.stats}, Spool {spool.size_bytes() // 1024} KB")
 
 
 def main():
-    """Hauptschleife."""
+    """Startet die Sammel-Jobs im Scheduler."""
     print("=" * 50)
     print("Smart-Car Weather & Tire Collector")
-    print(f"Intervall: {COLLECT_INTERVAL} Sekunden")
+    for name, _, interval in COLLECT_JOBS:
+        print(f"Job {name}: alle {interval} Sekunden (Jitter bis {COLLECT_JITTER:.0f}s)")
     print("=" * 50)
     
     # Auf Services warten
     wait_for_services()
     
-    print(f"\nStarte Sammlung alle {COLLECT_INTERVAL}s...")
+    influx_writer.start()
     
-    while True:
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        
-        # Wetterdaten sammeln
-        weather_point = collect_weather_data()
-        if weather_point:
-            if write_to_influx(weather_point):
-                temp = weather_point._fields.get('temperature_c', 'N/A')
-                print(f"[{timestamp}] Wetter: {temp}°C ✓")
-            else:
-                print(f"[{timestamp}] Wetter: Schreibfehler ✗")
-        else:
-            print(f"[{timestamp}] Wetter: Keine Daten ✗")
-        
-        # Reifendaten sammeln
-        tire_points = collect_tire_data()
-        if tire_points:
-            if write_to_influx(tire_points):
-                print(f"[{timestamp}] Reifen: {len(tire_points)} Fahrzeuge ✓")
-            else:
-                print(f"[{timestamp}] Reifen: Schreibfehler ✗")
-        else:
-            print(f"[{timestamp}] Reifen: Keine Daten ✗")
-        
-        # Warten
-        time.sleep(COLLECT_INTERVAL)
-
+    scheduler = JobScheduler(max_workers=COLLECT_WORKERS, metrics=collector_metrics)
+    for name, func, interval in COLLECT_JOBS:
+        scheduler.add_job(name, func, interval, jitter=COLLECT_JITTER)
+    scheduler.add_job('spool_replay', spool_replay_job, SPOOL_REPLAY_INTERVAL, initial_delay=SPOOL_REPLAY_INTERVAL)
+    scheduler.add_job('stats', lambda: log_stats(scheduler), STATS_INTERVAL, initial_delay=STATS_INTERVAL)
+    
+    print(f"\nStarte Sammlung ({len(COLLECT_JOBS)} Jobs, {COLLECT_WORKERS} Threads)...")
+    scheduler.run_forever()
 
 if __name__ == '__main__':
     main()
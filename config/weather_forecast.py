@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Wettervorhersage-Speicher fuer Smart-Car
+Haelt die 5-Tage-Vorhersage von OpenWeatherMap pro Rasterzelle im Speicher
+und beantwortet "Wetter zum Zeitpunkt T" per Binaersuche.
+"""
+
+import time
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+
+
+def parse_owm_forecast(data):
+    """
+    Wandelt eine OpenWeatherMap /forecast Antwort in flache Eintraege um.
+    Feldnamen entsprechen denen von /weather im Weather-Service.
+    """
+    entries = []
+    for item in data.get('list', []):
+        weather = (item.get('weather') or [{}])[0]
+        main = item.get('main', {})
+        entries.append({
+            'dt': int(item.get('dt', 0)),
+            'time': datetime.fromtimestamp(item.get('dt', 0)).isoformat(),
+            'temperature_c': main.get('temp', 0),
+            'feels_like_c': main.get('feels_like', 0),
+            'temp_min_c': main.get('temp_min', main.get('temp', 0)),
+            'humidity_percent': main.get('humidity', 0),
+            'pressure_hpa': main.get('pressure', 0),
+            'wind_speed_ms': item.get('wind', {}).get('speed', 0),
+            'clouds_percent': item.get('clouds', {}).get('all', 0),
+            'visibility_m': item.get('visibility', 10000),
+            'precipitation_probability': item.get('pop', 0),
+            'weather_main': weather.get('main', 'Unknown'),
+            'weather_description': weather.get('description', ''),
+            'weather_icon': weather.get('icon', '')
+        })
+    return entries
+
+
+class ForecastSeries:
+    """Zeitlich sortierte Vorhersage einer Rasterzelle."""
+
+    __slots__ = ('cell', 'fetched_at', 'location_name', '_times', '_entries')
+
+    # Maximaler Abstand zum naechsten Vorhersagepunkt (OWM liefert 3h-Schritte)
+    MAX_GAP_SECONDS = 3 * 3600
+
+    def __init__(self, cell, entries, fetched_at=None, location_name=''):
+        ordered = sorted(entries, key=lambda e: e['dt'])
+        self.cell = cell
+        self.fetched_at = fetched_at if fetched_at is not None else time.time()
+        self.location_name = location_name
+        self._times = [e['dt'] for e in ordered]
+        self._entries = ordered
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def start(self):
+        return self._times[0] if self._times else None
+
+    @property
+    def end(self):
+        return self._times[-1] if self._times else None
+
+    def entries(self):
+        return list(self._entries)
+
+    def age(self):
+        return time.time() - self.fetched_at
+
+    def at(self, ts):
+        """Naechstgelegener Vorhersagepunkt zum Unix-Zeitstempel `ts` oder None."""
+        if not self._times:
+            return None
+        idx = bisect_left(self._times, ts)
+        if idx == 0:
+            best = 0
+        elif idx == len(self._times):
+            best = idx - 1
+        else:
+            before, after = self._times[idx - 1], self._times[idx]
+            best = idx if after - ts < ts - before else idx - 1
+        if abs(self._times[best] - ts) > self.MAX_GAP_SECONDS:
+            return None
+        return self._entries[best]
+
+    def window(self, start_ts, end_ts):
+        """Alle Vorhersagepunkte mit start_ts <= dt <= end_ts."""
+        lo = bisect_left(self._times, start_ts)
+        hi = bisect_right(self._times, end_ts)
+        return self._entries[lo:hi]
+
+
+class ForecastStore:
+    """
+    Vorhersagen pro Rasterzelle mit Ablaufzeit.
+
+    `fetch_func(cell)` liefert (entries, location_name) oder wirft eine
+    Exception. Pro Zelle wird hoechstens ein Abruf gleichzeitig ausgefuehrt,
+    parallele Anfragen warten auf dessen Ergebnis. Ein fehlgeschlagener
+    Abruf wird `negative_ttl_seconds` lang nicht wiederholt.
+
+    Laeuft der Prefetcher, blockieren Anfragen nie auf OpenWeatherMap:
+    `cached()` antwortet aus dem Speicher und reiht fehlende Zellen fuer
+    den Prefetch-Thread ein.
+
+    Es werden hoechstens `max_cells` Zellen gemerkt; darueber hinaus
+    verdraengt jeder Zugriff die am laengsten nicht genutzten (auch ohne
+    Prefetcher, der sonst ungenutzte Zellen entfernt).
+    """
+
+    def __init__(self, fetch_func, max_age_seconds=3 * 3600, negative_ttl_seconds=60, max_cells=1000):
+        self.fetch_func = fetch_func
+        self.max_age_seconds = max_age_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.max_cells = max_cells
+        self._series = {}
+        self._last_access = {}
+        self._cell_locks = {}
+        self._failed = {}
+        self._wanted = set()
+        self._pinned = set()
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._prefetch_thread = None
+
+    def _cell_lock(self, cell):
+        with self._lock:
+            lock = self._cell_locks.get(cell)
+            if lock is None:
+                lock = self._cell_locks[cell] = threading.Lock()
+            return lock
+
+    def _touch(self, cell):
+        """Merkt den Zugriff auf eine Zelle und haelt die Zahl der Zellen begrenzt."""
+        self._last_access[cell] = time.time()
+        if len(self._last_access) > self.max_cells:
+            self.evict_oldest(self.max_cells)
+
+    def _drop(self, cell):
+        """Vergisst eine Zelle (Aufruf unter self._lock). False, wenn sie gerade gebraucht wird."""
+        if cell in self._pinned or cell in self._wanted:
+            return False
+        lock = self._cell_locks.get(cell)
+        if lock is not None and lock.locked():
+            return False  # Abruf laeuft gerade
+        self._last_access.pop(cell, None)
+        self._series.pop(cell, None)
+        self._cell_locks.pop(cell, None)
+        self._failed.pop(cell, None)
+        return True
+
+    def _recently_failed(self, cell):
+        failed_at = self._failed.get(cell)
+        return failed_at is not None and time.time() - failed_at < self.negative_ttl_seconds
+
+    def _fetch(self, cell, label):
+        """Ruft die Vorhersage ab (unter dem Zellen-Lock), merkt sich Fehlschlaege."""
+        try:
+            entries, location_name = self.fetch_func(cell)
+        except Exception as e:
+            self._failed[cell] = time.time()
+            print(f"{label} fuer {cell} fehlgeschlagen: {e}")
+            return None
+        self._failed.pop(cell, None)
+        series = ForecastSeries(cell, entries, location_name=location_name)
+        self._series[cell] = series
+        return series
+
+    def get(self, cell, allow_stale=True):
+        """
+        Vorhersage fuer eine Zelle. Laedt synchron nach, wenn keine oder eine
+        abgelaufene Vorhersage vorliegt. Schlaegt der Abruf fehl (oder ist er
+        eben erst fehlgeschlagen), wird bei `allow_stale` die alte Vorhersage
+        zurueckgegeben.
+        """
+        self._touch(cell)
+        series = self._series.get(cell)
+        if series is not None and series.age() < self.max_age_seconds:
+            return series
+        if self._recently_failed(cell):
+            return series if allow_stale else None
+
+        with self._cell_lock(cell):
+            # Ein anderer Thread hat evtl. gerade geladen
+            series = self._series.get(cell)
+            if series is not None and series.age() < self.max_age_seconds:
+                return series
+            if self._recently_failed(cell):
+                return series if allow_stale else None
+            fresh = self._fetch(cell, 'Vorhersage')
+            if fresh is None:
+                return series if allow_stale else None
+            return fresh
+
+    def cached(self, cell):
+        """
+        Vorhersage ohne Netzwerkzugriff (auch abgelaufen), sonst None.
+        Fehlende oder abgelaufene Zellen werden fuer den Prefetcher
+        eingereiht. Ohne laufenden Prefetcher wird wie bisher synchron
+        geladen.
+        """
+        if self._prefetch_thread is None:
+            return self.get(cell)
+        series = self.peek(cell)
+        if self.needs_refresh(cell) and not self._recently_failed(cell):
+            with self._lock:
+                self._wanted.add(cell)
+            self._wakeup.set()
+        return series
+
+    def peek(self, cell):
+        """Vorhandene Vorhersage (auch abgelaufen) ohne Nachladen, sonst None."""
+        self._touch(cell)
+        return self._series.get(cell)
+
+    def needs_refresh(self, cell):
+        series = self._series.get(cell)
+        return series is None or series.age() >= self.max_age_seconds
+
+    def conditions_at(self, cell, when):
+        """Vorhersage fuer Zelle und Zeitpunkt (datetime oder Unix-Zeit)."""
+        series = self.cached(cell)
+        if series is None:
+            return None
+        ts = when.timestamp() if isinstance(when, datetime) else float(when)
+        return series.at(ts)
+
+    def window(self, cell, start, end):
+        series = self.cached(cell)
+        if series is None:
+            return []
+        start_ts = start.timestamp() if isinstance(start, datetime) else float(start)
+        end_ts = end.timestamp() if isinstance(end, datetime) else float(end)
+        return series.window(start_ts, end_ts)
+
+    def hot_cells(self, within_seconds):
+        """Zellen, die in den letzten `within_seconds` abgefragt wurden."""
+        cutoff = time.time() - within_seconds
+        return [cell for cell, ts in list(self._last_access.items()) if ts >= cutoff]
+
+    def evict_idle(self, idle_seconds):
+        """
+        Entfernt Zellen, die seit `idle_seconds` nicht abgefragt wurden
+        (beliebige lat/lon-Werte sollen den Speicher nicht fuellen).
+        """
+        cutoff = time.time() - idle_seconds
+        evicted = 0
+        with self._lock:
+            for cell, ts in list(self._last_access.items()):
+                if ts < cutoff and self._drop(cell):
+                    evicted += 1
+        return evicted
+
+    def evict_oldest(self, keep):
+        """Verdraengt die am laengsten nicht genutzten Zellen, bis hoechstens 90% von `keep` bleiben."""
+        target = int(keep * 0.9)
+        evicted = 0
+        with self._lock:
+            excess = len(self._last_access) - target
+            for cell, _ in sorted(list(self._last_access.items()), key=lambda item: item[1]):
+                if evicted >= excess:
+                    break
+                if self._drop(cell):
+                    evicted += 1
+        return evicted
+
+    def _take_wanted(self):
+        with self._lock:
+            wanted, self._wanted = self._wanted, set()
+        return wanted
+
+    def prefetch(self, cells):
+        """Laedt Vorhersagen, die bald ablaufen, im Voraus nach."""
+        refreshed = 0
+        for cell in cells:
+            series = self._series.get(cell)
+            # 80% der Lebensdauer erreicht -> vorab erneuern
+            if series is None or series.age() >= self.max_age_seconds * 0.8:
+                if self._recently_failed(cell):
+                    continue
+                with self._cell_lock(cell):
+                    if self._fetch(cell, 'Vorhersage-Prefetch') is not None:
+                        refreshed += 1
+        return refreshed
+
+    def start_prefetcher(self, interval_seconds, seed_cells=(), active_within_seconds=86400):
+        """
+        Startet einen Hintergrund-Thread, der aktive Zellen aktuell haelt.
+        Alle `interval_seconds` werden die aktiven Zellen erneuert und
+        ungenutzte entfernt; dazwischen laedt er sofort die von `cached()`
+        eingereihten Zellen.
+        """
+        if self._prefetch_thread is not None:
+            return self._prefetch_thread
+
+        for cell in seed_cells:
+            self._pinned.add(cell)
+            self._last_access.setdefault(cell, time.time())
+
+        def loop():
+            next_full = 0
+            while True:
+                self._wakeup.clear()
+                try:
+                    cells = self._take_wanted()
+                    if time.time() >= next_full:
+                        self.evict_idle(active_within_seconds)
+                        cells.update(self.hot_cells(active_within_seconds))
+                        next_full = time.time() + interval_seconds
+                    self.prefetch(cells)
+                except Exception as e:
+                    print(f"Vorhersage-Prefetch Fehler: {e}")
+                self._wakeup.wait(max(0.0, next_full - time.time()))
+
+        self._prefetch_thread = threading.Thread(target=loop, daemon=True)
+        self._prefetch_thread.start()
+        return self._prefetch_thread
+
+    def __len__(self):
+        return len(self._series)
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Regelwerk fuer Saison, Reifen und Strassenzustand (Smart-Car)
+Die O-bis-O-Saison kommt aus smartcar.season, Empfehlungen werden ueber
+vorberechnete Tabellen nachgeschlagen statt pro Anfrage ausgewertet.
+"""
+
+# Ostern/Saison liegen in smartcar.season, hier fuer bestehende Importe
+from smartcar.season import get_easter_date, is_winter_season  # noqa: F401
+
+
+# Witterung, bei der Winterreifen Pflicht sind (§2 Abs. 3a StVO)
+WINTER_WEATHER = frozenset(['snow', 'sleet', 'freezing rain', 'ice', 'hail'])
+
+# Temperaturgrenzen aller Regeln (<= Grenze gehoert zum unteren Bucket).
+# Jeder Bucket hat einen Repraesentanten, mit dem die Tabellen befuellt werden.
+_BUCKET_REPRESENTATIVES = (-5.0, 2.0, 4.0, 6.0, 20.0, 32.0, 40.0, float('nan'))
+
+
+# ===========================================
+# KLASSIFIKATION DER EINGABEN
+# ===========================================
+def temperature_bucket(temp_c):
+    """Ordnet eine Temperatur dem Bucket zu, in dem alle Regeln gleich entscheiden."""
+    if temp_c <= 0:
+        return 0
+    if temp_c <= 3:
+        return 1
+    if temp_c <= 5:
+        return 2
+    if temp_c <= 7:
+        return 3
+    if temp_c < 30:
+        return 4
+    if temp_c < 35:
+        return 5
+    if temp_c >= 35:
+        return 6
+    return 7  # NaN
+
+
+_weather_lower_cache = {}
+
+
+def normalize_weather(weather_main):
+    """weather_main in Kleinbuchstaben, gecacht (OWM liefert wenige Werte)."""
+    lower = _weather_lower_cache.get(weather_main)
+    if lower is None:
+        lower = weather_main.lower() if weather_main else ''
+        if len(_weather_lower_cache) < 256:
+            _weather_lower_cache[weather_main] = lower
+    return lower
+
+
+# ===========================================
+# REIFENEMPFEHLUNG
+# ===========================================
+class RecommendationTable:
+    """
+    Vorberechnete Reifenempfehlungen.
+
+    `decide(temp_c, winter_weather, winter_season)` liefert einen
+    Ergebnis-Schluessel, `templates` bildet diesen auf das Antwort-Dict ab.
+    Strings in den Templates duerfen `{temp:.1f}` enthalten. Die
+    Entscheidung wird fuer jede Kombination aus (Temperatur-Bucket,
+    Winterwitterung, Saison) einmalig vorab ausgewertet.
+    """
+
+    # Obergrenze fuer gerenderte Antworten (Temperaturen wiederholen sich stark)
+    RENDER_CACHE_SIZE = 1024
+
+    def __init__(self, decide, templates):
+        self._rendered = {}
+        self._templates = {}
+        for outcome, template in templates.items():
+            dynamic = tuple(k for k, v in template.items() if isinstance(v, str) and '{' in v)
+            self._templates[outcome] = (template, dynamic)
+
+        self._table = {}
+        for bucket, temp in enumerate(_BUCKET_REPRESENTATIVES):
+            for winter_weather in (False, True):
+                for winter_season in (False, True):
+                    self._table[(bucket, winter_weather, winter_season)] = decide(temp, winter_weather, winter_season)
+
+    def outcome(self, temp_c, weather_main, winter_season):
+        """Ergebnis-Schluessel ohne Antwort-Dict (fuer Vergleiche/Zaehlungen)."""
+        winter_weather = normalize_weather(weather_main) in WINTER_WEATHER
+        return self._table[(temperature_bucket(temp_c), winter_weather, winter_season)]
+
+    def render(self, outcome, temp_c):
+        """Antwort-Dict fuer ein Ergebnis (immer eine neue Kopie)."""
+        key = (outcome, temp_c)
+        cached = self._rendered.get(key)
+        if cached is None:
+            template, dynamic = self._templates[outcome]
+            cached = dict(template)
+            for field in dynamic:
+                cached[field] = template[field].format(temp=temp_c)
+            if len(self._rendered) >= self.RENDER_CACHE_SIZE:
+                self._rendered.clear()
+            self._rendered[key] = cached
+        return dict(cached)
+
+    def evaluate(self, temp_c, weather_main, date=None):
+        """Empfehlung fuer einen Messwert."""
+        return self.render(self.outcome(temp_c, weather_main, is_winter_season(date)), temp_c)
+
+    def evaluate_many(self, samples, date=None):
+        """
+        Empfehlungen fuer viele (temp_c, weather_main)-Paare, z.B. die ganze
+        Flotte. Die Saison wird nur einmal bestimmt.
+        """
+        winter_season = is_winter_season(date)
+        render = self.render
+        outcome = self.outcome
+        return [render(outcome(temp_c, weather_main, winter_season), temp_c) for temp_c, weather_main in samples]
+
+
+# ===========================================
+# STRASSENZUSTAND
+# ===========================================
+def _visibility_bucket(visibility):
+    if visibility < 1000:
+        return 0
+    if visibility < 5000:
+        return 1
+    return 2
+
+
+class RoadConditionTable:
+    """
+    Vorberechneter Strassenzustand.
+
+    `rules(temp_c, weather_main, humidity, visibility)` ist die Referenz-
+    Implementierung. Sie wird beim Erzeugen fuer jede Kombination aus
+    (Temperatur-Bucket, Wetterlage, Sicht-Bucket, Luftfeuchte > 90%)
+    einmal ausgewertet.
+    """
+
+    WEATHER_KEYS = ('rain', 'drizzle', 'thunderstorm', 'snow', '')
+
+    def __init__(self, rules):
+        self._table = {}
+        for bucket, temp in enumerate(_BUCKET_REPRESENTATIVES):
+            for weather in self.WEATHER_KEYS:
+                for vis_bucket, visibility in enumerate((500, 2000, 10000)):
+                    for humid, humidity in ((False, 50), (True, 95)):
+                        self._table[(bucket, weather, vis_bucket, humid)] = rules(temp, weather, humidity, visibility)
+
+    def evaluate(self, temp_c, weather_main, humidity, visibility):
+        weather = normalize_weather(weather_main)
+        if weather not in self.WEATHER_KEYS:
+            weather = ''
+        result = self._table[(temperature_bucket(temp_c), weather, _visibility_bucket(visibility), humidity > 90)]
+        return {
+            'conditions': list(result['conditions']),
+            'risk_level': result['risk_level'],
+            'risk_category': result['risk_category'],
+            'risk_color': result['risk_color']
+        }
+
+    def evaluate_many(self, samples):
+        """Strassenzustand fuer viele (temp_c, weather_main, humidity, visibility)-Tupel."""
+        return [self.evaluate(*sample) for sample in samples]
@@ -6,10 +6,17 @@ Inkl. Reifenempfehlungen und Fahrbedingungen.
 """
 
 import os
-import json
+import time
+import threading
 import requests
-from datetime import datetime
-from flask import Flask, request, jsonify
+from requests.adapters import HTTPAdapter
+from datetime import datetime, timedelta
+from flask import Flask, request, jsonify, Response
+
+import weather_rules
+from smartcar import settings
+from service_metrics import Metrics
+from weather_forecast import ForecastStore, parse_owm_forecast
 
 app = Flask(__name__)
 
@@ -17,162 +24,227 @@ app = Flask(__name__)
 OPENWEATHERMAP_API_KEY = os.environ.get('OPENWEATHERMAP_API_KEY', '')
 DEFAULT_LAT = os.environ.get('DEFAULT_LAT', '49.2354')  # Saarbrücken
 DEFAULT_LON = os.environ.get('DEFAULT_LON', '6.9958')
-CACHE_DURATION_SECONDS = 600  # 10 Minuten
+OPENWEATHERMAP_BASE_URL = os.environ.get('OPENWEATHERMAP_BASE_URL', 'https://api.openweathermap.org/data/2.5')
+CACHE_DURATION_SECONDS = settings.env_int('CACHE_DURATION_SECONDS', 600)  # 10 Minuten
+# Bei API-Ausfall veraltete Cache-Daten hoechstens so lange ausliefern, danach Fallback
+STALE_MAX_AGE_SECONDS = settings.env_int('STALE_MAX_AGE_SECONDS', 3 * 3600)
+WEATHER_CACHE_MAX_ENTRIES = settings.env_int('WEATHER_CACHE_MAX_ENTRIES', 1000)
+# Obergrenze fuer /debug/cache?limit=
+DEBUG_CACHE_MAX_LIMIT = 200
+
+# Rasterzellen: Koordinaten werden auf N Nachkommastellen gerundet (2 = ca. 1 km)
+WEATHER_GRID_DECIMALS = settings.env_int('WEATHER_GRID_DECIMALS', 2)
+
+# Vorhersage: OWM aktualisiert alle 3h
+FORECAST_MAX_AGE_SECONDS = settings.env_int('FORECAST_MAX_AGE_SECONDS', 3 * 3600)
+FORECAST_PREFETCH_INTERVAL = settings.env_int('FORECAST_PREFETCH_INTERVAL', 600)
+# Vorhersage reicht 5 Tage -> /weather/tires?hours= hoechstens so weit
+TIRE_OUTLOOK_MAX_HOURS = 120
+# Fehlgeschlagene Abrufe einer Zelle so lange nicht wiederholen
+FORECAST_NEGATIVE_TTL_SECONDS = settings.env_int('FORECAST_NEGATIVE_TTL_SECONDS', 60)
+# Hoechstzahl gemerkter Vorhersage-Zellen (beliebige lat/lon pro Anfrage)
+FORECAST_MAX_CELLS = settings.env_int('FORECAST_MAX_CELLS', 1000)
+
+# Upstream-Budget: getrennte Connect/Read-Timeouts (Sekunden)
+OWM_CONNECT_TIMEOUT = settings.env_float('OWM_CONNECT_TIMEOUT', 3.05)
+OWM_READ_TIMEOUT = settings.env_float('OWM_READ_TIMEOUT', 5)
+OWM_POOL_SIZE = settings.env_int('OWM_POOL_SIZE', 10)
 
-# Cache fuer Wetterdaten
+# Circuit Breaker: nach N Fehlern fuer X Sekunden keine Upstream-Aufrufe
+BREAKER_FAILURE_THRESHOLD = settings.env_int('BREAKER_FAILURE_THRESHOLD', 3)
+BREAKER_RESET_SECONDS = settings.env_float('BREAKER_RESET_SECONDS', 60)
+
+# Cache fuer Wetterdaten (Einfuegereihenfolge = Verdraengungsreihenfolge).
+# Aenderungen nur unter weather_cache_lock (parallele Threads verdraengen sonst doppelt)
 weather_cache = {}
+weather_cache_lock = threading.Lock()
+
+# Metriken: Anfragen pro Pfad (hit, miss, stale, fallback), Upstream-Latenz, Verdraengungen.
+# Pro Worker-Prozess (Label worker=<pid>), ebenso Cache, Hit-Ratio und /debug/cache
+weather_metrics = Metrics('weather_service', per_process=True)
+
+# Gemeinsame HTTP-Session (Connection-Pooling / Keep-Alive zu OpenWeatherMap)
+http_session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=OWM_POOL_SIZE, pool_maxsize=OWM_POOL_SIZE)
+http_session.mount('https://', _adapter)
+http_session.mount('http://', _adapter)
+
+
+def grid_cell(lat, lon):
+    """
+    Rundet Koordinaten auf die Rasterzelle, die sich Cache-Eintraege teilen.
+    Ungueltige Angaben (keine Zahl, ausserhalb des Wertebereichs) ergeben None.
+    """
+    try:
+        lat, lon = float(lat), float(lon)
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):  # auch NaN
+        return None
+    return (round(lat, WEATHER_GRID_DECIMALS), round(lon, WEATHER_GRID_DECIMALS))
+
 
 # ===========================================
-# OSTERN BERECHNUNG (für O-bis-O Regel)
+# CIRCUIT BREAKER (Schutz vor haengender Wetter-API)
 # ===========================================
-def get_easter_date(year):
-    """
-    Berechnet Ostersonntag nach Gauss-Algorithmus.
-    """
-    a = year % 19
-    b = year // 100
-    c = year % 100
-    d = b // 4
-    e = b % 4
-    f = (b + 8) // 25
-    g = (b - f + 1) // 3
-    h = (19 * a + b - d - g + 15) % 30
-    i = c // 4
-    k = c % 4
-    l = (32 + 2 * e + 2 * i - h - k) % 7
-    m = (a + 11 * h + 22 * l) // 451
-    month = (h + l - 7 * m + 114) // 31
-    day = ((h + l - 7 * m + 114) % 31) + 1
-    return datetime(year, month, day)
-
-
-def is_winter_season(date=None):
-    """
-    Prüft ob wir in der Winterreifen-Saison sind (O-bis-O Regel).
-    Oktober bis Ostern = Winterreifen empfohlen
-    Ostern bis Oktober = Sommerreifen empfohlen
-    """
-    if date is None:
-        date = datetime.now()
-    
-    year = date.year
-    month = date.month
-    
-    # Oktober-Dezember: definitiv Wintersaison
-    if month >= 10:
-        return True
-    
-    # Januar-April: Ostern prüfen
-    if month <= 4:
-        easter = get_easter_date(year)
-        # Vor Ostern = Wintersaison
-        if date.date() < easter.date():
+class CircuitBreaker:
+    """
+    Einfacher Circuit Breaker mit den Zustaenden closed, open und half_open.
+
+    closed:    Aufrufe laufen normal, Fehler werden gezaehlt.
+    open:      Nach `failure_threshold` Fehlern in Folge werden Aufrufe sofort
+               abgelehnt, bis `reset_timeout` Sekunden vergangen sind.
+    half_open: Genau ein Probe-Aufruf darf durch. Erfolg schliesst den
+               Breaker, ein Fehler oeffnet ihn erneut.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=3, reset_timeout=60):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow_request(self):
+        """True wenn ein Upstream-Aufruf erlaubt ist."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+            # half_open: nur ein Probe-Aufruf gleichzeitig
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
             return True
-        # Nach Ostern = Sommersaison
-        return False
-    
-    # Mai-September: Sommersaison
-    return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def status(self):
+        """Zustand fuer den Health-Endpoint."""
+        state = self.state
+        with self._lock:
+            retry_in = 0
+            if state == self.OPEN:
+                retry_in = max(0, self.reset_timeout - (time.monotonic() - self._opened_at))
+            return {
+                'state': state,
+                'consecutive_failures': self._failures,
+                'retry_in_s': round(retry_in, 1)
+            }
+
+
+weather_breaker = CircuitBreaker(BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_SECONDS)
 
 
 # ===========================================
 # REIFEN-EMPFEHLUNGEN
 # ===========================================
-def get_tire_recommendation(temp_c, weather_main, date=None):
+def _decide_tires(temp_c, winter_weather, winter_season):
     """
-    Gibt Reifenempfehlung basierend auf Witterung und O-bis-O Regel.
-    
-    Logik nach deutschen Empfehlungen:
+    Entscheidungslogik nach deutschen Empfehlungen:
     1. WITTERUNG hat Vorrang: Schnee/Eis = Winterreifen PFLICHT
     2. Temperatur: Dauerhaft >7°C = Sommerreifen (bessere Haftung)
     3. Saison: Oktober bis Ostern = Winterreifen, Ostern bis Oktober = Sommerreifen
     """
-    if date is None:
-        date = datetime.now()
-    
-    weather_lower = weather_main.lower() if weather_main else ''
-    winter_season = is_winter_season(date)
-    
-    # ===========================================
-    # PRIORITÄT 1: Winterliche Witterung = WINTERREIFEN PFLICHT
-    # ===========================================
-    winter_weather = weather_lower in ['snow', 'sleet', 'freezing rain', 'ice', 'hail']
-    
     if winter_weather or temp_c <= 0:
-        return {
-            'type': 'winter',
-            'required': True,
-            'label': 'Winterreifen PFLICHT',
-            'icon': '❄️',
-            'reason': 'Schnee, Eis oder Temperaturen ≤0°C',
-            'legal': '⚠️ Winterreifenpflicht! §2 Abs. 3a StVO',
-            'color': '#2196F3',
-            'urgency': 'critical',
-            'action': 'Sofort Winterreifen aufziehen!'
-        }
-    
-    # ===========================================
-    # PRIORITÄT 2: Temperaturen ≤7°C = Winterreifen empfohlen
-    # ===========================================
+        return 'winter_required'
     if temp_c <= 7:
-        return {
-            'type': 'winter',
-            'required': False,
-            'label': 'Winterreifen empfohlen',
-            'icon': '🌨️',
-            'reason': f'Temperaturen unter 7°C ({temp_c:.1f}°C) - Gummimischung Winterreifen besser',
-            'legal': 'Keine Pflicht, aber deutlich sicherer',
-            'color': '#03A9F4',
-            'urgency': 'recommended',
-            'action': 'Winterreifen aufziehen für optimale Sicherheit'
-        }
-    
-    # ===========================================
-    # PRIORITÄT 3: Temperaturen >7°C = Sommerreifen empfohlen
-    # ===========================================
+        return 'winter_recommended'
     if temp_c > 7:
         # Aber Vorsicht in der Wintersaison
         if winter_season:
-            return {
-                'type': 'summer_possible',
-                'required': False,
-                'label': 'Sommerreifen möglich',
-                'icon': '⚠️',
-                'reason': f'Aktuell {temp_c:.1f}°C, aber noch Wintersaison (O-bis-O)',
-                'legal': 'Wetterumschwung möglich - Winterreifen behalten',
-                'color': '#FF9800',
-                'urgency': 'info',
-                'action': 'Wetter beobachten, bei stabilem Wetter >7°C wechseln'
-            }
-        else:
-            # Sommersaison + warm = Sommerreifen optimal
-            if temp_c >= 30:
-                return {
-                    'type': 'summer',
-                    'required': False,
-                    'label': 'Sommerreifen - Hitze beachten!',
-                    'icon': '🌡️',
-                    'reason': f'Hohe Temperaturen ({temp_c:.1f}°C)',
-                    'legal': 'Reifendruck bei Hitze erhöht - prüfen!',
-                    'color': '#FF9800',
-                    'urgency': 'info',
-                    'action': 'Reifendruck kontrollieren'
-                }
-            else:
-                return {
-                    'type': 'summer',
-                    'required': False,
-                    'label': 'Sommerreifen optimal',
-                    'icon': '☀️',
-                    'reason': f'Temperaturen dauerhaft >7°C ({temp_c:.1f}°C) - bessere Haftung mit Sommerreifen',
-                    'legal': 'Sommerreifen haben bei Wärme kürzeren Bremsweg',
-                    'color': '#4CAF50',
-                    'urgency': 'optimal',
-                    'action': 'Sommerreifen nutzen'
-                }
-    
-    # Fallback
-    return {
+            return 'summer_possible'
+        return 'summer_hot' if temp_c >= 30 else 'summer_optimal'
+    return 'unknown'
+
+
+TIRE_RECOMMENDATIONS = {
+    'winter_required': {
+        'type': 'winter',
+        'required': True,
+        'label': 'Winterreifen PFLICHT',
+        'icon': '❄️',
+        'reason': 'Schnee, Eis oder Temperaturen ≤0°C',
+        'legal': '⚠️ Winterreifenpflicht! §2 Abs. 3a StVO',
+        'color': '#2196F3',
+        'urgency': 'critical',
+        'action': 'Sofort Winterreifen aufziehen!'
+    },
+    'winter_recommended': {
+        'type': 'winter',
+        'required': False,
+        'label': 'Winterreifen empfohlen',
+        'icon': '🌨️',
+        'reason': 'Temperaturen unter 7°C ({temp:.1f}°C) - Gummimischung Winterreifen besser',
+        'legal': 'Keine Pflicht, aber deutlich sicherer',
+        'color': '#03A9F4',
+        'urgency': 'recommended',
+        'action': 'Winterreifen aufziehen für optimale Sicherheit'
+    },
+    'summer_possible': {
+        'type': 'summer_possible',
+        'required': False,
+        'label': 'Sommerreifen möglich',
+        'icon': '⚠️',
+        'reason': 'Aktuell {temp:.1f}°C, aber noch Wintersaison (O-bis-O)',
+        'legal': 'Wetterumschwung möglich - Winterreifen behalten',
+        'color': '#FF9800',
+        'urgency': 'info',
+        'action': 'Wetter beobachten, bei stabilem Wetter >7°C wechseln'
+    },
+    'summer_hot': {
+        'type': 'summer',
+        'required': False,
+        'label': 'Sommerreifen - Hitze beachten!',
+        'icon': '🌡️',
+        'reason': 'Hohe Temperaturen ({temp:.1f}°C)',
+        'legal': 'Reifendruck bei Hitze erhöht - prüfen!',
+        'color': '#FF9800',
+        'urgency': 'info',
+        'action': 'Reifendruck kontrollieren'
+    },
+    'summer_optimal': {
+        'type': 'summer',
+        'required': False,
+        'label': 'Sommerreifen optimal',
+        'icon': '☀️',
+        'reason': 'Temperaturen dauerhaft >7°C ({temp:.1f}°C) - bessere Haftung mit Sommerreifen',
+        'legal': 'Sommerreifen haben bei Wärme kürzeren Bremsweg',
+        'color': '#4CAF50',
+        'urgency': 'optimal',
+        'action': 'Sommerreifen nutzen'
+    },
+    # Fallback (z.B. Temperatur NaN)
+    'unknown': {
         'type': 'unknown',
         'required': False,
         'label': 'Keine Empfehlung',
@@ -183,6 +255,25 @@ def get_tire_recommendation(temp_c, weather_main, date=None):
         'urgency': 'info',
         'action': 'Wetter manuell prüfen'
     }
+}
+
+tire_table = weather_rules.RecommendationTable(_decide_tires, TIRE_RECOMMENDATIONS)
+
+
+def get_tire_recommendation(temp_c, weather_main, date=None):
+    """
+    Gibt Reifenempfehlung basierend auf Witterung und O-bis-O Regel.
+    Nachschlagen in der vorberechneten Tabelle (siehe _decide_tires).
+    """
+    return tire_table.evaluate(temp_c, weather_main, date)
+
+
+def get_tire_recommendations(samples, date=None):
+    """
+    Reifenempfehlungen fuer viele (temp_c, weather_main)-Paare auf einmal,
+    z.B. fuer flottenweite Pruefungen.
+    """
+    return tire_table.evaluate_many(samples, date)
 
 
 def check_tire_mismatch(current_tires, recommended_type):
@@ -241,9 +332,10 @@ def check_tire_mismatch(current_tires, recommended_type):
     }
 
 
-def get_road_condition(temp_c, weather_main, humidity, visibility):
+def _road_condition_rules(temp_c, weather_main, humidity, visibility):
     """
     Schätzt Straßenzustand basierend auf Wetterdaten.
+    Referenzlogik, wird nur zum Befuellen von road_table ausgewertet.
     """
     weather_lower = weather_main.lower() if weather_main else ''
     
@@ -311,174 +403,365 @@ def get_road_condition(temp_c, weather_main, humidity, visibility):
         'risk_color': risk_color
     }
 
-def get_weather(lat=None, lon=None):
+
+road_table = weather_rules.RoadConditionTable(_road_condition_rules)
+
+
+def get_road_condition(temp_c, weather_main, humidity, visibility):
     """
-    Holt aktuelle Wetterdaten von OpenWeatherMap.
-    Mit Fallback für Saarbrücken wenn API nicht verfügbar.
+    Schätzt Straßenzustand basierend auf Wetterdaten (vorberechnete Tabelle).
     """
-    lat = lat or DEFAULT_LAT
-    lon = lon or DEFAULT_LON
+    return road_table.evaluate(temp_c, weather_main, humidity, visibility)
+
+def cache_store(cache_key, data):
+    """Legt Wetterdaten im Cache ab und verdraengt bei Bedarf den aeltesten Eintrag."""
+    evicted = 0
+    with weather_cache_lock:
+        previous = weather_cache.pop(cache_key, None)
+        while len(weather_cache) >= WEATHER_CACHE_MAX_ENTRIES:
+            weather_cache.pop(next(iter(weather_cache)))
+            evicted += 1
+        weather_cache[cache_key] = {
+            'data': data,
+            'timestamp': datetime.now(),
+            'hits': previous['hits'] if previous else 0
+        }
+    if evicted:
+        weather_metrics.inc('cache_evictions', value=evicted)
+
+
+def get_fallback_weather():
+    """Fallback-Daten für Saarbrücken (typische Monatstemperaturen)."""
+    month = datetime.now().month
+    # Typische Durchschnittstemperaturen Saarbrücken
+    monthly_temps = {1: 2, 2: 3, 3: 7, 4: 11, 5: 15, 6: 18, 7: 20, 8: 20, 9: 16, 10: 11, 11: 6, 12: 3}
+    temp = monthly_temps.get(month, 10)
+    return {
+        'temperature_c': temp,
+        'feels_like_c': temp - 2,
+        'humidity_percent': 75,
+        'pressure_hpa': 1015,
+        'wind_speed_ms': 3,
+        'wind_direction_deg': 270,
+        'clouds_percent': 60,
+        'visibility_m': 10000,
+        'weather_main': 'Clouds',
+        'weather_description': 'Bewölkt (Fallback)',
+        'weather_icon': '04d',
+        'location_name': 'Saarbrücken',
+        'timestamp': datetime.now().isoformat(),
+        'warnings': [],
+        'is_fallback': True,
+        'configured': True
+    }
+
+
+def stale_or_fallback(cached, error):
+    """
+    Veraltete Cache-Daten sind besser als Monatsmittelwerte - aber nur bis
+    STALE_MAX_AGE_SECONDS. Aeltere Daten werden nicht mehr als aktuelles
+    Wetter ausgegeben.
+    """
+    age = int((datetime.now() - cached['timestamp']).total_seconds()) if cached else None
+    if cached and age <= STALE_MAX_AGE_SECONDS:
+        with weather_cache_lock:
+            cached['hits'] += 1
+        stale = dict(cached['data'])
+        stale['is_stale'] = True
+        stale['stale_age_s'] = age
+        return stale, 'stale'
+    fallback = get_fallback_weather()
+    fallback['error'] = error
+    return fallback, 'fallback'
+
+
+def parse_current_weather(data):
+    """Wandelt eine OpenWeatherMap /weather Antwort in das Service-Format um."""
+    # Relevante Daten extrahieren
+    weather_data = {
+        'temperature_c': data.get('main', {}).get('temp', 0),
+        'feels_like_c': data.get('main', {}).get('feels_like', 0),
+        'humidity_percent': data.get('main', {}).get('humidity', 0),
+        'pressure_hpa': data.get('main', {}).get('pressure', 0),
+        'wind_speed_ms': data.get('wind', {}).get('speed', 0),
+        'wind_direction_deg': data.get('wind', {}).get('deg', 0),
+        'clouds_percent': data.get('clouds', {}).get('all', 0),
+        'visibility_m': data.get('visibility', 10000),
+        'weather_main': data.get('weather', [{}])[0].get('main', 'Unknown'),
+        'weather_description': data.get('weather', [{}])[0].get('description', ''),
+        'weather_icon': data.get('weather', [{}])[0].get('icon', ''),
+        'location_name': data.get('name', ''),
+        'timestamp': datetime.now().isoformat(),
+        'sunrise': datetime.fromtimestamp(data.get('sys', {}).get('sunrise', 0)).isoformat(),
+        'sunset': datetime.fromtimestamp(data.get('sys', {}).get('sunset', 0)).isoformat()
+    }
+    
+    # Fahrzeug-relevante Warnungen ableiten
+    weather_data['warnings'] = []
+    
+    # Glatteis-Warnung
+    if weather_data['temperature_c'] <= 3:
+        weather_data['warnings'].append({
+            'type': 'frost_warning',
+            'severity': 'high' if weather_data['temperature_c'] <= 0 else 'medium',
+            'message': 'Glatteisgefahr - Vorsicht beim Fahren'
+        })
+    
+    # Sturm-Warnung
+    if weather_data['wind_speed_ms'] > 15:
+        weather_data['warnings'].append({
+            'type': 'wind_warning',
+            'severity': 'high' if weather_data['wind_speed_ms'] > 25 else 'medium',
+            'message': 'Starker Wind - Fahrzeug sichern'
+        })
+    
+    # Nebel-Warnung
+    if weather_data['visibility_m'] < 1000:
+        weather_data['warnings'].append({
+            'type': 'fog_warning',
+            'severity': 'high' if weather_data['visibility_m'] < 200 else 'medium',
+            'message': 'Schlechte Sicht - Langsam fahren'
+        })
+    
+    # Hitze-Warnung
+    if weather_data['temperature_c'] >= 35:
+        weather_data['warnings'].append({
+            'type': 'heat_warning',
+            'severity': 'high',
+            'message': 'Extreme Hitze - Klimaanlage und Kuehlung pruefen'
+        })
+    
+    # Regen/Schnee erkennen
+    weather_main = weather_data['weather_main'].lower()
+    if weather_main in ['rain', 'drizzle', 'thunderstorm']:
+        weather_data['warnings'].append({
+            'type': 'rain_warning',
+            'severity': 'medium',
+            'message': 'Regen - Auf Aquaplaning achten'
+        })
+    elif weather_main == 'snow':
+        weather_data['warnings'].append({
+            'type': 'snow_warning',
+            'severity': 'high',
+            'message': 'Schneefall - Winterreifen empfohlen'
+        })
+    
+    # Fahrbedingungen bewerten (1-5, 5=optimal)
+    driving_score = 5
+    if weather_data['temperature_c'] <= 0 or weather_data['temperature_c'] >= 35:
+        driving_score -= 1
+    if weather_data['visibility_m'] < 5000:
+        driving_score -= 1
+    if weather_data['wind_speed_ms'] > 10:
+        driving_score -= 1
+    if weather_main in ['rain', 'snow', 'thunderstorm']:
+        driving_score -= 1
+    
+    weather_data['driving_conditions'] = max(1, driving_score)
+    weather_data['driving_conditions_text'] = {
+        5: 'Optimal',
+        4: 'Gut',
+        3: 'Maessig',
+        2: 'Schlecht',
+        1: 'Gefaehrlich'
+    }.get(weather_data['driving_conditions'], 'Unbekannt')
+    
+    return weather_data
+
+
+def begin_weather_lookup(lat, lon):
+    """
+    Erster Teil der Wetterabfrage ohne Netzwerkzugriff.
+    
+    Returns:
+        (ergebnis, None) wenn Cache/Fallback die Anfrage beantwortet,
+        (None, lookup) wenn OpenWeatherMap gefragt werden muss. `lookup`
+        enthaelt URL und Parameter und wird an finish_/fail_weather_lookup
+        weitergereicht.
+    """
+    cell = grid_cell(lat or DEFAULT_LAT, lon or DEFAULT_LON)
+    if cell is None:
+        # Wie vor dem Raster: ungueltige Koordinaten -> Fallback statt Fehler 500
+        fallback = get_fallback_weather()
+        fallback['error'] = 'Ungueltige Koordinaten'
+        return (fallback, 'fallback'), None
+    lat, lon = cell
     cache_key = f"{lat},{lon}"
     
     # Cache pruefen
-    if cache_key in weather_cache:
-        cached = weather_cache[cache_key]
+    cached = weather_cache.get(cache_key)
+    if cached:
         age = (datetime.now() - cached['timestamp']).total_seconds()
         if age < CACHE_DURATION_SECONDS:
-            return cached['data']
-    
-    # Fallback-Daten für Saarbrücken (Februar-typisches Winterwetter)
-    def get_fallback_weather():
-        month = datetime.now().month
-        # Typische Durchschnittstemperaturen Saarbrücken
-        monthly_temps = {1: 2, 2: 3, 3: 7, 4: 11, 5: 15, 6: 18, 7: 20, 8: 20, 9: 16, 10: 11, 11: 6, 12: 3}
-        temp = monthly_temps.get(month, 10)
-        return {
-            'temperature_c': temp,
-            'feels_like_c': temp - 2,
-            'humidity_percent': 75,
-            'pressure_hpa': 1015,
-            'wind_speed_ms': 3,
-            'wind_direction_deg': 270,
-            'clouds_percent': 60,
-            'visibility_m': 10000,
-            'weather_main': 'Clouds',
-            'weather_description': 'Bewölkt (Fallback)',
-            'weather_icon': '04d',
-            'location_name': 'Saarbrücken',
-            'timestamp': datetime.now().isoformat(),
-            'warnings': [],
-            'is_fallback': True,
-            'configured': True
-        }
+            with weather_cache_lock:
+                cached['hits'] += 1
+            return (cached['data'], 'hit'), None
     
     if not OPENWEATHERMAP_API_KEY:
         fallback = get_fallback_weather()
         fallback['error'] = 'API Key nicht konfiguriert'
         fallback['configured'] = False
-        return fallback
+        return (fallback, 'fallback'), None
     
-    try:
-        url = 'https://api.openweathermap.org/data/2.5/weather'
-        params = {
+    # Breaker offen: sofort antworten statt auf Timeout zu warten
+    if not weather_breaker.allow_request():
+        weather_metrics.inc('breaker_rejections')
+        return stale_or_fallback(cached, 'API voruebergehend deaktiviert (Circuit Breaker offen)'), None
+    
+    return None, {
+        'cache_key': cache_key,
+        'cached': cached,
+        'url': f'{OPENWEATHERMAP_BASE_URL}/weather',
+        'params': {
             'lat': lat,
             'lon': lon,
             'appid': OPENWEATHERMAP_API_KEY,
             'units': 'metric',
             'lang': 'de'
         }
-        
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        
-        # Relevante Daten extrahieren
-        weather_data = {
-            'temperature_c': data.get('main', {}).get('temp', 0),
-            'feels_like_c': data.get('main', {}).get('feels_like', 0),
-            'humidity_percent': data.get('main', {}).get('humidity', 0),
-            'pressure_hpa': data.get('main', {}).get('pressure', 0),
-            'wind_speed_ms': data.get('wind', {}).get('speed', 0),
-            'wind_direction_deg': data.get('wind', {}).get('deg', 0),
-            'clouds_percent': data.get('clouds', {}).get('all', 0),
-            'visibility_m': data.get('visibility', 10000),
-            'weather_main': data.get('weather', [{}])[0].get('main', 'Unknown'),
-            'weather_description': data.get('weather', [{}])[0].get('description', ''),
-            'weather_icon': data.get('weather', [{}])[0].get('icon', ''),
-            'location_name': data.get('name', ''),
-            'timestamp': datetime.now().isoformat(),
-            'sunrise': datetime.fromtimestamp(data.get('sys', {}).get('sunrise', 0)).isoformat(),
-            'sunset': datetime.fromtimestamp(data.get('sys', {}).get('sunset', 0)).isoformat()
-        }
-        
-        # Fahrzeug-relevante Warnungen ableiten
-        weather_data['warnings'] = []
-        
-        # Glatteis-Warnung
-        if weather_data['temperature_c'] <= 3:
-            weather_data['warnings'].append({
-                'type': 'frost_warning',
-                'severity': 'high' if weather_data['temperature_c'] <= 0 else 'medium',
-                'message': 'Glatteisgefahr - Vorsicht beim Fahren'
-            })
-        
-        # Sturm-Warnung
-        if weather_data['wind_speed_ms'] > 15:
-            weather_data['warnings'].append({
-                'type': 'wind_warning',
-                'severity': 'high' if weather_data['wind_speed_ms'] > 25 else 'medium',
-                'message': 'Starker Wind - Fahrzeug sichern'
-            })
-        
-        # Nebel-Warnung
-        if weather_data['visibility_m'] < 1000:
-            weather_data['warnings'].append({
-                'type': 'fog_warning',
-                'severity': 'high' if weather_data['visibility_m'] < 200 else 'medium',
-                'message': 'Schlechte Sicht - Langsam fahren'
-            })
-        
-        # Hitze-Warnung
-        if weather_data['temperature_c'] >= 35:
-            weather_data['warnings'].append({
-                'type': 'heat_warning',
-                'severity': 'high',
-                'message': 'Extreme Hitze - Klimaanlage und Kuehlung pruefen'
-            })
-        
-        # Regen/Schnee erkennen
-        weather_main = weather_data['weather_main'].lower()
-        if weather_main in ['rain', 'drizzle', 'thunderstorm']:
-            weather_data['warnings'].append({
-                'type': 'rain_warning',
-                'severity': 'medium',
-                'message': 'Regen - Auf Aquaplaning achten'
-            })
-        elif weather_main == 'snow':
-            weather_data['warnings'].append({
-                'type': 'snow_warning',
-                'severity': 'high',
-                'message': 'Schneefall - Winterreifen empfohlen'
-            })
-        
-        # Fahrbedingungen bewerten (1-5, 5=optimal)
-        driving_score = 5
-        if weather_data['temperature_c'] <= 0 or weather_data['temperature_c'] >= 35:
-            driving_score -= 1
-        if weather_data['visibility_m'] < 5000:
-            driving_score -= 1
-        if weather_data['wind_speed_ms'] > 10:
-            driving_score -= 1
-        if weather_main in ['rain', 'snow', 'thunderstorm']:
-            driving_score -= 1
-        
-        weather_data['driving_conditions'] = max(1, driving_score)
-        weather_data['driving_conditions_text'] = {
-            5: 'Optimal',
-            4: 'Gut',
-            3: 'Maessig',
-            2: 'Schlecht',
-            1: 'Gefaehrlich'
-        }.get(weather_data['driving_conditions'], 'Unbekannt')
-        
-        # Cache aktualisieren
-        weather_cache[cache_key] = {
-            'data': weather_data,
-            'timestamp': datetime.now()
-        }
-        
-        return weather_data
-        
-    except requests.exceptions.RequestException as e:
-        # Bei API-Fehler: Fallback-Daten zurückgeben
-        fallback = get_fallback_weather()
-        fallback['error'] = f'API-Fehler: {str(e)}'
-        print(f"Wetter-API Fehler, nutze Fallback: {e}")
-        return fallback
+    }
+
+
+def finish_weather_lookup(lookup, data):
+    """Verarbeitet eine erfolgreiche Upstream-Antwort und aktualisiert den Cache."""
+    weather_breaker.record_success()
+    try:
+        weather_data = parse_current_weather(data)
     except Exception as e:
+        weather_metrics.inc('errors', {'kind': 'processing'})
         fallback = get_fallback_weather()
         fallback['error'] = f'Verarbeitung fehlgeschlagen: {str(e)}'
-        return fallback
+        return fallback, 'fallback'
+    
+    # Cache aktualisieren
+    cache_store(lookup['cache_key'], weather_data)
+    return weather_data, 'miss'
+
+
+def fail_weather_lookup(lookup, error):
+    """Bei API-Fehler: veraltete Daten oder Fallback zurückgeben."""
+    weather_breaker.record_failure()
+    weather_metrics.inc('errors', {'kind': 'upstream'})
+    print(f"Wetter-API Fehler, nutze Fallback: {error} (Breaker: {weather_breaker.state})")
+    return stale_or_fallback(lookup['cached'], f'API-Fehler: {str(error)}')
+
+
+def record_weather_request(path, started):
+    weather_metrics.inc('requests', {'path': path})
+    weather_metrics.observe('request', time.perf_counter() - started, {'path': path})
+
+
+def get_weather(lat=None, lon=None):
+    """
+    Holt aktuelle Wetterdaten von OpenWeatherMap.
+    Mit Fallback für Saarbrücken wenn API nicht verfügbar.
+    """
+    started = time.perf_counter()
+    result, lookup = begin_weather_lookup(lat, lon)
+    
+    if result is None:
+        upstream_start = time.perf_counter()
+        try:
+            response = http_session.get(lookup['url'], params=lookup['params'],
+                                        timeout=(OWM_CONNECT_TIMEOUT, OWM_READ_TIMEOUT))
+            response.raise_for_status()
+            data = response.json()
+        except requests.exceptions.RequestException as e:
+            result = fail_weather_lookup(lookup, e)
+        else:
+            result = finish_weather_lookup(lookup, data)
+        finally:
+            weather_metrics.observe('upstream', time.perf_counter() - upstream_start, {'endpoint': 'weather'})
+    
+    data, path = result
+    record_weather_request(path, started)
+    return data
+
+
+# ===========================================
+# WETTERVORHERSAGE
+# ===========================================
+def fetch_forecast(cell):
+    """Holt die 5-Tage-Vorhersage (3h-Schritte) fuer eine Rasterzelle."""
+    if not OPENWEATHERMAP_API_KEY:
+        raise RuntimeError('API Key nicht konfiguriert')
+    if not weather_breaker.allow_request():
+        raise RuntimeError('Circuit Breaker offen')
+    
+    params = {
+        'lat': cell[0],
+        'lon': cell[1],
+        'appid': OPENWEATHERMAP_API_KEY,
+        'units': 'metric',
+        'lang': 'de'
+    }
+    upstream_start = time.perf_counter()
+    try:
+        response = http_session.get(f'{OPENWEATHERMAP_BASE_URL}/forecast', params=params,
+                                    timeout=(OWM_CONNECT_TIMEOUT, OWM_READ_TIMEOUT))
+        response.raise_for_status()
+        data = response.json()
+    except requests.exceptions.RequestException:
+        weather_breaker.record_failure()
+        weather_metrics.inc('errors', {'kind': 'forecast'})
+        raise
+    finally:
+        weather_metrics.observe('upstream', time.perf_counter() - upstream_start, {'endpoint': 'forecast'})
+    weather_breaker.record_success()
+    return parse_owm_forecast(data), data.get('city', {}).get('name', '')
+
+
+forecast_store = ForecastStore(fetch_forecast, FORECAST_MAX_AGE_SECONDS, FORECAST_NEGATIVE_TTL_SECONDS,
+                               FORECAST_MAX_CELLS)
+
+
+def start_forecast_prefetch():
+    """Haelt die Vorhersage der genutzten Rasterzellen im Hintergrund aktuell."""
+    if OPENWEATHERMAP_API_KEY:
+        forecast_store.start_prefetcher(FORECAST_PREFETCH_INTERVAL, seed_cells=[grid_cell(DEFAULT_LAT, DEFAULT_LON)])
+        print(f"Vorhersage-Prefetch aktiv (alle {FORECAST_PREFETCH_INTERVAL}s)")
+
+
+def start_background_jobs():
+    """Hintergrund-Jobs des Service (von serve.py pro Worker aufgerufen)."""
+    start_forecast_prefetch()
+
+
+def get_forecast_at(lat=None, lon=None, when=None):
+    """Vorhergesagte Bedingungen am Ort zum Zeitpunkt `when` (Default: jetzt)."""
+    cell = grid_cell(lat or DEFAULT_LAT, lon or DEFAULT_LON)
+    if cell is None:
+        return None
+    return forecast_store.conditions_at(cell, when or datetime.now())
+
+
+def get_tire_outlook(lat=None, lon=None, hours=72, date=None):
+    """
+    Reifenempfehlung fuer die kommenden Stunden statt fuer einen Messwert.
+    Bewertet wird der kaelteste Vorhersagepunkt bzw. der erste mit
+    winterlicher Witterung.
+    """
+    cell = grid_cell(lat or DEFAULT_LAT, lon or DEFAULT_LON)
+    if cell is None:
+        return None
+    now = date or datetime.now()
+    entries = forecast_store.window(cell, now, now + timedelta(hours=hours))
+    if not entries:
+        return None
+    
+    winter_main = ['snow', 'sleet', 'freezing rain', 'ice', 'hail']
+    coldest = min(entries, key=lambda e: e['temperature_c'])
+    first_winter = next((e for e in entries if e['weather_main'].lower() in winter_main), None)
+    decisive = first_winter or coldest
+    
+    return {
+        'hours': hours,
+        'min_temperature_c': coldest['temperature_c'],
+        'min_temperature_time': coldest['time'],
+        'winter_weather_expected': first_winter is not None,
+        'winter_weather_time': first_winter['time'] if first_winter else None,
+        'recommendation': get_tire_recommendation(decisive['temperature_c'], decisive['weather_main'], now)
+    }
 
 
 @app.route('/weather', methods=['GET'])
@@ -502,7 +785,7 @@ def weather_for_vehicle(vehicle_id):
     """
     # TODO: GPS-Position aus InfluxDB abrufen
     # Vorerst Default-Location verwenden
-    data = get_weather()
+    data = dict(get_weather())
     data['vehicle_id'] = vehicle_id
     return jsonify(data)
 
@@ -516,13 +799,22 @@ def weather_context():
     Gibt kontextualisierte Wetterdaten fuer ein Ereignis zurueck.
     """
     body = request.get_json() or {}
+    weather_data = get_weather(body.get('lat'), body.get('lon'))
+    return jsonify(build_weather_context(body, weather_data))
+
+
+def build_weather_context(body, weather_data, forecast_lookup=None):
+    """
+    Kontextualisierte Wetterdaten fuer ein Ereignis.
+    `forecast_lookup(lat, lon, when)` liefert den Vorhersagepunkt
+    (Default: get_forecast_at).
+    """
+    forecast_lookup = forecast_lookup or get_forecast_at
     vehicle_id = body.get('vehicle_id', 'UNKNOWN')
     lat = body.get('lat')
     lon = body.get('lon')
     event_type = body.get('event_type', 'general')
     
-    weather_data = get_weather(lat, lon)
-    
     # Kontext-spezifische Empfehlungen
     context_data = {
         'vehicle_id': vehicle_id,
@@ -540,6 +832,16 @@ def weather_context():
                 context_data['recommendations'].append('Nebelscheinwerfer einschalten')
             if weather_data.get('weather_main', '').lower() in ['rain', 'snow']:
                 context_data['recommendations'].append('Laengeren Bremsweg einplanen')
+            
+            # Vorhersage fuer das Fahrtende (aus dem Speicher, kein API-Aufruf)
+            duration_min = body.get('expected_duration_min', 60)
+            later = forecast_lookup(lat, lon, datetime.now() + timedelta(minutes=duration_min))
+            if later:
+                context_data['forecast'] = later
+                if later['weather_main'].lower() == 'snow' and weather_data.get('weather_main', '').lower() != 'snow':
+                    context_data['recommendations'].append('Schneefall waehrend der Fahrt erwartet')
+                elif later['temperature_c'] <= 0 < weather_data.get('temperature_c', 20):
+                    context_data['recommendations'].append('Glaettegefahr im Laufe der Fahrt')
         
         elif event_type == 'parking':
             if weather_data.get('temperature_c', 20) >= 30:
@@ -547,23 +849,186 @@ def weather_context():
             if weather_data.get('wind_speed_ms', 0) > 15:
                 context_data['recommendations'].append('Geschuetzten Parkplatz suchen')
     
-    return jsonify(context_data)
+    return context_data
+
+
+@app.route('/weather/forecast', methods=['GET'])
+def forecast_endpoint():
+    """
+    GET /weather/forecast?lat=...&lon=...&at=2026-01-15T08:00:00
+    Mit `at`: vorhergesagte Bedingungen zu diesem Zeitpunkt.
+    Ohne `at`: alle Vorhersagepunkte der Rasterzelle.
+    """
+    body, status = forecast_payload(request.args.get('lat'), request.args.get('lon'), request.args.get('at'))
+    return jsonify(body), status
+
+
+def forecast_payload(lat, lon, at=None):
+    """Antwort fuer /weather/forecast als (body, status)."""
+    cell = grid_cell(lat or DEFAULT_LAT, lon or DEFAULT_LON)
+    if cell is None:
+        return {'error': 'Ungueltige Koordinaten (lat/lon)'}, 400
+    
+    if at:
+        try:
+            when = datetime.fromisoformat(at)
+        except ValueError:
+            return {'error': 'Ungueltiger Zeitpunkt (ISO-Format erwartet)'}, 400
+        entry = forecast_store.conditions_at(cell, when)
+        if entry is None:
+            return {'error': 'Keine Vorhersage fuer diesen Zeitpunkt'}, 404
+        return entry, 200
+    
+    series = forecast_store.cached(cell)
+    if series is None:
+        return {'error': 'Vorhersage nicht verfuegbar'}, 503
+    return {
+        'cell': list(cell),
+        'location_name': series.location_name,
+        'fetched_at': datetime.fromtimestamp(series.fetched_at).isoformat(),
+        'entries': series.entries()
+    }, 200
+
+
+@app.route('/weather/tires', methods=['GET'])
+def tire_outlook_endpoint():
+    """
+    GET /weather/tires?lat=...&lon=...&hours=72
+    Reifenempfehlung fuer aktuelles Wetter und die kommenden Stunden.
+    """
+    lat = request.args.get('lat')
+    lon = request.args.get('lon')
+    hours = tire_outlook_hours(request.args.get('hours'))
+    if hours is None:
+        return jsonify({'error': 'hours muss eine ganze Zahl sein'}), 400
+    
+    weather_data = get_weather(lat, lon)
+    return jsonify(tire_outlook_payload(weather_data, lat, lon, hours))
+
+
+def tire_outlook_hours(value, default=72, maximum=TIRE_OUTLOOK_MAX_HOURS):
+    """hours-Parameter fuer /weather/tires, begrenzt auf 1..maximum (None = ungueltig)."""
+    if value is None or value == '':
+        return default
+    try:
+        hours = int(value)
+    except ValueError:
+        return None
+    return max(1, min(hours, maximum))
+
+
+def tire_outlook_payload(weather_data, lat, lon, hours):
+    return {
+        'current': get_tire_recommendation(weather_data.get('temperature_c', 10), weather_data.get('weather_main', '')),
+        'outlook': get_tire_outlook(lat, lon, hours)
+    }
+
+
+def cache_hit_ratio():
+    """Anteil der aus dem Cache (frisch oder veraltet) beantworteten Anfragen."""
+    paths = weather_metrics.counters_by_label('requests', 'path')
+    total = sum(paths.values())
+    if not total:
+        return None
+    return round((paths.get('hit', 0) + paths.get('stale', 0)) / total, 4)
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """
+    GET /metrics             Prometheus-Textformat
+    GET /metrics?format=json Zaehler, Histogramme (p50/p95/p99) und Hit-Ratio
+    """
+    if request.args.get('format') == 'json':
+        return jsonify(metrics_json())
+    return Response(metrics_text(), mimetype='text/plain; version=0.0.4')
+
+
+def metrics_json():
+    snapshot = weather_metrics.snapshot()
+    snapshot['cache'] = {
+        'entries': len(weather_cache),
+        'max_entries': WEATHER_CACHE_MAX_ENTRIES,
+        'ttl_s': CACHE_DURATION_SECONDS,
+        'grid_decimals': WEATHER_GRID_DECIMALS,
+        'hit_ratio': cache_hit_ratio(),
+        'worker_pid': os.getpid()
+    }
+    snapshot['circuit_breaker'] = weather_breaker.status()
+    return snapshot
+
+
+def metrics_text():
+    text = weather_metrics.render_prometheus()
+    text += f'weather_service_cache_entries{{worker="{os.getpid()}"}} {len(weather_cache)}\n'
+    return text
+
+
+@app.route('/debug/cache', methods=['GET'])
+def debug_cache():
+    """
+    GET /debug/cache?limit=20
+    Meistgenutzte Cache-Eintraege (Rasterzellen) mit Alter und Trefferzahl.
+    """
+    limit = debug_cache_limit(request.args.get('limit'))
+    if limit is None:
+        return jsonify({'error': 'limit muss eine ganze Zahl sein'}), 400
+    return jsonify(debug_cache_payload(limit))
+
+
+def debug_cache_limit(value, default=20, maximum=DEBUG_CACHE_MAX_LIMIT):
+    """limit-Parameter fuer /debug/cache, begrenzt auf 1..maximum (None = ungueltig)."""
+    if value is None or value == '':
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        return None
+    return max(1, min(limit, maximum))
+
+
+def debug_cache_payload(limit):
+    now = datetime.now()
+    with weather_cache_lock:
+        snapshot = [(key, dict(entry)) for key, entry in weather_cache.items()]
+    entries = sorted(snapshot, key=lambda item: item[1]['hits'], reverse=True)[:limit]
+    return {
+        'worker_pid': os.getpid(),
+        'entries': len(snapshot),
+        'hottest': [
+            {
+                'key': key,
+                'hits': entry['hits'],
+                'age_s': int((now - entry['timestamp']).total_seconds()),
+                'expired': (now - entry['timestamp']).total_seconds() >= CACHE_DURATION_SECONDS,
+                'location_name': entry['data'].get('location_name', '')
+            }
+            for key, entry in entries
+        ]
+    }
 
 
 @app.route('/health', methods=['GET'])
 def health():
     """Health Check Endpoint."""
-    api_configured = bool(OPENWEATHERMAP_API_KEY)
-    return jsonify({
+    return jsonify(health_payload())
+
+
+def health_payload(service='weather-service'):
+    return {
         'status': 'healthy',
-        'service': 'weather-service',
-        'api_configured': api_configured,
-        'cache_entries': len(weather_cache)
-    })
+        'service': service,
+        'api_configured': bool(OPENWEATHERMAP_API_KEY),
+        'cache_entries': len(weather_cache),
+        'cache_hit_ratio': cache_hit_ratio(),
+        'forecast_cells': len(forecast_store),
+        'circuit_breaker': weather_breaker.status()
+    }
 
 
 if __name__ == '__main__':
-    port = int(os.environ.get('PORT', 5001))
+    port = settings.env_int('PORT', 5001)
     print(f"Weather Service startet auf Port {port}")
     print(f"API Key konfiguriert: {bool(OPENWEATHERMAP_API_KEY)}")
+    start_background_jobs()
     app.run(host='0.0.0.0', port=port, debug=False)
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Asynchroner Weather Service fuer Smart-Car (ASGI)
+Gleiche Routen wie weather_service.py, aber mit Quart und einem geteilten
+httpx.AsyncClient. Langsame OpenWeatherMap-Antworten blockieren so keinen
+Thread, gleichzeitige Anfragen fuer dieselbe Rasterzelle teilen sich einen
+Upstream-Aufruf.
+
+Cache, Circuit Breaker, Regeln, Vorhersage und Metriken stammen aus
+weather_service.py, beide Varianten liefern identische Antworten.
+
+Start:
+    pip install quart httpx uvicorn
+    python /config/weather_service_async.py
+"""
+
+import time
+import asyncio
+from datetime import datetime
+
+import httpx
+from quart import Quart, request, jsonify, Response
+
+import weather_service as ws
+from smartcar import settings
+
+app = Quart(__name__)
+
+# Connection-Pool zu OpenWeatherMap
+OWM_MAX_CONNECTIONS = settings.env_int('OWM_MAX_CONNECTIONS', 100)
+OWM_MAX_KEEPALIVE = settings.env_int('OWM_MAX_KEEPALIVE', 20)
+
+# Geteilter HTTP-Client (wird beim Start erzeugt)
+http_client = None
+
+# Laufende Upstream-Aufrufe pro Cache-Key (Request-Coalescing)
+_inflight = {}
+
+# Rasterzellen, deren Vorhersage gerade im Hintergrund geladen wird
+_forecast_refreshing = set()
+
+
+@app.before_serving
+async def startup():
+    global http_client
+    http_client = httpx.AsyncClient(
+        timeout=httpx.Timeout(ws.OWM_READ_TIMEOUT, connect=ws.OWM_CONNECT_TIMEOUT),
+        limits=httpx.Limits(max_connections=OWM_MAX_CONNECTIONS, max_keepalive_connections=OWM_MAX_KEEPALIVE)
+    )
+    ws.start_forecast_prefetch()
+
+
+@app.after_serving
+async def shutdown():
+    if http_client is not None:
+        await http_client.aclose()
+
+
+async def _fetch_weather(lookup):
+    """Fragt OpenWeatherMap ab und aktualisiert Cache und Breaker."""
+    upstream_start = time.perf_counter()
+    try:
+        response = await http_client.get(lookup['url'], params=lookup['params'])
+        response.raise_for_status()
+        data = response.json()
+    except (httpx.HTTPError, ValueError) as e:
+        return ws.fail_weather_lookup(lookup, e)
+    finally:
+        ws.weather_metrics.observe('upstream', time.perf_counter() - upstream_start, {'endpoint': 'weather'})
+    return ws.finish_weather_lookup(lookup, data)
+
+
+async def get_weather(lat=None, lon=None):
+    """Asynchrones Gegenstueck zu weather_service.get_weather."""
+    started = time.perf_counter()
+    result, lookup = ws.begin_weather_lookup(lat, lon)
+
+    if result is None:
+        key = lookup['cache_key']
+        task = _inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(_fetch_weather(lookup))
+            _inflight[key] = task
+            task.add_done_callback(lambda _task, key=key: _inflight.pop(key, None))
+        else:
+            ws.weather_metrics.inc('coalesced_requests')
+        # shield: ein abgebrochener Client bricht den geteilten Abruf nicht ab
+        result = await asyncio.shield(task)
+
+    data, path = result
+    ws.record_weather_request(path, started)
+    return data
+
+
+def cached_forecast_at(lat, lon, when):
+    """
+    Vorhersagepunkt nur aus dem Speicher. Fehlt die Vorhersage oder ist sie
+    abgelaufen, wird sie im Hintergrund nachgeladen statt die Anfrage zu
+    blockieren.
+    """
+    cell = ws.grid_cell(lat or ws.DEFAULT_LAT, lon or ws.DEFAULT_LON)
+    if cell is None:
+        return None
+    if ws.forecast_store.needs_refresh(cell) and cell not in _forecast_refreshing:
+        _forecast_refreshing.add(cell)
+        future = asyncio.get_running_loop().run_in_executor(None, ws.forecast_store.get, cell)
+        future.add_done_callback(lambda _future: _forecast_refreshing.discard(cell))
+
+    series = ws.forecast_store.peek(cell)
+    if series is None:
+        return None
+    return series.at(when.timestamp() if isinstance(when, datetime) else float(when))
+
+
+# ===========================================
+# API ENDPOINTS (wie weather_service.py)
+# ===========================================
+
+@app.route('/weather', methods=['GET'])
+async def weather_endpoint():
+    """GET /weather?lat=...&lon=..."""
+    data = await get_weather(request.args.get('lat'), request.args.get('lon'))
+    return jsonify(data)
+
+
+@app.route('/weather/vehicle/<vehicle_id>', methods=['GET'])
+async def weather_for_vehicle(vehicle_id):
+    """GET /weather/vehicle/VH001"""
+    data = dict(await get_weather())
+    data['vehicle_id'] = vehicle_id
+    return jsonify(data)
+
+
+@app.route('/weather/context', methods=['POST'])
+async def weather_context():
+    """POST /weather/context"""
+    body = await request.get_json(silent=True) or {}
+    weather_data = await get_weather(body.get('lat'), body.get('lon'))
+    return jsonify(ws.build_weather_context(body, weather_data, cached_forecast_at))
+
+
+@app.route('/weather/forecast', methods=['GET'])
+async def forecast_endpoint():
+    """GET /weather/forecast?lat=...&lon=...&at=..."""
+    body, status = await asyncio.to_thread(
+        ws.forecast_payload, request.args.get('lat'), request.args.get('lon'), request.args.get('at')
+    )
+    return jsonify(body), status
+
+
+@app.route('/weather/tires', methods=['GET'])
+async def tire_outlook_endpoint():
+    """GET /weather/tires?lat=...&lon=...&hours=72"""
+    lat = request.args.get('lat')
+    lon = request.args.get('lon')
+    hours = ws.tire_outlook_hours(request.args.get('hours'))
+    if hours is None:
+        return jsonify({'error': 'hours muss eine ganze Zahl sein'}), 400
+    weather_data = await get_weather(lat, lon)
+    body = await asyncio.to_thread(ws.tire_outlook_payload, weather_data, lat, lon, hours)
+    return jsonify(body)
+
+
+@app.route('/metrics', methods=['GET'])
+async def metrics_endpoint():
+    """GET /metrics bzw. /metrics?format=json"""
+    if request.args.get('format') == 'json':
+        snapshot = ws.metrics_json()
+        snapshot['inflight_upstream'] = len(_inflight)
+        return jsonify(snapshot)
+    return Response(ws.metrics_text(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/debug/cache', methods=['GET'])
+async def debug_cache():
+    """GET /debug/cache?limit=20"""
+    limit = ws.debug_cache_limit(request.args.get('limit'))
+    if limit is None:
+        return jsonify({'error': 'limit muss eine ganze Zahl sein'}), 400
+    return jsonify(ws.debug_cache_payload(limit))
+
+
+@app.route('/health', methods=['GET'])
+async def health():
+    """Health Check Endpoint."""
+    return jsonify(ws.health_payload('weather-service-async'))
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    port = settings.env_int('PORT', 5001)
+    print(f"Weather Service (async) startet auf Port {port}")
+    print(f"API Key konfiguriert: {bool(ws.OPENWEATHERMAP_API_KEY)}")
+    uvicorn.run(app, host='0.0.0.0', port=port, log_level='warning')
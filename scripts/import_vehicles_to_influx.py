@@ -1,58 +1,314 @@
+"""
+Import von Fahrzeug-Stammdaten (vehicle_info) in InfluxDB
+Streamt die Eingabe (JSON, NDJSON oder CSV) satzweise, erzeugt Line Protocol
+in Bloecken fester Groesse und sendet diese parallel (begrenzter Pool, gzip,
+Retry pro Block). Der Speicherbedarf haengt nur von Blockgroesse und Anzahl
+Worker ab, nicht von der Groesse der Eingabedatei.
+
+Nutzung:
+    python scripts/import_vehicles_to_influx.py                      # config/vehicles.json
+    python scripts/import_vehicles_to_influx.py flotte.ndjson --workers 8
+    python scripts/import_vehicles_to_influx.py flotte.csv --chunk-size 10000
+    cat flotte.ndjson | python scripts/import_vehicles_to_influx.py - --format ndjson
+"""
+
+import argparse
+import csv
+import gzip
 import json
-import requests
+import os
+import random
+import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
 
 # Konfiguration
 VEHICLES_JSON = "config/vehicles.json"
-INFLUX_URL = "http://localhost:8086/api/v2/write?org=vehicle_org&bucket=vehicle_data&precision=s"
-INFLUX_TOKEN = "vehicle-admin-token"  # ggf. anpassen
-
-# Hilfsfunktion: InfluxDB Line Protocol für vehicle_info
-
-def vehicle_to_line(vehicle):
-    tags = [
-        f'vehicle_id={vehicle["vehicle_id"]}'
-    ]
-    fields = []
-    for key in ["display_name", "manufacturer", "model", "year", "license_plate", "vin", "fuel_capacity_l", "fuel_type", "color", "notes"]:
-        if key in vehicle:
-            val = vehicle[key]
-            # year und fuel_capacity_l als Integer mit i für InfluxDB
-            if key in ("year", "fuel_capacity_l"):
-                try:
-                    ival = int(val)
-                    fields.append(f'{key}={ival}i')
-                except Exception:
-                    fields.append(f'{key}={val}')
-            elif isinstance(val, str):
-                val = val.replace('"', "'")
-                fields.append(f'{key}="{val}"')
+INFLUX_URL = os.getenv("INFLUX_URL", "http://localhost:8086")
+INFLUX_TOKEN = os.getenv("INFLUX_TOKEN", "vehicle-admin-token")  # ggf. anpassen
+INFLUX_ORG = os.getenv("INFLUX_ORG", "vehicle_org")
+INFLUX_BUCKET = os.getenv("INFLUX_BUCKET", "vehicle_data")
+
+FIELDS = ["display_name", "manufacturer", "model", "year", "license_plate", "vin",
+          "fuel_capacity_l", "fuel_type", "color", "notes"]
+INTEGER_FIELDS = ("year", "fuel_capacity_l")
+
+RETRY_STATUS = {408, 429, 500, 502, 503, 504}
+READ_SIZE = 1024 * 1024
+
+
+# Hilfsfunktionen: InfluxDB Line Protocol für vehicle_info
+
+def escape_tag(value):
+    return str(value).replace("\\", "\\\\").replace(",", "\\,").replace("=", "\\=").replace(" ", "\\ ")
+
+
+def escape_string_field(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def field_value(key, val):
+    # year und fuel_capacity_l als Integer mit i für InfluxDB
+    if key in INTEGER_FIELDS:
+        try:
+            return f"{int(float(val))}i"
+        except (TypeError, ValueError):
+            pass
+    if isinstance(val, bool):
+        return "true" if val else "false"
+    if isinstance(val, int):
+        return f"{val}i"
+    if isinstance(val, float):
+        return repr(val)
+    return f'"{escape_string_field(val)}"'
+
+
+def vehicle_to_line(vehicle, ts):
+    vehicle_id = vehicle.get("vehicle_id")
+    if not vehicle_id:
+        return None
+    fields = [f"{key}={field_value(key, vehicle[key])}" for key in FIELDS
+              if vehicle.get(key) not in (None, "")]
+    if not fields:
+        fields = [f'display_name="{escape_string_field(vehicle_id)}"']
+    return f'vehicle_info,vehicle_id={escape_tag(vehicle_id)} {",".join(fields)} {ts}'
+
+
+# Eingabe satzweise lesen
+
+def iter_json_array(stream):
+    """
+    Objekte aus {"vehicles": [...]} oder [...], ohne die Datei komplett zu laden.
+    Liest blockweise und dekodiert jedes Array-Element einzeln.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    eof = False
+
+    def fill():
+        nonlocal buffer, eof
+        chunk = stream.read(READ_SIZE)
+        if not chunk:
+            eof = True
+        buffer += chunk
+
+    # Anfang des Arrays suchen
+    while True:
+        stripped = buffer.lstrip()
+        if stripped.startswith("["):
+            buffer = stripped[1:]
+            break
+        key = buffer.find('"vehicles"')
+        if key >= 0:
+            bracket = buffer.find("[", key)
+            if bracket >= 0:
+                buffer = buffer[bracket + 1:]
+                break
+        if eof:
+            raise ValueError('Kein Array "vehicles" in der Eingabe gefunden')
+        fill()
+
+    pos = 0
+    while True:
+        # Trenner (Leerraum, Komma) ueberspringen
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buffer) or eof:
+                break
+            buffer, pos = "", 0
+            fill()
+        if pos >= len(buffer) or buffer[pos] == "]":
+            return
+        try:
+            obj, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            buffer, pos = buffer[pos:], 0
+            fill()
+            continue
+        yield obj
+        pos = end
+        if pos > READ_SIZE:
+            buffer, pos = buffer[pos:], 0
+
+
+def iter_ndjson(stream):
+    for number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            print(f"WARNUNG: Zeile {number} übersprungen ({e})")
+
+
+def iter_csv(stream):
+    for row in csv.DictReader(stream):
+        yield {key.strip(): value.strip() for key, value in row.items() if key and value is not None}
+
+
+READERS = {"json": iter_json_array, "ndjson": iter_ndjson, "csv": iter_csv}
+
+
+def detect_format(path):
+    lower = path.lower()
+    if lower.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    if lower.endswith(".csv"):
+        return "csv"
+    return "json"
+
+
+def iter_chunks(records, chunk_size, ts):
+    chunk = []
+    skipped = 0
+    for record in records:
+        line = vehicle_to_line(record, ts) if isinstance(record, dict) else None
+        if line is None:
+            skipped += 1
+            continue
+        chunk.append(line)
+        if len(chunk) >= chunk_size:
+            yield chunk, skipped
+            chunk, skipped = [], 0
+    if chunk or skipped:
+        yield chunk, skipped
+
+
+# Senden
+
+class ChunkSender:
+    """Postet Bloecke mit gzip und Retry; eine Keep-Alive-Session pro Thread."""
+
+    def __init__(self, url, token, org, bucket, retries=5, timeout=30):
+        self.write_url = f"{url.rstrip('/')}/api/v2/write"
+        self.params = {"org": org, "bucket": bucket, "precision": "s"}
+        self.headers = {
+            "Authorization": f"Token {token}",
+            "Content-Type": "text/plain; charset=utf-8",
+            "Content-Encoding": "gzip"
+        }
+        self.retries = retries
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _session(self):
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def send(self, lines):
+        """Gibt (ok, gesendete Bytes) zurueck."""
+        body = gzip.compress("\n".join(lines).encode("utf-8"))
+        for attempt in range(self.retries + 1):
+            error = None
+            try:
+                response = self._session().post(self.write_url, params=self.params, data=body,
+                                                 headers=self.headers, timeout=self.timeout)
+                if response.status_code == 204:
+                    return True, len(body)
+                error = f"{response.status_code} {response.text[:200]}"
+                if response.status_code not in RETRY_STATUS:
+                    break
+            except requests.RequestException as e:
+                error = str(e)
+            if attempt < self.retries:
+                # Exponentieller Backoff mit Jitter
+                time.sleep(random.uniform(0.5, 1.0) * min(30, 2 ** attempt))
+        print(f"Fehler beim Schreiben eines Blocks ({len(lines)} Zeilen): {error}")
+        return False, len(body)
+
+
+class Progress:
+    def __init__(self, interval=2.0):
+        self.started = time.monotonic()
+        self.interval = interval
+        self.last_report = self.started
+        self.lines = 0
+        self.failed = 0
+        self.skipped = 0
+        self.bytes = 0
+        self.lock = threading.Lock()
+
+    def done(self, count, ok, sent_bytes):
+        with self.lock:
+            if ok:
+                self.lines += count
             else:
-                fields.append(f'{key}={val}')
+                self.failed += count
+            self.bytes += sent_bytes
+            now = time.monotonic()
+            if now - self.last_report >= self.interval:
+                self.last_report = now
+                self.report(final=False)
+
+    def report(self, final=True):
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        label = "Fertig" if final else "Fortschritt"
+        print(f"{label}: {self.lines} Fahrzeuge geschrieben, {self.failed} fehlgeschlagen, "
+              f"{self.skipped} übersprungen | {self.lines / elapsed:.0f} Zeilen/s, "
+              f"{self.bytes / elapsed / 1024:.0f} KB/s gzip, {elapsed:.1f}s")
+
+
+def run_import(records, sender, chunk_size, workers):
+    progress = Progress()
     ts = int(time.time())
-    return f'vehicle_info,{"".join(tags)} {",".join(fields)} {ts}'
+    # Begrenzt die Bloecke im Speicher: hoechstens 2 pro Worker unterwegs
+    slots = threading.BoundedSemaphore(workers * 2)
+
+    def task(lines):
+        try:
+            ok, sent_bytes = sender.send(lines)
+            progress.done(len(lines), ok, sent_bytes)
+        finally:
+            slots.release()
 
-# Lade Fahrzeuge
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="import") as pool:
+        for lines, skipped in iter_chunks(records, chunk_size, ts):
+            progress.skipped += skipped
+            if not lines:
+                continue
+            slots.acquire()
+            pool.submit(task, lines)
 
-with open(VEHICLES_JSON, encoding="utf-8") as f:
-    data = json.load(f)
-    vehicles = data["vehicles"]
+    progress.report()
+    return progress
 
-# Schreibe alle Fahrzeuge in InfluxDB
-lines = []
-for v in vehicles:
-    lines.append(vehicle_to_line(v))
 
-payload = "\n".join(lines)
+def main():
+    parser = argparse.ArgumentParser(description="Fahrzeug-Stammdaten (vehicle_info) nach InfluxDB importieren")
+    parser.add_argument("input", nargs="?", default=VEHICLES_JSON, help="Datei oder - für stdin")
+    parser.add_argument("--format", choices=sorted(READERS), help="Standard: aus der Dateiendung")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Zeilen pro Anfrage")
+    parser.add_argument("--workers", type=int, default=4, help="Parallele Anfragen")
+    parser.add_argument("--retries", type=int, default=5, help="Wiederholungen pro Block")
+    parser.add_argument("--url", default=INFLUX_URL)
+    parser.add_argument("--token", default=INFLUX_TOKEN)
+    parser.add_argument("--org", default=INFLUX_ORG)
+    parser.add_argument("--bucket", default=INFLUX_BUCKET)
+    args = parser.parse_args()
 
-headers = {
-    "Authorization": f"Token {INFLUX_TOKEN}",
-    "Content-Type": "text/plain; charset=utf-8"
-}
+    fmt = args.format or detect_format(args.input)
+    sender = ChunkSender(args.url, args.token, args.org, args.bucket, retries=args.retries)
+    print(f"Importiere {args.input} ({fmt}) nach {args.url} [{args.org}/{args.bucket}], "
+          f"{args.chunk_size} Zeilen pro Block, {args.workers} Worker")
 
-response = requests.post(INFLUX_URL, data=payload.encode("utf-8"), headers=headers)
+    if args.input == "-":
+        progress = run_import(READERS[fmt](sys.stdin), sender, args.chunk_size, args.workers)
+    else:
+        with open(args.input, encoding="utf-8", newline="") as f:
+            progress = run_import(READERS[fmt](f), sender, args.chunk_size, args.workers)
 
-if response.status_code == 204:
+    if progress.failed:
+        sys.exit(1)
     print("Alle Fahrzeuge erfolgreich in InfluxDB geschrieben.")
-else:
-    print(f"Fehler beim Schreiben: {response.status_code} {response.text}")
+
+
+if __name__ == "__main__":
+    main()